@@ -0,0 +1,156 @@
+"""
+asyncio facade over db.py.
+
+    adb = AsyncDB("school.db")
+    courses = await adb.list_courses()
+    async for s in adb.iter_students():
+        ...
+    await adb.close()
+
+Queries run on a dedicated thread pool. Each worker thread opens its own connection
+and binds it with db.bind_thread(), so the event loop never blocks on SQLite and no
+connection is shared between threads.
+"""
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, Callable, Dict, List, Optional
+
+import db
+
+
+class AsyncDB:
+    def __init__(self, db_path: Optional[str] = None, workers: int = 4, max_pending: int = 64):
+        """
+:param db_path: database file, defaults to the one db.py is using.
+:param workers: size of the query thread pool (one connection per thread).
+:param max_pending: queries allowed in flight at once; further awaits wait for a slot
+    instead of piling up in the pool queue.
+"""
+        self.db_path = db_path or db.default().path
+        self._max_pending = max_pending
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._conns: List = []
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="adb",
+                                        initializer=self._init_worker)
+
+    def _init_worker(self):
+        # check_same_thread=False only so close() can close it from the loop thread.
+        conn = db.open_connection(self.db_path, check_same_thread=False)
+        db.bind_thread(conn)
+        with self._lock:
+            self._conns.append(conn)
+
+    async def run(self, fn: Callable, *args, **kwargs):
+        """
+Run any db function (or other callable using db.connect()) on the pool.
+"""
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self._max_pending)
+        async with self._slots:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._pool, functools.partial(fn, *args, **kwargs))
+
+    async def close(self):
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, functools.partial(self._pool.shutdown, wait=True))
+        with self._lock:
+            for conn in self._conns:
+                conn.close()
+            self._conns.clear()
+
+    async def __aenter__(self) -> "AsyncDB":
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def _iter(self, fn: Callable, page_size: int, *args) -> AsyncIterator[Dict]:
+        # Keyset pages, with at most one page fetched ahead of the consumer: a slow
+        # consumer holds no pool thread and never has more than two pages in memory.
+        pending = asyncio.ensure_future(self.run(fn, *args, after=None, limit=page_size))
+        try:
+            while pending is not None:
+                page = await pending
+                pending = None
+                if len(page) == page_size:
+                    pending = asyncio.ensure_future(self.run(fn, *args, after=page[-1]["id"], limit=page_size))
+                for row in page:
+                    yield row
+        finally:
+            if pending is not None:
+                pending.cancel()
+
+    # Students
+    async def create_student(self, sid: str, name: str, age: int, email: str):
+        return await self.run(db.create_student, sid, name, age, email)
+
+    async def list_students(self, after: Optional[str] = None, limit: Optional[int] = None, mode: str = "dict"):
+        return await self.run(db.list_students, after=after, limit=limit, mode=mode)
+
+    def iter_students(self, page_size: int = 500) -> AsyncIterator[Dict]:
+        return self._iter(db.list_students, page_size)
+
+    async def update_student(self, sid: str, name: str, age: int, email: str):
+        return await self.run(db.update_student, sid, name, age, email)
+
+    async def delete_student(self, sid: str):
+        return await self.run(db.delete_student, sid)
+
+    # Instructors
+    async def create_instructor(self, iid: str, name: str, age: int, email: str):
+        return await self.run(db.create_instructor, iid, name, age, email)
+
+    async def list_instructors(self, after: Optional[str] = None, limit: Optional[int] = None, mode: str = "dict"):
+        return await self.run(db.list_instructors, after=after, limit=limit, mode=mode)
+
+    def iter_instructors(self, page_size: int = 500) -> AsyncIterator[Dict]:
+        return self._iter(db.list_instructors, page_size)
+
+    async def update_instructor(self, iid: str, name: str, age: int, email: str):
+        return await self.run(db.update_instructor, iid, name, age, email)
+
+    async def delete_instructor(self, iid: str):
+        return await self.run(db.delete_instructor, iid)
+
+    # Courses
+    async def create_course(self, cid: str, name: str, instructor_id: Optional[str] = None,
+                            capacity: Optional[int] = None, term: Optional[str] = None):
+        return await self.run(db.create_course, cid, name, instructor_id, capacity, term)
+
+    async def list_courses(self, after: Optional[str] = None, limit: Optional[int] = None, mode: str = "dict"):
+        return await self.run(db.list_courses, after=after, limit=limit, mode=mode)
+
+    def iter_courses(self, page_size: int = 500) -> AsyncIterator[Dict]:
+        return self._iter(db.list_courses, page_size)
+
+    async def update_course(self, cid: str, name: str, instructor_id: Optional[str]):
+        return await self.run(db.update_course, cid, name, instructor_id)
+
+    async def delete_course(self, cid: str):
+        return await self.run(db.delete_course, cid)
+
+    async def assign_instructor(self, course_id: str, instructor_id: Optional[str]):
+        return await self.run(db.assign_instructor, course_id, instructor_id)
+
+    # Registrations
+    async def enroll_student(self, student_id: str, course_id: str, section_id: Optional[str] = None) -> str:
+        return await self.run(db.enroll_student, student_id, course_id, section_id)
+
+    async def list_enrolled(self, course_id: str, after: Optional[str] = None,
+                            limit: Optional[int] = None, mode: str = "dict"):
+        return await self.run(db.list_enrolled, course_id, after=after, limit=limit, mode=mode)
+
+    def iter_enrolled(self, course_id: str, page_size: int = 500) -> AsyncIterator[Dict]:
+        return self._iter(db.list_enrolled, page_size, course_id)
+
+    async def search_all(self, q: str) -> Dict[str, List[Dict]]:
+        return await self.run(db.search_all, q)
+
+    async def fuzzy_search(self, q: str, threshold: float = 0.3, limit: Optional[int] = 20) -> List[Dict]:
+        return await self.run(db.fuzzy_search, q, threshold, limit)
+
+    async def changes_since(self, version: int, limit: Optional[int] = None) -> Dict:
+        return await self.run(db.changes_since, version, limit)
@@ -0,0 +1,214 @@
+"""
+Co-enrollment analytics: how many students share each pair of courses.
+
+Registrations are read once, in bulk, into a sparse course x student incidence
+structure (for every course, the sorted indices of its students). Pair counts
+are then computed from the per-student course lists in one vectorised pass
+instead of calling list_enrolled for every pair of courses.
+
+    e = Enrollments.load()
+    e.top_overlaps(10)                               # [(course_a, course_b, shared), ...]
+    e.students_in(all_of=["C1", "C2"], none_of=["C3"])
+
+NumPy is used when it is installed; otherwise the same API runs on plain Python
+sets and Counters (fine for a school, slow at a million registrations).
+"""
+import heapq
+from collections import Counter
+from itertools import combinations, groupby
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import db
+
+try:
+    import numpy as np
+except ImportError:  # optional dependency
+    np = None
+
+
+class Enrollments:
+    def __init__(self, student_ids: List[str], course_ids: List[str], student_idx, course_idx):
+        """
+Use Enrollments.load(); student_idx/course_idx are parallel sequences of indices
+into student_ids/course_ids, one entry per registration.
+"""
+        self.student_ids = student_ids
+        self.course_ids = course_ids
+        self._course_pos = {cid: n for n, cid in enumerate(course_ids)}
+        self._pairs = None
+        if np is not None:
+            s = np.asarray(student_idx, dtype=np.int64)
+            c = np.asarray(course_idx, dtype=np.int64)
+            # Course-major CSR: members of course k are _members[_offsets[k]:_offsets[k + 1]], sorted.
+            order = np.lexsort((s, c))
+            self._members = s[order]
+            self._offsets = np.concatenate(([0], np.cumsum(np.bincount(c, minlength=len(course_ids)))))
+            # Student-major order, used to enumerate each student's course pairs.
+            order = np.lexsort((c, s))
+            self._by_student = (s[order], c[order])
+        else:
+            members: List[set] = [set() for _ in course_ids]
+            for si, ci in zip(student_idx, course_idx):
+                members[ci].add(si)
+            self._member_sets = members
+            self._by_student = sorted(zip(student_idx, course_idx))
+
+    @classmethod
+    def load(cls, conn=None) -> "Enrollments":
+        """
+Read every registration with one query.
+"""
+        conn = conn or db.connect()
+        course_ids = [r[0] for r in conn.execute("SELECT id FROM courses ORDER BY id")]
+        course_pos = {cid: n for n, cid in enumerate(course_ids)}
+        student_pos: Dict[str, int] = {}
+        student_ids: List[str] = []
+        sidx: List[int] = []
+        cidx: List[int] = []
+        cur = conn.execute("SELECT student_id, course_id FROM registrations")
+        while True:
+            rows = cur.fetchmany(50_000)
+            if not rows:
+                break
+            for sid, cid in rows:
+                n = student_pos.get(sid)
+                if n is None:
+                    n = student_pos[sid] = len(student_ids)
+                    student_ids.append(sid)
+                sidx.append(n)
+                cidx.append(course_pos[cid])
+        if np is not None:
+            sidx = np.fromiter(sidx, dtype=np.int64, count=len(sidx))
+            cidx = np.fromiter(cidx, dtype=np.int64, count=len(cidx))
+        return cls(student_ids, course_ids, sidx, cidx)
+
+    def __len__(self) -> int:
+        return len(self._by_student[0]) if np is not None else len(self._by_student)
+
+    def course_size(self, course_id: str) -> int:
+        k = self._course_pos[course_id]
+        if np is not None:
+            return int(self._offsets[k + 1] - self._offsets[k])
+        return len(self._member_sets[k])
+
+    def pair_counts(self):
+        """
+Shared-student counts for every pair of courses that share at least one student.
+Returns (a, b, n): with NumPy three int arrays of course indices a < b and counts,
+otherwise a Counter {(a, b): n}. Cached after the first call.
+"""
+        if self._pairs is not None:
+            return self._pairs
+        if np is None:
+            counts: Counter = Counter()
+            for _, group in groupby(self._by_student, key=lambda p: p[0]):
+                counts.update(combinations(sorted(c for _, c in group), 2))
+            self._pairs = counts
+            return counts
+        s, c = self._by_student
+        n = len(self.course_ids)
+        keys = []
+        # Rows are sorted by (student, course): entries d apart belong to the same
+        # student exactly when their student index matches, giving each pair once.
+        d = 1
+        while d < len(s):
+            same = s[d:] == s[:-d]
+            if not same.any():
+                break
+            keys.append(c[:-d][same] * n + c[d:][same])
+            d += 1
+        if keys:
+            uniq, counts = np.unique(np.concatenate(keys), return_counts=True)
+        else:
+            uniq = counts = np.zeros(0, dtype=np.int64)
+        self._pairs = (uniq // n, uniq % n, counts)
+        return self._pairs
+
+    def co_enrollment_matrix(self):
+        """
+Dense courses x courses matrix of shared students, course sizes on the diagonal,
+in course_ids order (a NumPy array, or a list of lists without NumPy).
+"""
+        n = len(self.course_ids)
+        if np is None:
+            m = [[0] * n for _ in range(n)]
+            for k, members in enumerate(self._member_sets):
+                m[k][k] = len(members)
+            for (a, b), shared in self.pair_counts().items():
+                m[a][b] = m[b][a] = shared
+            return m
+        a, b, counts = self.pair_counts()
+        m = np.zeros((n, n), dtype=np.int64)
+        m[a, b] = counts
+        m[b, a] = counts
+        m[np.arange(n), np.arange(n)] = np.diff(self._offsets)
+        return m
+
+    def shared(self, course_a: str, course_b: str) -> int:
+        return len(self.students_in(all_of=[course_a, course_b]))
+
+    def top_overlaps(self, k: int = 10) -> List[Tuple[str, str, int]]:
+        """
+The k course pairs sharing the most students, largest first.
+"""
+        if np is None:
+            best = heapq.nsmallest(k, self.pair_counts().items(), key=lambda kv: (-kv[1], kv[0]))
+            return [(self.course_ids[a], self.course_ids[b], n) for (a, b), n in best]
+        a, b, counts = self.pair_counts()
+        if len(counts) > k:
+            # Everything tied with the k-th largest count competes, so ties break by course order.
+            cutoff = counts[np.argpartition(-counts, k - 1)[k - 1]]
+            top = np.flatnonzero(counts >= cutoff)
+        else:
+            top = np.arange(len(counts))
+        top = top[np.lexsort((b[top], a[top], -counts[top]))][:k]
+        return [(self.course_ids[a[t]], self.course_ids[b[t]], int(counts[t])) for t in top]
+
+    def _members_of(self, course_id: str):
+        k = self._course_pos[course_id]
+        if np is not None:
+            return self._members[self._offsets[k]:self._offsets[k + 1]]
+        return self._member_sets[k]
+
+    def students_in(self, all_of: Sequence[str] = (), any_of: Sequence[str] = (),
+                    none_of: Sequence[str] = ()) -> List[str]:
+        """
+Students enrolled in every course of all_of, at least one of any_of (when given)
+and none of none_of, sorted by id. With neither all_of nor any_of, start from
+every student with a registration.
+"""
+        if np is None:
+            result: Optional[set] = None
+            for cid in all_of:
+                result = set(self._members_of(cid)) if result is None else result & self._members_of(cid)
+            if any_of:
+                union = set().union(*(self._members_of(cid) for cid in any_of))
+                result = union if result is None else result & union
+            if result is None:
+                result = set(range(len(self.student_ids)))
+            for cid in none_of:
+                result -= self._members_of(cid)
+            return sorted(self.student_ids[i] for i in result)
+
+        result = None
+        for cid in all_of:
+            m = self._members_of(cid)
+            result = m if result is None else np.intersect1d(result, m, assume_unique=True)
+        if any_of:
+            union = np.unique(np.concatenate([self._members_of(cid) for cid in any_of]))
+            result = union if result is None else np.intersect1d(result, union, assume_unique=True)
+        if result is None:
+            result = np.arange(len(self.student_ids))
+        if none_of:
+            excluded = np.concatenate([self._members_of(cid) for cid in none_of])
+            result = result[~np.isin(result, excluded)]
+        return sorted(self.student_ids[i] for i in result)
+
+
+def top_overlaps(k: int = 10, conn=None) -> List[Tuple[str, str, int]]:
+    return Enrollments.load(conn).top_overlaps(k)
+
+
+def students_in(all_of: Iterable[str] = (), any_of: Iterable[str] = (), none_of: Iterable[str] = (),
+                conn=None) -> List[str]:
+    return Enrollments.load(conn).students_in(list(all_of), list(any_of), list(none_of))
@@ -4,10 +4,17 @@ School Management System Tkinter
 This app lets you create students , courses and instructors. It lets you assign an instructor for a chosen course and lets you enroll a
 student to courses. You can also search for any created object in the database and extract them.
 """
+import bisect
 import re
+import time
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
 import db
+import memdb
+import profiler
+
+profiler.enable_from_env()
+memdb.enable_from_env()
 
 
 EMAIL_RE = re.compile(r"^[^@\s]+@[^@\s]+\.[^@\s]+$")
@@ -56,6 +63,7 @@ check if email is valid
     return t
 
 # functions here
+@profiler.action()
 def add_instructor():
     """
 Adds a new instructor named as the input.
@@ -80,6 +88,7 @@ then stores the instructor in the database and updates the lists.
     except Exception as e:
         messagebox.showerror("Error", str(e))
 
+@profiler.action()
 def add_course():
     """
 Add a new course.
@@ -109,6 +118,7 @@ Checks that the course ID is unique before saving.
     except Exception as e:
         messagebox.showerror("Error", str(e))
 
+@profiler.action()
 def add_student():
     """
 Add a new student from the input fields.
@@ -132,7 +142,43 @@ then saves to the database and updates the lists.
         refresh_tree()
     except Exception as e:
         messagebox.showerror("Error", str(e))
+TYPE_AHEAD_LIMIT = 50
+TYPE_AHEAD_DELAY_MS = 150
 
+def _type_ahead(win, kind: str, width: int = 40, extra=()):
+    """
+Editable combobox for picking a student, instructor or course ("students", ...).
+Only the first TYPE_AHEAD_LIMIT ids/names starting with the typed text are loaded
+(db.prefix_search), re-queried shortly after each key press.
+:param extra: fixed entries listed before the matches, e.g. "(None)".
+:return: (combobox, StringVar); the var starts at the first entry.
+"""
+    var = tk.StringVar()
+    cb = ttk.Combobox(win, textvariable=var, width=width)
+    pending = []
+
+    @profiler.action("type_ahead")
+    def reload():
+        pending.clear()
+        prefix = var.get().split(" – ")[0]
+        if prefix in extra: prefix = ""
+        cb["values"] = list(extra) + [f"{r['id']} – {r['name']}" for r in db.prefix_search(kind, prefix, TYPE_AHEAD_LIMIT)]
+        profiler.rows(len(cb["values"]))
+
+    def on_key(evt):
+        if evt.keysym in ("Up", "Down", "Return", "Escape", "Tab"): return
+        if pending: cb.after_cancel(pending.pop())
+        pending.append(cb.after(TYPE_AHEAD_DELAY_MS, reload))
+
+    cb.bind("<KeyRelease>", on_key)
+    reload()
+    if cb["values"]: var.set(cb["values"][0])
+    return cb, var
+
+def _picked_id(var) -> str:
+    return var.get().split(" – ")[0].strip()
+
+@profiler.action()
 def enroll_student_dialog():
     """
 lets you enroll selected student to course from a dropdown menu when clicked.
@@ -144,7 +190,7 @@ student is then linked to course in database
         return
 
     sid=lb_students.get(lb_students.curselection()[0]).split(" – ")[0]
-    if not db.list_courses():
+    if not db.list_courses(limit=1):
         messagebox.showwarning("No courses", "Create a course first.")
         return
 
@@ -152,26 +198,27 @@ student is then linked to course in database
     tk.Label(win, text=f"Enroll student {sid} into:").grid(row=0, column=0, padx=10, pady=(10, 4), sticky="w")
 
 
-    course_rows= db.list_courses()
-    display =[f"{c['id']} – {c['name']}" for c in course_rows]
-    chosen= tk.StringVar(value=display[0])
-    cb =ttk.Combobox(win, textvariable=chosen, values=display, state="readonly", width=40)
+    cb, chosen = _type_ahead(win, "courses")
     cb.grid(row=1, column=0, padx=10, pady=4, sticky="we")
 
+    @profiler.action()
     def do_enroll():
-        sel_text = chosen.get()
-        if not sel_text:
+        cid = _picked_id(chosen)
+        if not cid or db.get_course(cid) is None:
             messagebox.showwarning("Pick a course", "Choose a course."); return
-        cid= sel_text.split(" – ")[0]
-        db.enroll_student(sid, cid)
+        status = db.enroll_student(sid, cid)
         refresh_tree()
-        messagebox.showinfo("Enrolled", f"Student {sid} enrolled in {cid}")
+        if status == db.WAITLISTED:
+            messagebox.showinfo("Waitlisted", f"{cid} is full, student {sid} was added to its waitlist")
+        else:
+            messagebox.showinfo("Enrolled", f"Student {sid} enrolled in {cid}")
         win.destroy()
 
     btns = tk.Frame(win); btns.grid(row=2, column=0, padx=10, pady=(6, 10), sticky="e")
     tk.Button(btns, text="Cancel", command=win.destroy).pack(side="right", padx=(6, 0))
     tk.Button(btns, text="Enroll", command=do_enroll).pack(side="right")
 
+@profiler.action()
 def assign_instructor_dialog():
     """
 lets you assign selected instuctor to course from a dropdown menu when clicked.
@@ -183,24 +230,21 @@ the instructor becomes responsible for that course.
         return
 
     iid =lb_instructors.get(lb_instructors.curselection()[0]).split(" – ")[0]
-    if not db.list_courses():
+    if not db.list_courses(limit=1):
         messagebox.showwarning("No courses", "Create a course first.")
         return
 
     win= tk.Toplevel(root); win.title(f"Assign {iid}"); win.grab_set()
     tk.Label(win, text=f"Assign instructor {iid} to:").grid(row=0, column=0, padx=10, pady=(10, 5), sticky="w")
 
-    course_rows = db.list_courses()
-    display= [f"{c['id']} – {c['name']}" for c in course_rows]
-    chosen =tk.StringVar(value=display[0])
-    cb =ttk.Combobox(win, textvariable=chosen, values=display, state="readonly", width=40)
+    cb, chosen = _type_ahead(win, "courses")
     cb.grid(row=1, column=0, padx=10, pady=5, sticky="we")
 
+    @profiler.action()
     def do_assign():
-        sel_text = chosen.get()
-        if not sel_text:
+        cid = _picked_id(chosen)
+        if not cid or db.get_course(cid) is None:
             messagebox.showwarning("Pick a course", "Choose a course."); return
-        cid = sel_text.split(" – ")[0]
         db.assign_instructor(cid, iid)
         refresh_courses_listbox()
         refresh_tree()
@@ -211,6 +255,7 @@ the instructor becomes responsible for that course.
     tk.Button(btns, text="Cancel", command=win.destroy).pack(side="right", padx=(6, 0))
     tk.Button(btns, text="Assign", command=do_assign).pack(side="right")
 
+@profiler.action()
 def view_enrolled_dialog():
     """
 Shows all students enrolled in the selected course.
@@ -231,68 +276,226 @@ it shows same message.
             lst.insert(tk.END, f"{s['id']} – {s['name']}")
     else:
         lst.insert(tk.END, "(No students)")
+    profiler.rows(lst.size())
     tk.Button(win, text="Close", command=win.destroy).pack(pady=(0, 10))
 
+# course id -> instructor id, to find the course rows an instructor change touches
+course_instructors = {}
+
+def _course_text(c):
+    return f"{c['id']} – {c['name']} (Instructor: {c['instructor_name'] or 'None'})"
+
+def _person_text(p):
+    return f"{p['id']} – {p['name']}"
+
+def _listbox_update(lb, rec_id, text):
+    """
+Redraw the one row of an id-sorted listbox that shows rec_id (text None removes it).
+"""
+    ids = [item.split(" – ", 1)[0] for item in lb.get(0, tk.END)]
+    i = bisect.bisect_left(ids, rec_id)
+    selected = False
+    if i < len(ids) and ids[i] == rec_id:
+        if lb.get(i) == text:
+            return
+        selected = lb.selection_includes(i)
+        lb.delete(i)
+    if text is not None:
+        lb.insert(i, text)
+        if selected:
+            lb.selection_set(i)
+
+@profiler.action()
 def refresh_courses_listbox():
     """
 refresh the course listbox and shows data of courses.
 """
 
     lb_courses.delete(0, tk.END)
+    course_instructors.clear()
     for c in db.list_courses():
-        inst_name = c["instructor_name"] or "None"
-        lb_courses.insert(tk.END, f"{c['id']} – {c['name']} (Instructor: {inst_name})")
+        lb_courses.insert(tk.END, _course_text(c))
+        course_instructors[c["id"]] = c["instructor_id"]
+    profiler.rows(lb_courses.size())
 
+@profiler.action()
 def refresh_students_listbox():
         """
 refresh the students listbox and shows data of students."""  
         lb_students.delete(0, tk.END)
         for s in db.list_students():
-            lb_students.insert(tk.END, f"{s['id']} – {s['name']}")
+            lb_students.insert(tk.END, _person_text(s))
+        profiler.rows(lb_students.size())
 
+@profiler.action()
 def refresh_instructors_listbox():
         """
 refresh the instructors listbox and shows data of instructors.
 """ 
         lb_instructors.delete(0, tk.END)
         for i in db.list_instructors():
-            lb_instructors.insert(tk.END, f"{i['id']} – {i['name']}")
+            lb_instructors.insert(tk.END, _person_text(i))
+        profiler.rows(lb_instructors.size())
 
+@profiler.action()
 def refresh_tree(records=None):
     """
 Rebuild the tree view with students, instructors, and courses.
 
-If no records are passed, it loads everything from the database.
-If a filtered dict is given, it displays only those.
+If no records are passed, it loads the first page of everything, in the order of the
+clicked column header. If a filtered dict is given, it displays only those.
 """
+    global records_query, records_next
+    if records is None:
+        load_records({}); return
 
     tree.delete(*tree.get_children())
-
-    if records is None:
-        students_= {s["id"]: s for s in db.list_students()}
-        instructors_= {i["id"]: i for i in db.list_instructors()}
-        courses_ = {c["id"]: c for c in db.list_courses()}
-    else:
-        students_   = records.get("students", {})
-        instructors_ = records.get("instructors", {})
-        courses_     = records.get("courses", {})
+    students_   = records.get("students", {})
+    instructors_ = records.get("instructors", {})
+    courses_     = records.get("courses", {})
 
   
     for sid, s in students_.items():
-        tree.insert("", "end", iid=f"Student:{sid}",
-                    values=("Student", s["id"], s["name"], f"Email: {s['email']}"))
+        tree.insert("", "end", iid=f"Student:{sid}", values=_tree_values("Student", s))
 
    
     for iid, i in instructors_.items():
-        tree.insert("", "end", iid=f"Instructor:{iid}",
-                    values=("Instructor", i["id"], i["name"], f"Email: {i['email']}"))
+        tree.insert("", "end", iid=f"Instructor:{iid}", values=_tree_values("Instructor", i))
 
     
     for cid, c in courses_.items():
-        extra = f"Instructor: {c.get('instructor_name') or 'None'}, Students: {c.get('enrolled_count', 0)}"
-        tree.insert("", "end", iid=f"Course:{cid}",
-                    values=("Course", c["id"], c["name"], extra))
+        tree.insert("", "end", iid=f"Course:{cid}", values=_tree_values("Course", c))
+    profiler.rows(len(students_) + len(instructors_) + len(courses_))
+    # a hand-picked list (fuzzy matches) has no next page and keeps its own order
+    records_query, records_next = None, None
+    more_btn.config(state="disabled")
+
+RECORDS_PAGE = 500
+_SORT_COLUMNS = {"Type": "type", "ID": "id", "Name": "name", "Extra": "extra"}
+records_sort = {"order_by": "type", "descending": False}
+records_query = {}      # filters of the rows shown, None for a hand-picked list
+records_next = None     # cursor of the next page, None when every row is shown
+
+def load_records(query):
+    """
+Show the first page of db.query_records(**query), sorted by the clicked header.
+"""
+    global records_query, records_next
+    tree.delete(*tree.get_children())
+    records_query, records_next = query, None
+    load_more_records()
 
+@profiler.action()
+def load_more_records():
+    """
+Append the next page of the rows being shown.
+"""
+    global records_next
+    if records_query is None:
+        return
+    res = db.query_records(after=records_next, limit=RECORDS_PAGE, **records_sort, **records_query)
+    for rec in res["records"]:
+        tree.insert("", "end", iid=f"{rec['type']}:{rec['id']}", values=_tree_values(rec["type"], rec))
+    records_next = res["next"]
+    more_btn.config(state="normal" if records_next else "disabled")
+    profiler.rows(len(res["records"]))
+
+@profiler.action()
+def sort_tree_by(column):
+    """
+Header click: re-query sorted by that column, or the other way round if it already is.
+"""
+    order_by = _SORT_COLUMNS[column]
+    descending = not records_sort["descending"] if records_sort["order_by"] == order_by else False
+    records_sort.update(order_by=order_by, descending=descending)
+    for col in columns:
+        arrow = (" ▼" if descending else " ▲") if col == column else ""
+        tree.heading(col, text=col + arrow)
+    if records_query is None:
+        search_records()
+    else:
+        load_records(records_query)
+
+def _showing_everything():
+    # new rows from other programs can only be placed when every row is shown in type order
+    return records_query == {} and records_next is None and records_sort == {"order_by": "type", "descending": False}
+
+def _tree_values(rec_type, rec):
+    if rec_type == "Course":
+        extra = f"Instructor: {rec.get('instructor_name') or 'None'}, Students: {rec.get('enrolled_count', 0)}"
+    else:
+        extra = f"Email: {rec['email']}"
+    return (rec_type, rec["id"], rec["name"], extra)
+
+_TREE_ORDER = ("Student", "Instructor", "Course")
+_GETTERS = {"Student": db.get_student, "Instructor": db.get_instructor, "Course": db.get_course}
+POLL_MS = 2000
+CHANGE_CONSUMER = db.consumer_name("app_tk")
+acked_at = 0.0
+
+def _ack_changes(version):
+    # as a registered consumer, the change log is not pruned past what we have drawn
+    global acked_at
+    try:
+        db.ack_changes(CHANGE_CONSUMER, version)
+    except ValueError:   # expired after CHANGE_CONSUMER_TTL without an ack (e.g. suspended)
+        db.register_consumer(CHANGE_CONSUMER, version)
+    acked_at = time.monotonic()
+
+def poll_changes():
+    """
+Pick up changes made by other programs (or the server) since the last poll.
+
+Only the rows that changed are redrawn, in the listboxes and the tree; new rows are
+added to the tree when the whole list is shown in its default order, otherwise they
+appear on the next refresh.
+"""
+    global change_version
+    seen = change_version
+    try:
+        res = db.changes_since(change_version)
+    except ValueError:
+        # the change log was pruned past our version: reload everything
+        change_version = db.current_version()
+        refresh_students_listbox(); refresh_instructors_listbox(); refresh_courses_listbox(); refresh_tree()
+        res = {"version": change_version, "changes": []}
+    change_version = res["version"]
+    rows = set()
+    for ch in res["changes"]:
+        if ch["table"] == "registrations":
+            rows.add(("Course", ch["key"]["course_id"]))
+        else:
+            rows.add((ch["table"][:-1].capitalize(), ch["key"]["id"]))
+    instructors = {rec_id for t, rec_id in rows if t == "Instructor"}
+    if instructors:
+        # course rows show their instructor's name
+        rows.update(("Course", cid) for cid, iid in course_instructors.items() if iid in instructors)
+    listboxes = {"Student": (lb_students, _person_text), "Instructor": (lb_instructors, _person_text),
+                 "Course": (lb_courses, _course_text)}
+    for rec_type, rec_id in rows:
+        iid = f"{rec_type}:{rec_id}"
+        rec = _GETTERS[rec_type](rec_id)
+        lb, text = listboxes[rec_type]
+        _listbox_update(lb, rec_id, rec and text(rec))
+        if rec_type == "Course":
+            if rec is None:
+                course_instructors.pop(rec_id, None)
+            else:
+                course_instructors[rec_id] = rec["instructor_id"]
+        if rec is None:
+            if tree.exists(iid):
+                tree.delete(iid)
+        elif tree.exists(iid):
+            tree.item(iid, values=_tree_values(rec_type, rec))
+        elif _showing_everything():
+            rank = _TREE_ORDER.index(rec_type)
+            pos = sum(1 for c in tree.get_children() if _TREE_ORDER.index(c.split(":", 1)[0]) <= rank)
+            tree.insert("", pos, iid=iid, values=_tree_values(rec_type, rec))
+    if change_version != seen or time.monotonic() - acked_at > db.CHANGE_CONSUMER_TTL / 4:
+        _ack_changes(change_version)
+    root.after(POLL_MS, poll_changes)
+
+@profiler.action()
 def search_records():
     """
 Search across all the data and find input.
@@ -303,14 +506,19 @@ If empty, resets the tree to show everything.
     q = search_var.get().lower().strip()
     if not q:
         refresh_tree(); return
-    res = db.search_all(q)
+    if db.query_records(types=["Student", "Instructor"], q=q, limit=1)["records"]:
+        load_records({"q": q}); return
+    # no exact substring match: fall back to typo-tolerant name search
+    hits = db.fuzzy_search(q)
+    courses_ = db.query_records(types=["Course"], q=q, order_by="id")["records"]
     filtered = {
-        "students":   {s["id"]: s for s in res["students"]},
-        "instructors": {i["id"]: i for i in res["instructors"]},
-        "courses":     {c["id"]: c for c in res["courses"]},
+        "students":   {h["id"]: h for h in hits if h["kind"] == "student"},
+        "instructors": {h["id"]: h for h in hits if h["kind"] == "instructor"},
+        "courses":     {c["id"]: c for c in courses_},
     }
     refresh_tree(filtered)
 
+@profiler.action()
 def delete_selected():
     """
 Delete the selected student, instructor, or course.
@@ -342,6 +550,7 @@ Afterwards, updates all lists and the tree.
     refresh_courses_listbox()
     refresh_tree()
 
+@profiler.action()
 def edit_selected():
     """
 Opens a window for the selected data where you can change data relating to it.
@@ -383,6 +592,7 @@ you can change fields and save them back to the database.
         row("Age");   add_entry(age_var)
         row("Email"); add_entry(email_var)
 
+        @profiler.action()
         def save_changes():
             try:
                 db.update_student(rec_id,
@@ -404,6 +614,7 @@ you can change fields and save them back to the database.
         row("Age");   add_entry(age_var)
         row("Email"); add_entry(email_var)
 
+        @profiler.action()
         def save_changes():
             try:
                 db.update_instructor(rec_id,
@@ -422,16 +633,15 @@ you can change fields and save them back to the database.
         row("Course name"); add_entry(name_var)
 
         row("Instructor")
-        options = ["(None)"] + [f"{i['id']} – {i['name']}" for i in db.list_instructors()]
-        current = "(None)" if not c["instructor_id"] else f"{c['instructor_id']} – {c['instructor_name']}"
-        chosen = tk.StringVar(value=current)
-        cb = ttk.Combobox(win, textvariable=chosen, values=options, state="readonly", width=30)
+        cb, chosen = _type_ahead(win, "instructors", 30, extra=("(None)",))
+        chosen.set("(None)" if not c["instructor_id"] else f"{c['instructor_id']} – {c['instructor_name']}")
         cb.grid(row=ROW-1, column=1, padx=10, pady=6)
 
+        @profiler.action()
         def save_changes():
             new_name = _nonempty(name_var.get(), "Course name")
-            sel = chosen.get()
-            new_inst_id = None if sel == "(None)" else sel.split(" – ")[0]
+            sel = _picked_id(chosen)
+            new_inst_id = None if sel in ("", "(None)") else sel
             try:
                 db.update_course(rec_id, new_name, new_inst_id)
             except Exception as e:
@@ -443,6 +653,7 @@ you can change fields and save them back to the database.
 
     tk.Button(win, text="Save", command=save_changes).grid(row=ROW, column=0, columnspan=2, pady=(4, 10))
 
+@profiler.action()
 def backup_db():
     """
 Save a copy of the SQLite database to a file chosen by the user.
@@ -525,7 +736,7 @@ tk.Button(fr_records, text="Search", command=lambda: search_records()).grid(row=
 columns = ("Type", "ID", "Name", "Extra")
 tree = ttk.Treeview(fr_records, columns=columns, show="headings", height=10)
 for col in columns:
-    tree.heading(col, text=col)
+    tree.heading(col, text=col, command=lambda c=col: sort_tree_by(c))
     tree.column(col, width=180, stretch=True)
 tree.grid(row=1, column=0, columnspan=3, sticky="nsew", padx=5, pady=5)
 
@@ -552,14 +763,28 @@ tree.bind("<Double-1>", _on_tree_double_click)
 tk.Button(fr_records, text="Edit", command=lambda: edit_selected()).grid(row=3, column=0, pady=6)
 tk.Button(fr_records, text="Delete", command=lambda: delete_selected()).grid(row=3, column=1, pady=6)
 tk.Button(fr_records, text="Refresh", command=lambda: refresh_tree()).grid(row=3, column=2, pady=6)
+more_btn = tk.Button(fr_records, text="More", state="disabled", command=lambda: load_more_records())
+more_btn.grid(row=3, column=3, pady=6)
 
 fr_records.grid_rowconfigure(1, weight=1)
 fr_records.grid_columnconfigure(1, weight=1)
 
+# Debug overlay: the last profiled action (SCHOOL_PROFILE=1, see profiler.py)
+if profiler.enabled():
+    profile_var = tk.StringVar(value="profiling: click something")
+    tk.Label(root, textvariable=profile_var, anchor="w", fg="gray25", font=("TkFixedFont", 9))\
+        .grid(row=3, column=0, columnspan=3, sticky="we", padx=10, pady=(0, 6))
+    profiler.subscribe(lambda rec: profile_var.set(profiler.format_record(rec)))
+
 # Prime the UI from DB
 refresh_students_listbox()
 refresh_instructors_listbox()
 refresh_courses_listbox()
 refresh_tree()
+change_version = db.current_version()
+db.register_consumer(CHANGE_CONSUMER, change_version)
+_ack_changes(change_version)
+root.after(POLL_MS, poll_changes)
 
 root.mainloop()
+db.drop_consumer(CHANGE_CONSUMER)
@@ -0,0 +1,321 @@
+"""
+Term-based archiving of cold records.
+
+Courses of old terms, with their sections, registrations and waitlists, move out
+of the hot tables into an archive database attached to the connection as schema
+"archive". Students left with no current registration or waitlist entry follow
+them, so the lists, counts and searches in db.py only scan current records.
+
+    archive.attach("school_archive.db")                   # once per connection
+    archive.archive_terms(archive.terms_older_than(4))     # keep the 4 latest terms hot
+    archive.list_courses(include_archive=True)             # hot and archived rows, by id
+    archive.search_all("lee", include_archive=True)
+
+    python src/archive.py --db school.db --archive school_archive.db --keep-terms 4
+
+Terms are compared as text, so name them to sort chronologically ("2024-09").
+Courses without a term are never archived and instructors always stay hot. Rows
+move in batches of batch_size courses (then students), each batch in its own
+transaction, so other writers wait for one batch at most. Moving a row out of the
+hot tables shows up as a delete in the change log, like any other delete. The read
+functions here return the same rows as their db.py namesakes, plus "archived"
+(0 or 1) when include_archive is set.
+"""
+import argparse
+import json
+from typing import Dict, Iterable, List, Optional
+
+import db
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS archive.courses (
+    id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    instructor_id TEXT,
+    capacity INTEGER,
+    term TEXT,
+    archived_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+CREATE INDEX IF NOT EXISTS archive.idx_courses_term ON courses(term);
+CREATE INDEX IF NOT EXISTS archive.idx_courses_name ON courses(name);
+
+CREATE TABLE IF NOT EXISTS archive.sections (
+    id TEXT PRIMARY KEY,
+    course_id TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS archive.section_slots (
+    section_id TEXT NOT NULL,
+    start_min INTEGER NOT NULL,
+    end_min INTEGER NOT NULL,
+    PRIMARY KEY (section_id, start_min)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS archive.registrations (
+    student_id TEXT NOT NULL,
+    course_id TEXT NOT NULL,
+    section_id TEXT,
+    PRIMARY KEY (student_id, course_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS archive.idx_registrations_course ON registrations(course_id, student_id);
+
+CREATE TABLE IF NOT EXISTS archive.waitlist (
+    position INTEGER NOT NULL,
+    student_id TEXT NOT NULL,
+    course_id TEXT NOT NULL,
+    PRIMARY KEY (course_id, student_id)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS archive.students (
+    id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    age INTEGER NOT NULL,
+    email TEXT NOT NULL,
+    archived_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+CREATE INDEX IF NOT EXISTS archive.idx_students_name ON students(name);
+"""
+
+# One batch of courses, already listed in temp.archive_batch. The waitlist goes before
+# the registrations, so their deletes promote nobody, and registrations and sections
+# are deleted before their courses so the cascades have nothing left to do.
+_MOVE_COURSES = [
+    """INSERT OR REPLACE INTO archive.courses(id, name, instructor_id, capacity, term)
+       SELECT id, name, instructor_id, capacity, term FROM courses WHERE id IN temp.archive_batch""",
+    """INSERT OR REPLACE INTO archive.sections(id, course_id)
+       SELECT id, course_id FROM sections WHERE course_id IN temp.archive_batch""",
+    """INSERT OR REPLACE INTO archive.section_slots(section_id, start_min, end_min)
+       SELECT sl.section_id, sl.start_min, sl.end_min FROM section_slots sl
+       JOIN sections s ON s.id = sl.section_id WHERE s.course_id IN temp.archive_batch""",
+    """INSERT OR REPLACE INTO archive.registrations(student_id, course_id, section_id)
+       SELECT student_id, course_id, section_id FROM registrations WHERE course_id IN temp.archive_batch""",
+    """INSERT OR REPLACE INTO archive.waitlist(position, student_id, course_id)
+       SELECT position, student_id, course_id FROM waitlist WHERE course_id IN temp.archive_batch""",
+    """INSERT OR IGNORE INTO temp.archive_students(id)
+       SELECT student_id FROM registrations WHERE course_id IN temp.archive_batch
+       UNION SELECT student_id FROM waitlist WHERE course_id IN temp.archive_batch""",
+    "DELETE FROM waitlist WHERE course_id IN temp.archive_batch",
+    "DELETE FROM registrations WHERE course_id IN temp.archive_batch",
+    "DELETE FROM sections WHERE course_id IN temp.archive_batch",
+    "DELETE FROM courses WHERE id IN temp.archive_batch",
+]
+
+_MOVE_STUDENTS = [
+    """INSERT OR REPLACE INTO archive.students(id, name, age, email)
+       SELECT id, name, age, email FROM students WHERE id IN temp.archive_batch""",
+    "DELETE FROM students WHERE id IN temp.archive_batch",
+]
+
+
+def is_attached(conn=None) -> bool:
+    conn = conn or db.connect()
+    return any(r[1] == "archive" for r in conn.execute("PRAGMA database_list"))
+
+
+def attach(path: str, conn=None):
+    """
+Attach the archive database at path (created if missing) to conn, by default the
+connection db.py is using. Needed once per connection before archiving or
+reading with include_archive.
+"""
+    conn = conn or db.connect()
+    if not is_attached(conn):
+        conn.execute("ATTACH DATABASE ? AS archive", (path,))
+    conn.executescript(_SCHEMA)
+
+
+def detach(conn=None):
+    conn = conn or db.connect()
+    if is_attached(conn):
+        conn.execute("DETACH DATABASE archive")
+
+
+def _require(conn):
+    if not is_attached(conn):
+        raise RuntimeError("No archive attached; call archive.attach(path) first.")
+
+
+def terms_older_than(keep: int, conn=None) -> List[str]:
+    """
+Hot terms other than the `keep` latest, oldest first.
+"""
+    conn = conn or db.connect()
+    terms = [r[0] for r in conn.execute("SELECT DISTINCT term FROM courses WHERE term IS NOT NULL ORDER BY term")]
+    return terms[:max(0, len(terms) - keep)]
+
+
+def archive_terms(terms: Iterable[str], batch_size: int = 500) -> Dict[str, int]:
+    """
+Move every course of the given terms to the archive, with its sections, slots,
+registrations and waitlist (positions kept, nobody promoted), then every student of
+those courses who has no registration or waitlist entry left. Returns the numbers
+moved: {"courses", "registrations", "waitlist", "students"}.
+"""
+    conn = db.connect()
+    _require(conn)
+    terms = json.dumps(list(terms))
+    moved = {"courses": 0, "registrations": 0, "waitlist": 0, "students": 0}
+    conn.execute("CREATE TEMP TABLE IF NOT EXISTS archive_batch (id TEXT PRIMARY KEY)")
+    conn.execute("CREATE TEMP TABLE IF NOT EXISTS archive_students (id TEXT PRIMARY KEY)")
+    conn.execute("DELETE FROM temp.archive_students")
+    conn.commit()
+
+    def run_batch(select_sql: str, params, statements: List[str]) -> List[int]:
+        # Row counts of the batch selection and of each statement.
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("DELETE FROM temp.archive_batch")
+            counts = [conn.execute("INSERT INTO temp.archive_batch(id) " + select_sql, params).rowcount]
+            if counts[0]:
+                counts += [conn.execute(sql).rowcount for sql in statements]
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        return counts
+
+    while True:
+        counts = run_batch("SELECT id FROM courses WHERE term IN (SELECT value FROM json_each(?)) LIMIT ?",
+                           (terms, batch_size), _MOVE_COURSES)
+        moved["courses"] += counts[0]
+        if counts[0]:
+            moved["registrations"] += counts[4]
+            moved["waitlist"] += counts[5]
+        if counts[0] < batch_size:
+            break
+
+    # Candidates are the students of the courses just moved, walked in id order.
+    after = ""
+    while True:
+        last = conn.execute("SELECT max(id) FROM (SELECT id FROM temp.archive_students WHERE id > ? ORDER BY id LIMIT ?)",
+                            (after, batch_size)).fetchone()[0]
+        if last is None:
+            break
+        moved["students"] += run_batch("""
+            SELECT c.id FROM temp.archive_students c JOIN students s ON s.id = c.id
+            WHERE c.id > ? AND c.id <= ?
+              AND NOT EXISTS (SELECT 1 FROM registrations r WHERE r.student_id = c.id)
+              AND NOT EXISTS (SELECT 1 FROM waitlist w WHERE w.student_id = c.id)
+        """, (after, last), _MOVE_STUDENTS)[0]
+        after = last
+    conn.execute("DELETE FROM temp.archive_students")
+    conn.commit()
+    return moved
+
+
+# Reads. Archived courses keep their instructor, who is still a hot record.
+_ARCHIVED_COURSE_SELECT = """
+    SELECT c.id, c.name, c.instructor_id, NULLIF(i.name, '') AS instructor_name,
+           (SELECT COUNT(*) FROM archive.registrations r WHERE r.course_id = c.id) AS enrolled_count,
+           c.capacity, c.term, 1 AS archived
+    FROM archive.courses c
+    LEFT JOIN instructors i ON i.id = c.instructor_id
+"""
+
+
+def list_students(after: Optional[str] = None, limit: Optional[int] = None, include_archive: bool = False,
+                  mode: str = "dict"):
+    if not include_archive:
+        return db.list_students(after, limit, mode)
+    _require(db.connect())
+    tail, params = db._keyset("id", after, limit)
+    return db._select("""
+        SELECT * FROM (SELECT id, name, age, email, 0 AS archived FROM students
+                       UNION ALL
+                       SELECT id, name, age, email, 1 FROM archive.students)
+    """ + tail, params, mode)
+
+
+def list_courses(after: Optional[str] = None, limit: Optional[int] = None, include_archive: bool = False,
+                 mode: str = "dict"):
+    if not include_archive:
+        return db.list_courses(after, limit, mode)
+    _require(db.connect())
+    tail, params = db._keyset("id", after, limit)
+    return db._select(f"""
+        SELECT * FROM (SELECT *, 0 AS archived FROM ({db._COURSE_SELECT})
+                       UNION ALL
+                       {_ARCHIVED_COURSE_SELECT})
+    """ + tail, params, mode)
+
+
+def list_enrolled(course_id: str, include_archive: bool = False, mode: str = "dict"):
+    """
+Students of a course; with include_archive also the roster of an archived course,
+whose students may themselves be hot or archived.
+"""
+    if not include_archive:
+        return db.list_enrolled(course_id, mode=mode)
+    _require(db.connect())
+    return db._select("""
+        SELECT s.id, s.name, s.age, s.email FROM registrations r
+        JOIN students s ON s.id = r.student_id WHERE r.course_id = ?
+        UNION ALL
+        SELECT r.student_id, IFNULL(s.name, a.name), IFNULL(s.age, a.age), IFNULL(s.email, a.email)
+        FROM archive.registrations r
+        LEFT JOIN students s ON s.id = r.student_id
+        LEFT JOIN archive.students a ON a.id = r.student_id
+        WHERE r.course_id = ?
+        ORDER BY 1
+    """, (course_id, course_id), mode)
+
+
+def get_student(sid: str, include_archive: bool = False) -> Optional[Dict]:
+    s = db.get_student(sid)
+    if s is not None or not include_archive:
+        return s
+    _require(db.connect())
+    r = db.connect().execute("SELECT id, name, age, email FROM archive.students WHERE id=?", (sid,)).fetchone()
+    return {"id": r[0], "name": r[1], "age": r[2], "email": r[3], "archived": 1} if r else None
+
+
+def get_course(cid: str, include_archive: bool = False) -> Optional[Dict]:
+    c = db.get_course(cid)
+    if c is not None or not include_archive:
+        return c
+    _require(db.connect())
+    rows = db._select(_ARCHIVED_COURSE_SELECT + " WHERE c.id = ?", (cid,))
+    return rows[0] if rows else None
+
+
+def search_all(q: str, include_archive: bool = False) -> Dict[str, List[Dict]]:
+    res = db.search_all(q)
+    if not include_archive:
+        return res
+    _require(db.connect())
+    like = f"%{q.lower().strip()}%"
+    students = db._select("""
+        SELECT id, name, age, email, 1 AS archived FROM archive.students
+        WHERE lower(id) LIKE ? OR lower(name) LIKE ? OR lower(email) LIKE ?
+    """, (like, like, like))
+    courses = db._select(_ARCHIVED_COURSE_SELECT + " WHERE lower(c.id) LIKE ? OR lower(c.name) LIKE ?", (like, like))
+    for rows, extra in ((res["students"], students), (res["courses"], courses)):
+        for r in rows:
+            r["archived"] = 0
+        rows.extend(extra)
+        rows.sort(key=lambda r: r["id"])
+    return res
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Move the courses of old terms, and their students, to an archive database.")
+    parser.add_argument("--db", default="school.db")
+    parser.add_argument("--archive", default="school_archive.db")
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument("--keep-terms", type=int, help="archive every term but the N latest")
+    group.add_argument("--terms", nargs="+", help="archive exactly these terms")
+    parser.add_argument("--batch", type=int, default=500, help="courses (or students) per transaction")
+    args = parser.parse_args(argv)
+    db.connect(args.db)
+    db.init_db()
+    attach(args.archive)
+    terms = args.terms if args.terms else terms_older_than(args.keep_terms)
+    print(f"archiving {len(terms)} term(s): {', '.join(terms) or '-'}")
+    moved = archive_terms(terms, args.batch)
+    print(f"moved {moved['courses']} course(s), {moved['registrations']} registration(s), "
+          f"{moved['waitlist']} waitlist entries, {moved['students']} student(s)")
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
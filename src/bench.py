@@ -0,0 +1,1115 @@
+"""
+Benchmarks for the school database layer.
+
+Each benchmark builds its own throwaway database, so nothing touches school.db.
+Run one with: python src/bench.py <name> [options]   (python src/bench.py -h lists them)
+"""
+import argparse
+import http.client
+import os
+import random
+import statistics
+import tempfile
+import threading
+import time
+from typing import Callable, Dict, List
+from urllib.parse import urlsplit
+
+import db
+
+
+def _timeit(fn: Callable, repeat: int = 3) -> float:
+    """
+Run fn a few times and return the best wall time in milliseconds.
+"""
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best * 1000
+
+
+def _fresh_db(name: str) -> str:
+    """
+Point db at a new empty database file in the temp directory and create the schema.
+"""
+    path = os.path.join(tempfile.gettempdir(), f"bench_{name}.db")
+    db.close()
+    for suffix in ("", "-wal", "-shm", "-journal"):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+    db.connect(path)
+    db.init_db()
+    return path
+
+
+def _populate(students: int, instructors: int, courses: int, regs_per_student: int, seed: int = 1):
+    """
+Bulk-load synthetic people, courses and registrations straight through SQL.
+"""
+    rnd = random.Random(seed)
+    conn = db.connect()
+    conn.executemany("INSERT INTO instructors(id, name, age, email) VALUES(?,?,?,?)",
+                     ((f"I{n:06d}", f"Instructor {n}", 30 + n % 40, f"i{n}@school.edu") for n in range(instructors)))
+    conn.executemany("INSERT INTO students(id, name, age, email) VALUES(?,?,?,?)",
+                     ((f"S{n:07d}", f"Student {n}", 17 + n % 10, f"s{n}@school.edu") for n in range(students)))
+    conn.executemany("INSERT INTO courses(id, name, instructor_id) VALUES(?,?,?)",
+                     ((f"C{n:05d}", f"Course {n}", f"I{n % instructors:06d}" if instructors else None)
+                      for n in range(courses)))
+    conn.executemany("INSERT OR IGNORE INTO registrations(student_id, course_id) VALUES(?,?)",
+                     ((f"S{s:07d}", f"C{rnd.randrange(courses):05d}")
+                      for s in range(students) for _ in range(regs_per_student)))
+    conn.commit()
+
+
+def _percentile(samples: List[float], pct: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def _plan(sql: str, params=()) -> List[str]:
+    return [row[3] for row in db.connect().execute("EXPLAIN QUERY PLAN " + sql, params)]
+
+
+def bench_indexes(args):
+    """
+Hot queries with and without indexes: the second run drops every secondary index of
+the tables they read (migration 1's and the later NOCASE and sort indexes alike),
+leaving only the primary keys.
+"""
+    _fresh_db("indexes")
+    _populate(args.students, args.instructors, args.courses, args.regs)
+    conn = db.connect()
+    conn.execute("ANALYZE")
+    sample = [f"C{n:05d}" for n in random.Random(2).sample(range(args.courses), min(50, args.courses))]
+    victims = iter(f"I{n:06d}" for n in range(args.instructors))
+
+    queries = {
+        "list_enrolled x50": lambda: [db.list_enrolled(c) for c in sample],
+        "list_courses": db.list_courses,
+        "email lookup x50": lambda: [conn.execute("SELECT id FROM students WHERE email=?",
+                                                  (f"s{n}@school.edu",)).fetchall() for n in range(50)],
+        "delete_instructor": lambda: db.delete_instructor(next(victims)),
+    }
+    plans = {
+        "list_enrolled": ("SELECT s.id FROM registrations r JOIN students s ON s.id = r.student_id "
+                          "WHERE r.course_id=? ORDER BY r.student_id", (sample[0],)),
+        "enrolled_count": ("SELECT COUNT(*) FROM registrations r WHERE r.course_id=?", (sample[0],)),
+        "email lookup": ("SELECT id FROM students WHERE email=?", ("s1@school.edu",)),
+    }
+
+    def run(label: str):
+        print(f"-- {label}")
+        for name, (sql, params) in plans.items():
+            print(f"   plan {name:<15} {'; '.join(_plan(sql, params))}")
+        for name, fn in queries.items():
+            print(f"   {name:<20} {_timeit(fn, args.repeat):9.2f} ms")
+
+    run(f"schema v{db.schema_version()} (with indexes)")
+    dropped = [r[0] for r in conn.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'index' AND sql IS NOT NULL "
+        "AND tbl_name IN ('students', 'instructors', 'courses', 'registrations')")]
+    conn.executescript("".join(f"DROP INDEX {name};\n" for name in dropped) + "ANALYZE;")
+    run(f"primary keys only ({len(dropped)} indexes dropped)")
+    db.close()
+
+
+def bench_http(args):
+    """
+Load generator for server.py: keep-alive clients issuing a read-heavy mix, reporting
+requests per second and latency percentiles. Starts its own server unless --url is given.
+"""
+    server = None
+    if args.url:
+        target = urlsplit(args.url)
+        host, port = target.hostname, target.port or 80
+    else:
+        import server as school_server
+        path = _fresh_db("http")
+        _populate(args.students, args.instructors, args.courses, args.regs)
+        db.close()
+        server = school_server.make_server(path, port=0, pool_size=args.clients)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        host, port = server.server_address
+
+    rnd = random.Random(3)
+    paths = ([f"/students/S{rnd.randrange(args.students):07d}" for _ in range(200)]
+             + [f"/courses/C{rnd.randrange(args.courses):05d}/students?limit=50" for _ in range(100)]
+             + ["/courses?limit=100", "/students?limit=100"] * 20
+             + [f"/search?q=student%20{rnd.randrange(1000)}" for _ in range(20)])
+    latencies: Dict[str, List[float]] = {}
+    counts = {"requests": 0, "not_modified": 0, "errors": 0}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + args.seconds
+
+    def client(seed: int):
+        crnd = random.Random(seed)
+        conn = http.client.HTTPConnection(host, port)
+        etags: Dict[str, str] = {}
+        local: Dict[str, List[float]] = {}
+        done = not_modified = errors = 0
+        while time.perf_counter() < deadline:
+            path = crnd.choice(paths)
+            headers = {"Accept-Encoding": "gzip"}
+            if path in etags:
+                headers["If-None-Match"] = etags[path]
+            t0 = time.perf_counter()
+            conn.request("GET", path, headers=headers)
+            resp = conn.getresponse()
+            resp.read()
+            elapsed = (time.perf_counter() - t0) * 1000
+            kind = path.split("?")[0].split("/")[1] + ("/students" if path.count("/") > 2 else "")
+            local.setdefault(kind, []).append(elapsed)
+            done += 1
+            if resp.status == 304:
+                not_modified += 1
+            elif resp.status >= 400:
+                errors += 1
+            if resp.getheader("ETag"):
+                etags[path] = resp.getheader("ETag")
+        conn.close()
+        with lock:
+            for kind, samples in local.items():
+                latencies.setdefault(kind, []).extend(samples)
+            counts["requests"] += done
+            counts["not_modified"] += not_modified
+            counts["errors"] += errors
+
+    threads = [threading.Thread(target=client, args=(n,)) for n in range(args.clients)]
+    t0 = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - t0
+    if server:
+        server.shutdown()
+        server.server_close()
+        server.pool.close()
+
+    every = [x for samples in latencies.values() for x in samples]
+    print(f"{args.clients} clients, {elapsed:.1f}s: {counts['requests']} requests, "
+          f"{counts['requests'] / elapsed:.0f} req/s, {counts['not_modified']} not modified, "
+          f"{counts['errors']} errors")
+    print(f"   {'endpoint':<20} {'n':>7} {'p50 ms':>8} {'p99 ms':>8}")
+    for kind, samples in sorted(latencies.items()) + [("all", every)]:
+        print(f"   {kind:<20} {len(samples):>7} {statistics.median(samples):8.2f} "
+              f"{_percentile(samples, 99):8.2f}")
+
+
+def bench_writes(args):
+    """
+Concurrent enrollments: every writer committing on its own connection versus all
+writers submitting to one group-commit WriteQueue.
+"""
+    import writeq
+
+    per_writer = args.writes // args.clients
+    jobs = [[(f"S{(w * per_writer + n) % args.students:07d}", f"C{(w + n * 7) % args.courses:05d}")
+             for n in range(per_writer)] for w in range(args.clients)]
+
+    def setup():
+        path = _fresh_db("writes")
+        _populate(args.students, args.instructors, args.courses, 0)
+        db.close()
+        return path
+
+    path = setup()
+    locked = []
+
+    def direct(pairs):
+        conn = db.open_connection(path, timeout=args.lock_timeout)
+        db.bind_thread(conn)
+        for sid, cid in pairs:
+            try:
+                db.enroll_student(sid, cid)
+            except Exception as e:  # sqlite3.OperationalError: database is locked
+                conn.rollback()
+                locked.append(e)
+        conn.close()
+
+    threads = [threading.Thread(target=direct, args=(pairs,)) for pairs in jobs]
+    t0 = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - t0
+    print(f"direct commits: {args.clients} writers x {per_writer}: {elapsed:.2f}s, "
+          f"{per_writer * args.clients / elapsed:,.0f} writes/s, {len(locked)} lock errors")
+
+    path = setup()
+    failed = []
+    wq = writeq.WriteQueue(path, batch_size=args.batch)
+
+    def queued(pairs):
+        futures = [wq.enroll_student(sid, cid) for sid, cid in pairs]
+        for fut in futures:
+            if fut.exception():
+                failed.append(fut.exception())
+
+    threads = [threading.Thread(target=queued, args=(pairs,)) for pairs in jobs]
+    t0 = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - t0
+    wq.close()
+    print(f"write queue:    {args.clients} writers x {per_writer}: {elapsed:.2f}s, "
+          f"{per_writer * args.clients / elapsed:,.0f} writes/s, {len(failed)} errors, "
+          f"{wq.groups} commits (avg group {wq.writes / max(1, wq.groups):.0f})")
+
+
+def _hot_enroll_worker(job):
+    path, course_id, student_ids = job
+    conn = db.open_connection(path, timeout=60)
+    db.bind_thread(conn)
+    statuses = {}
+    for sid in student_ids:
+        status = db.enroll_student(sid, course_id)
+        statuses[status] = statuses.get(status, 0) + 1
+    conn.close()
+    return statuses
+
+
+def bench_capacity(args):
+    """
+Multi-process stress test of capacity-aware enrollment: every process hammers one
+hot course, then the result is checked for oversubscription and FIFO promotion.
+"""
+    import multiprocessing
+
+    requests = args.hot_requests
+    path = _fresh_db("capacity")
+    _populate(requests, 1, 1, 0)
+    db.connect().execute("PRAGMA journal_mode=WAL")
+    db.set_course_capacity("C00000", args.capacity)
+    db.close()
+
+    ids = [f"S{n:07d}" for n in range(requests)]
+    random.Random(4).shuffle(ids)
+    jobs = [(path, "C00000", ids[w::args.clients * 4]) for w in range(args.clients * 4)]
+    t0 = time.perf_counter()
+    with multiprocessing.Pool(args.clients) as pool:
+        results = pool.map(_hot_enroll_worker, jobs, chunksize=1)
+    elapsed = time.perf_counter() - t0
+
+    totals: Dict[str, int] = {}
+    for statuses in results:
+        for status, n in statuses.items():
+            totals[status] = totals.get(status, 0) + n
+    db.connect(path)
+    enrolled = {s["id"] for s in db.list_enrolled("C00000")}
+    waitlist = [s["id"] for s in db.list_waitlist("C00000")]
+    print(f"{requests} enrollment requests from {args.clients} processes: {elapsed:.2f}s, "
+          f"{requests / elapsed:,.0f} requests/s, {totals}")
+    assert len(enrolled) == args.capacity == totals.get(db.ENROLLED), "course oversubscribed"
+    assert len(waitlist) == requests - args.capacity == totals.get(db.WAITLISTED)
+    assert not enrolled.intersection(waitlist), "student both enrolled and waitlisted"
+
+    dropped = sorted(enrolled)[:min(100, len(enrolled))]
+    for sid in dropped:
+        db.drop_student(sid, "C00000")
+    after = {s["id"] for s in db.list_enrolled("C00000")}
+    assert len(after) == args.capacity, "seats not refilled"
+    assert after - enrolled == set(waitlist[:len(dropped)]), "promotion did not follow waitlist order"
+    print(f"ok: capacity {args.capacity} never exceeded; {len(dropped)} drops promoted the waitlist head in order")
+    db.close()
+
+
+def bench_coenroll(args):
+    """
+Co-enrollment analytics at scale (default: 200k students x 5 = ~1M registrations),
+with NumPy when installed and with the pure-Python fallback.
+"""
+    import analytics
+
+    _fresh_db("coenroll")
+    t0 = time.perf_counter()
+    _populate(args.students, args.instructors, args.courses, args.regs)
+    print(f"populated in {time.perf_counter() - t0:.1f}s")
+    a, b, c = (f"C{n:05d}" for n in range(3))
+    numpy_mod = analytics.np
+    for label, mod in (("numpy", numpy_mod), ("pure python", None)):
+        if label == "numpy" and mod is None:
+            print("-- numpy not installed, skipping")
+            continue
+        analytics.np = mod
+        t0 = time.perf_counter()
+        e = analytics.Enrollments.load()
+        t_load = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        pairs = e.pair_counts()
+        t_pairs = time.perf_counter() - t0
+        t_top = _timeit(lambda: e.top_overlaps(10), 1)
+        t_matrix = _timeit(e.co_enrollment_matrix, 1) if len(e.course_ids) <= 5_000 else float("nan")
+        t_set = _timeit(lambda: e.students_in(all_of=[a], any_of=[b, c], none_of=[c]), args.repeat)
+        n_pairs = len(pairs[0]) if mod is not None else len(pairs)
+        print(f"-- {label}: {len(e):,} registrations, {len(e.course_ids):,} courses, {n_pairs:,} course pairs")
+        print(f"   load {t_load * 1000:9.1f} ms   pair counts {t_pairs * 1000:9.1f} ms   "
+              f"top-10 {t_top:7.1f} ms   dense matrix {t_matrix:7.1f} ms   set query {t_set:7.2f} ms")
+        print(f"   top overlaps: {e.top_overlaps(3)}")
+    analytics.np = numpy_mod
+    db.close()
+
+
+_FIRST_NAMES = """james mary john patricia robert jennifer michael linda william elizabeth david barbara
+richard susan joseph jessica thomas sarah charles karen christopher nancy daniel lisa matthew betty
+anthony margaret mark sandra donald ashley steven kimberly paul emily andrew donna joshua michelle
+kenneth dorothy kevin carol brian amanda george melissa timothy deborah ronald stephanie edward rebecca
+jason sharon jeffrey laura ryan cynthia jacob kathleen gary amy nicholas angela eric shirley jonathan
+anna stephen brenda larry pamela justin emma scott nicole brandon helen benjamin samantha samuel
+katherine gregory christine alexander debra frank rachel patrick carolyn raymond janet jack catherine
+dennis maria jerry heather tyler diane aaron ruth jose julie adam olivia nathan joyce henry virginia
+zachary victoria douglas kelly peter lauren kyle christina noah joan ethan evelyn jeremy judith walter
+megan christian andrea keith cheryl roger hannah terry jacqueline austin martha sean gloria gerald
+teresa carl ann harold sara dylan madison arthur frances lawrence kathryn jordan janice jesse jean
+bryan abigail billy alice bruce judy gabriel sophia joe grace logan denise albert amber willie doris
+alan marilyn juan danielle wayne beverly elijah isabella randy theresa roy diana vincent natalie
+ralph brittany eugene charlotte russell marie bobby kayla mason alexis philip lori""".split()
+_ONSETS = "b br c ch cl d dr f fl g gr h j k kr l m n p pr r s sh sl st t th tr v w z".split()
+_VOWELS = "a e i o u ai ea ie ou y".split()
+_CODAS = ["", "", "n", "r", "l", "s", "t", "ck", "nd", "m", "x", "ng"]
+
+
+def _person_names(count: int, seed: int = 1) -> List[str]:
+    """
+Synthetic "First Last" names: common first names and generated surnames, both with a
+skewed (Zipf-like) spread so that popular names repeat the way they do in a real school.
+"""
+    rnd = random.Random(seed)
+    syllables = [o + v + c for o in _ONSETS for v in _VOWELS for c in _CODAS]
+    surnames = list({"".join(rnd.choice(syllables) for _ in range(rnd.choice((1, 2, 2, 3))))
+                     for _ in range(max(100, count // 20))})
+    surnames.sort()
+    rnd.shuffle(surnames)
+    firsts = rnd.choices(_FIRST_NAMES, [1 / (k + 1) ** 0.7 for k in range(len(_FIRST_NAMES))], k=count)
+    lasts = rnd.choices(surnames, [1 / (k + 1) ** 0.8 for k in range(len(surnames))], k=count)
+    return [f"{f.title()} {l.title()}" for f, l in zip(firsts, lasts)]
+
+
+def _email(name: str, n: int) -> str:
+    first, last = name.lower().split()
+    return f"{first}.{last}{n}@school.edu" if n % 2 else f"{first[0]}{last}{n}@school.edu"
+
+
+def _typo(word: str, rnd: random.Random) -> str:
+    """
+One random edit: drop, double, replace or swap a character.
+"""
+    i = rnd.randrange(len(word))
+    op = rnd.randrange(4)
+    if op == 0 and len(word) > 3:
+        return word[:i] + word[i + 1:]
+    if op == 1:
+        return word[:i] + word[i] + word[i:]
+    if op == 2:
+        return word[:i] + rnd.choice("aeiourstln") + word[i + 1:]
+    i = min(i, len(word) - 2)
+    return word[:i] + word[i + 1] + word[i] + word[i + 2:]
+
+
+def bench_fuzzy(args):
+    """
+Typo-tolerant name search (db.fuzzy_search) over --people students, default one million.
+Queries are real names with one typo; reports latency and how often the intended name is in the top 20.
+"""
+    _fresh_db("fuzzy")
+    conn = db.connect()
+    names = _person_names(args.people)
+    t0 = time.perf_counter()
+    chunk = 100_000
+    for start in range(0, args.people, chunk):
+        conn.executemany("INSERT INTO students(id, name, age, email) VALUES(?,?,?,?)",
+                         ((f"S{n:07d}", names[n], 17 + n % 10, _email(names[n], n))
+                          for n in range(start, min(start + chunk, args.people))))
+        conn.commit()
+    vocab = conn.execute("SELECT COUNT(*) FROM fuzzy_words").fetchone()[0]
+    print(f"loaded {args.people:,} people ({vocab:,} distinct words) in {time.perf_counter() - t0:.1f}s")
+
+    rnd = random.Random(7)
+    queries = []
+    for _ in range(args.queries):
+        n = rnd.randrange(args.people)
+        first, last = names[n].split()
+        queries.append((names[n], f"{first} {_typo(last, rnd)}" if rnd.random() < 0.5 else f"{_typo(last, rnd)} {first}"))
+    db.fuzzy_search(queries[0][1], args.threshold)
+    samples = []
+    found = 0
+    for name, q in queries:
+        t0 = time.perf_counter()
+        hits = db.fuzzy_search(q, args.threshold)
+        samples.append((time.perf_counter() - t0) * 1000)
+        found += any(h["name"] == name for h in hits)
+    print(f"{len(queries)} queries, threshold {args.threshold}: p50 {_percentile(samples, 50):.1f} ms  "
+          f"p95 {_percentile(samples, 95):.1f} ms  max {max(samples):.1f} ms  intended name in top 20: {found / len(queries):.0%}")
+    print(f"e.g. {queries[0][1]!r} -> {[(h['name'], h['score']) for h in db.fuzzy_search(queries[0][1], args.threshold, 3)]}")
+    db.close()
+
+
+def bench_dedup(args):
+    """
+Blocking-based duplicate detection (dedup.find_duplicates) over --students people
+of whom 2% are re-imported: email case changed, name order swapped or a typo in the surname.
+"""
+    import dedup
+    _fresh_db("dedup")
+    conn = db.connect()
+    names = _person_names(args.students)
+    rnd = random.Random(3)
+    rows = [(f"S{n:07d}", names[n], 17 + n % 10, _email(names[n], n)) for n in range(args.students)]
+    planted = set()
+    for n in rnd.sample(range(args.students), args.students // 50):
+        sid, name, age, email = rows[n]
+        first, last = name.split()
+        variant = rnd.randrange(3)
+        if variant == 0:
+            name, email = name, email.upper()
+        elif variant == 1:
+            name = f"{last} {first}"
+        else:
+            name = f"{first} {_typo(last, rnd)}"
+        rows.append((f"D{n:07d}", name, age, email))
+        planted.add((f"D{n:07d}", sid))
+    conn.executemany("INSERT INTO students(id, name, age, email) VALUES(?,?,?,?)", rows)
+    conn.commit()
+    t0 = time.perf_counter()
+    proposals = dedup.find_duplicates()
+    elapsed = time.perf_counter() - t0
+    found = {tuple(sorted((p["keep"], p["duplicate"]))) for p in proposals}
+    hits = len(found & planted)
+    print(f"{len(rows):,} people, {len(planted):,} planted duplicates: {elapsed:.1f}s, {len(proposals):,} proposals, "
+          f"recall {hits / len(planted):.0%}, precision {hits / max(1, len(found)):.0%}")
+    print(f"all pairs would be {len(rows) * (len(rows) - 1) // 2:,} comparisons")
+    db.close()
+
+
+def bench_changes(args):
+    """
+Incremental sync through the change log (db.changes_since) against re-reading every table,
+after --writes changes, plus what logging costs a bulk insert of registrations.
+"""
+    _fresh_db("changes")
+    _populate(args.students, args.instructors, args.courses, args.regs)
+    conn = db.connect()
+    version = db.current_version()
+    rnd = random.Random(4)
+    for n in range(args.writes):
+        sid = f"S{rnd.randrange(args.students):07d}"
+        if n % 2:
+            db.update_student(sid, f"Renamed {n}", 20, f"r{n}@school.edu")
+        else:
+            db.enroll_student(sid, f"C{rnd.randrange(args.courses):05d}")
+
+    def full():
+        db.list_students(); db.list_instructors(); db.list_courses()
+        conn.execute("SELECT student_id, course_id, section_id FROM registrations").fetchall()
+
+    print(f"{args.students:,} students, {args.students * args.regs:,} registrations, {args.writes:,} changes")
+    print(f"   re-read every table   {_timeit(full, args.repeat):9.1f} ms")
+    print(f"   changes_since         {_timeit(lambda: db.changes_since(version), args.repeat):9.1f} ms")
+
+    rows = [(f"S{rnd.randrange(args.students):07d}", f"C{rnd.randrange(args.courses):05d}") for _ in range(50_000)]
+
+    def bulk():
+        conn.executemany("INSERT OR IGNORE INTO registrations(student_id, course_id) VALUES(?,?)", rows)
+        conn.rollback()
+
+    with_log = _timeit(bulk, args.repeat)
+    triggers = [r[0] for r in conn.execute("SELECT sql FROM sqlite_master WHERE name LIKE 'trg_changes_%'")]
+    conn.executescript("".join(f"DROP TRIGGER {r[0]};" for r in
+                               conn.execute("SELECT name FROM sqlite_master WHERE name LIKE 'trg_changes_%'")))
+    print(f"   insert 50k registrations: {with_log:.0f} ms with the change log, "
+          f"{_timeit(bulk, args.repeat):.0f} ms without")
+    conn.executescript(";".join(triggers) + ";")
+    db.close()
+
+
+def bench_results(args):
+    """
+Conversion overhead of each list result mode (db.RESULT_MODES) on list_students over
+--students rows, against the bare sqlite3 fetch.
+"""
+    _fresh_db("results")
+    _populate(args.students, 0, 0, 0)
+    conn = db.connect()
+    sql = "SELECT id, name, age, email FROM students ORDER BY id"
+    fetch = _timeit(lambda: conn.execute(sql).fetchall(), args.repeat)
+    print(f"{args.students:,} students, best of {args.repeat}")
+    print(f"   {'sqlite3 fetchall':<18} {fetch:8.1f} ms")
+    for mode in db.RESULT_MODES:
+        try:
+            ms = _timeit(lambda: db.list_students(mode=mode), args.repeat)
+        except ImportError:
+            print(f"   {mode:<18} (NumPy not installed)")
+            continue
+        print(f"   {mode:<18} {ms:8.1f} ms   conversion {ms - fetch:+8.1f} ms")
+    db.close()
+
+
+def bench_shards(args):
+    """
+--students split across --shards files (shards.ShardedDB) against one file holding them
+all: substring search_all (a scan, fanned out in parallel) and the first page of
+list_students (merged per-shard pages), plus the router's per-shard latency.
+"""
+    import shards
+
+    single = _fresh_db("shards_single")
+    _populate(args.students, 0, 0, 0)
+    db.close()
+    paths = {}
+    for k in range(args.shards):
+        paths[f"s{k}"] = _fresh_db(f"shards_{k}")
+        db.connect().executemany("INSERT INTO students(id, name, age, email) VALUES(?,?,?,?)",
+                                 ((f"S{n:07d}", f"Student {n}", 17 + n % 10, f"s{n}@school.edu")
+                                  for n in range(k, args.students, args.shards)))
+        db.connect().commit()
+        db.close()
+    db.connect(single)
+    q = "nt 12"
+    print(f"{args.students:,} students, {args.shards} shards, best of {args.repeat}")
+    one_search = _timeit(lambda: db.search_all(q), args.repeat)
+    expected = [r["id"] for r in db.search_all(q)["students"]]
+    one_page = _timeit(lambda: db.list_students(limit=100), args.repeat)
+    db.close()
+    with shards.ShardedDB(paths, workers_per_shard=1) as sdb:
+        assert [r["id"] for r in sdb.search_all(q)["students"]] == expected
+        many_search = _timeit(lambda: sdb.search_all(q), args.repeat)
+        many_page = _timeit(lambda: sdb.list_students(limit=100), args.repeat)
+        print(f"   {'':<22} {'1 file':>10} {f'{args.shards} shards':>10}")
+        print(f"   {'search_all':<22} {one_search:8.1f} ms {many_search:8.1f} ms")
+        print(f"   {'list_students(100)':<22} {one_page:8.1f} ms {many_page:8.1f} ms")
+        for name, lat in sdb.latency().items():
+            print(f"   shard {name}: {lat['calls']} calls  p50 {lat['p50_ms']} ms  p95 {lat['p95_ms']} ms  max {lat['max_ms']} ms")
+
+
+def bench_typeahead(args):
+    """
+Filling a selector: every student (the old combo boxes) against db.prefix_search for
+each keystroke of --queries typed names, which the type-ahead selectors run instead.
+"""
+    _fresh_db("typeahead")
+    _populate(args.students, 0, 0, 0)
+    full = _timeit(lambda: [f"{s['id']} – {s['name']}" for s in db.list_students()], args.repeat)
+    rnd = random.Random(5)
+    typed = [f"Student {rnd.randrange(args.students)}" for _ in range(args.queries)]
+    samples = []
+    for name in typed:
+        for n in range(1, len(name) + 1):
+            t0 = time.perf_counter()
+            db.prefix_search("students", name[:n], 50)
+            samples.append((time.perf_counter() - t0) * 1000)
+    print(f"{args.students:,} students")
+    print(f"   load every student        {full:8.1f} ms")
+    print(f"   prefix_search per key     p50 {_percentile(samples, 50):.2f} ms  p95 {_percentile(samples, 95):.2f} ms  "
+          f"max {max(samples):.2f} ms  ({len(samples)} keystrokes)")
+    db.close()
+
+
+def bench_archive(args):
+    """
+Hot-path latency before and after archive.archive_terms. --courses are spread over
+--terms terms and each of --students takes --regs courses within a few neighbouring
+terms, so archiving all but the --keep-terms latest terms retires most of them.
+"""
+    import archive
+
+    path = _fresh_db("archive")
+    archive_path = path.replace(".db", "_cold.db")
+    if os.path.exists(archive_path):
+        os.remove(archive_path)
+    rnd = random.Random(3)
+    terms = [f"{2000 + t // 2}-{'01' if t % 2 == 0 else '09'}" for t in range(args.terms)]
+    conn = db.connect()
+    conn.executemany("INSERT INTO instructors(id, name, age, email) VALUES(?,?,?,?)",
+                     ((f"I{n:06d}", f"Instructor {n}", 30 + n % 40, f"i{n}@school.edu") for n in range(args.instructors)))
+    conn.executemany("INSERT INTO students(id, name, age, email) VALUES(?,?,?,?)",
+                     ((f"S{n:07d}", f"Student {n}", 17 + n % 10, f"s{n}@school.edu") for n in range(args.students)))
+    conn.executemany("INSERT INTO courses(id, name, instructor_id, term) VALUES(?,?,?,?)",
+                     ((f"C{n:05d}", f"Course {n}", f"I{n % args.instructors:06d}", terms[n % args.terms])
+                      for n in range(args.courses)))
+    by_term = [[f"C{n:05d}" for n in range(t, args.courses, args.terms)] for t in range(args.terms)]
+    regs = []
+    for n in range(args.students):
+        start = n * args.terms // args.students   # students enroll in cohorts, oldest ids first
+        for _ in range(args.regs):
+            regs.append((f"S{n:07d}", rnd.choice(by_term[min(args.terms - 1, start + rnd.randrange(3))])))
+    conn.executemany("INSERT OR IGNORE INTO registrations(student_id, course_id) VALUES(?,?)", regs)
+    conn.commit()
+    current = by_term[-1][0]
+
+    def hot_path():
+        return {
+            "list_courses()": _timeit(db.list_courses, args.repeat),
+            "list_students()": _timeit(db.list_students, args.repeat),
+            "search_all('student 12')": _timeit(lambda: db.search_all("student 12"), args.repeat),
+            "count students": _timeit(lambda: conn.execute("SELECT COUNT(*) FROM students").fetchone(), args.repeat),
+            f"list_enrolled({current})": _timeit(lambda: db.list_enrolled(current), args.repeat),
+        }
+
+    before = hot_path()
+    archive.attach(archive_path)
+    t0 = time.perf_counter()
+    moved = archive.archive_terms(archive.terms_older_than(args.keep_terms))
+    print(f"{args.students:,} students, {args.courses:,} courses over {args.terms} terms; archived "
+          f"{moved['courses']:,} courses, {moved['registrations']:,} registrations, {moved['students']:,} students "
+          f"in {time.perf_counter() - t0:.1f}s (keeping {args.keep_terms} terms)")
+    after = hot_path()
+    print(f"   {'':<28} {'before':>10} {'after':>10}")
+    for name in before:
+        print(f"   {name:<28} {before[name]:8.2f} ms {after[name]:8.2f} ms")
+    with_archive = _timeit(lambda: archive.list_students(include_archive=True), args.repeat)
+    print(f"   {'list_students(archive too)':<28} {'':>10} {with_archive:8.2f} ms")
+    db.close()
+
+
+def bench_journal(args):
+    """
+Cost per change of classes.Journal (append a record) vs rewriting the whole
+snapshot with save_to_json, on an object graph of --students/--courses; then
+compaction and load (snapshot + journal replay) times.
+"""
+    import classes
+
+    path = os.path.join(tempfile.gettempdir(), "bench_journal.json")
+    for f in (path, path + ".journal"):
+        if os.path.exists(f):
+            os.remove(f)
+    rnd = random.Random(4)
+    journal = classes.Journal(path, compact_after=10 ** 9)
+    journal.load()
+    for n in range(args.instructors):
+        journal.create(classes.Instructor(f"Instructor {n}", 30 + n % 40, f"i{n}@school.edu", f"I{n:06d}"))
+    for n in range(args.courses):
+        journal.create(classes.Course(f"C{n:05d}", f"Course {n}"))
+        journal.link(journal.courses[f"C{n:05d}"], journal.instructors[f"I{n % args.instructors:06d}"])
+    course_ids = list(journal.courses)
+    for n in range(args.students):
+        s = classes.Student(f"Student {n}", 17 + n % 10, f"s{n}@school.edu", f"S{n:07d}")
+        journal.create(s)
+        for cid in rnd.sample(course_ids, min(args.regs, len(course_ids))):
+            journal.link(journal.courses[cid], journal.students[s.student_id])
+    t0 = time.perf_counter()
+    journal.compact()
+    compact_ms = (time.perf_counter() - t0) * 1000
+    size = os.path.getsize(path)
+
+    students = list(journal.students.values())
+    full = _timeit(lambda: classes.save_to_json(path, students, list(journal.instructors.values()),
+                                                list(journal.courses.values())), args.repeat)
+    journal.compact()
+    changes = min(args.writes, len(students))
+    t0 = time.perf_counter()
+    for s in students[:changes]:
+        s.age = 17 + (s.age + 1) % 10
+        journal.update(s)
+    journal.sync()
+    per_change = (time.perf_counter() - t0) * 1000 / changes
+    journal.close()
+    t0 = time.perf_counter()
+    classes.Journal(path).load()
+    load_ms = (time.perf_counter() - t0) * 1000
+
+    print(f"{args.students:,} students, {args.courses:,} courses, {size / 1e6:.1f} MB snapshot")
+    print(f"   save_to_json per change       {full:10.3f} ms")
+    print(f"   journal append per change     {per_change:10.3f} ms   ({changes:,} changes, fsync every {journal.sync_every})")
+    print(f"   compact                       {compact_ms:10.1f} ms")
+    print(f"   load snapshot + {changes:,} records {load_ms:10.1f} ms")
+
+
+def bench_records(args):
+    """
+The All Records grid sorted by a clicked header: loading every student, instructor
+and course and sorting them in Python (the old grid) against the first and next
+pages of db.query_records, for each sort in both directions.
+"""
+    _fresh_db("records")
+    _populate(args.students, args.instructors, args.courses, args.regs)
+    keys = {"type": None, "id": "id", "name": "name", "age": "age", "email": "email",
+            "instructor": "instructor_name", "enrolled": "enrolled_count", "extra": "email"}
+
+    def load_and_sort(order_by, descending):
+        rows = ([dict(s, type="Student") for s in db.list_students()]
+                + [dict(i, type="Instructor") for i in db.list_instructors()]
+                + [dict(c, type="Course") for c in db.list_courses()])
+        if keys[order_by]:
+            rows.sort(key=lambda r: str(r.get(keys[order_by]) or "").lower(), reverse=descending)
+        return rows
+
+    print(f"{args.students:,} students, {args.instructors:,} instructors, {args.courses:,} courses; "
+          f"pages of {args.page} rows")
+    print(f"   {'sort':<16} {'load+sort':>10} {'first page':>11} {'next page':>10}")
+    for order_by in db.RECORD_SORTS:
+        for descending in (False, True):
+            full = _timeit(lambda: load_and_sort(order_by, descending), args.repeat)
+            first = _timeit(lambda: db.query_records(order_by=order_by, descending=descending, limit=args.page),
+                            args.repeat)
+            cursor = db.query_records(order_by=order_by, descending=descending, limit=args.page)["next"]
+            after = _timeit(lambda: db.query_records(order_by=order_by, descending=descending, after=cursor,
+                                                     limit=args.page), args.repeat)
+            label = order_by + (" desc" if descending else "")
+            print(f"   {label:<16} {full:8.1f} ms {first:8.2f} ms {after:7.2f} ms")
+    db.close()
+
+
+def bench_convert(args):
+    """
+JSON snapshot <-> school.db: convert.py's streaming bulk paths against the object
+path (load_from_json and one db.py call per object in a single transaction; db.py
+list calls into the object graph and save_to_json).
+"""
+    import classes
+    import convert
+
+    path = _fresh_db("convert")
+    _populate(args.students, args.instructors, args.courses, args.regs)
+    db.close()
+    json_path, copy = path.replace(".db", ".json"), path.replace(".db", "_copy.db")
+
+    t0 = time.perf_counter()
+    convert.db_to_json(path, json_path)
+    bulk_out = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    db.connect(path)
+    students = {s["id"]: classes.Student(s["name"], s["age"], s["email"], s["id"]) for s in db.list_students()}
+    instructors = {i["id"]: classes.Instructor(i["name"], i["age"], i["email"], i["id"])
+                   for i in db.list_instructors()}
+    courses = []
+    for c in db.list_courses():
+        course = classes.Course(c["id"], c["name"], instructors.get(c["instructor_id"]))
+        for s in db.list_enrolled(c["id"]):
+            course.add_student(students[s["id"]])
+        courses.append(course)
+    classes.save_to_json(json_path + ".objects", list(students.values()), list(instructors.values()), courses)
+    db.close()
+    object_out = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    counts = convert.json_to_db(json_path, copy, replace=True)
+    bulk_in = time.perf_counter() - t0
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(copy + suffix):
+            os.remove(copy + suffix)
+    t0 = time.perf_counter()
+    db.connect(copy)
+    db.init_db()
+    students, instructors, courses = classes.load_from_json(json_path)
+    with db.deferred_commits():
+        for s in students.values():
+            db.create_student(s.student_id, s.name, s.age, s._email)
+        for i in instructors.values():
+            db.create_instructor(i.instructor_id, i.name, i.age, i._email)
+        for c in courses.values():
+            db.create_course(c.course_id, c.course_name, c.instructor.instructor_id if c.instructor else None)
+            for s in c.enrolled_students:
+                db.enroll_student(s.student_id, c.course_id)
+    db.connect().commit()
+    db.close()
+    object_in = time.perf_counter() - t0
+
+    print(f"{counts['students']:,} students, {counts['instructors']:,} instructors, {counts['courses']:,} courses, "
+          f"{counts['registrations']:,} registrations; JSON {os.path.getsize(json_path) / 1e6:.1f} MB")
+    print(f"   db -> json   object path {object_out * 1000:9.0f} ms   convert.db_to_json {bulk_out * 1000:9.0f} ms")
+    print(f"   json -> db   object path {object_in * 1000:9.0f} ms   convert.json_to_db {bulk_in * 1000:9.0f} ms")
+
+
+def bench_schools(args):
+    """
+One process serving many schools: client threads running a mix of list pages,
+get_student and enrollments against random schools, each school a db.Database
+with per-thread connections, versus the old way of one module connection repointed
+at the requested school under a lock. Checks that every school saw exactly its own
+enrollments.
+"""
+    import sqlite3
+
+    paths = []
+    for n in range(args.schools):
+        paths.append(_fresh_db(f"schools_{n}"))
+        # a different student count per school: get_student of the last id misses on any other file
+        _populate(args.students + n, args.instructors, args.courses, args.regs, seed=n)
+        db.connect().execute("PRAGMA journal_mode = wal")
+    db.close()
+
+    def run(label, call):
+        counts = [0] * args.schools
+        for n, path in enumerate(paths):
+            with db.Database(path) as school:
+                counts[n] = school.connection().execute("SELECT COUNT(*) FROM registrations").fetchone()[0]
+        latencies, misses, locked = [], [], []
+        enrolled = [[0] * args.schools for _ in range(args.clients)]   # per client, summed after
+        deadline = time.perf_counter() + args.seconds
+
+        def client(seed):
+            rnd = random.Random(seed)
+            while time.perf_counter() < deadline:
+                k = rnd.randrange(args.schools)
+                op = rnd.randrange(3)
+                t0 = time.perf_counter()
+                try:
+                    if op == 0:
+                        call(k, "list_students", limit=100)
+                    elif op == 1:
+                        sid = f"S{args.students + k - 1 if rnd.random() < 0.1 else rnd.randrange(args.students):07d}"
+                        if call(k, "get_student", sid) is None:
+                            misses.append(sid)
+                    elif call(k, "enroll_student", f"S{rnd.randrange(args.students):07d}",
+                              f"C{rnd.randrange(args.courses):05d}") == db.ENROLLED:
+                        enrolled[seed][k] += 1
+                except sqlite3.OperationalError as e:  # database is locked
+                    locked.append(e)
+                    continue
+                latencies.append((time.perf_counter() - t0) * 1000)
+
+        threads = [threading.Thread(target=client, args=(n,)) for n in range(args.clients)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        isolated = not misses
+        for n, path in enumerate(paths):
+            with db.Database(path) as school:
+                total = school.connection().execute("SELECT COUNT(*) FROM registrations").fetchone()[0]
+            isolated = isolated and total == counts[n] + sum(c[n] for c in enrolled)
+        print(f"   {label:<28} {len(latencies) / args.seconds:>8,.0f} {_percentile(latencies, 50):>8.2f} "
+              f"{_percentile(latencies, 99):>8.2f} {len(locked):>7} {'yes' if isolated else 'NO':>9}")
+
+    schools = [db.Database(path, timeout=args.lock_timeout) for path in paths]
+
+    def on_instance(k, name, *a, **kw):
+        return getattr(schools[k], name)(*a, **kw)
+
+    lock = threading.Lock()
+
+    def repointed(k, name, *a, **kw):
+        with lock:
+            db.connect(paths[k])
+            return getattr(db, name)(*a, **kw)
+
+    print(f"{args.schools} schools x {args.students:,} students, {args.clients} client threads, {args.seconds:g}s each")
+    print(f"   {'':<28} {'ops/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'locked':>7} {'isolated':>9}")
+    run("Database per school", on_instance)
+    for school in schools:
+        school.close()
+    run("one connection, repointed", repointed)
+    db.close()
+
+
+def _memory_crash_worker(path: str, writes: int):
+    import memdb
+
+    mem = memdb.MemoryDatabase(path, flush_interval=3600)
+    for n in range(writes):
+        mem.create_student(f"X{n:07d}", f"Crash {n}", 20, f"x{n}@school.edu")
+    os._exit(1)   # no close(): the writes are only in the journal
+
+
+def bench_memory(args):
+    """
+Memory mode (memdb.py) against the file: search_all and list_courses latency, write
+latency, the time to load the copy and to flush journaled writes, and recovery of
+writes left unflushed by a killed process.
+"""
+    import multiprocessing
+
+    import memdb
+
+    path = _fresh_db("memory")
+    _populate(args.students, args.instructors, args.courses, args.regs)
+    db.close()
+    rnd = random.Random(1)
+    terms = [f"student {rnd.randrange(1000)}" for _ in range(args.queries)]
+    disk = db.Database(path)
+    disk.list_courses(limit=1)
+    t0 = time.perf_counter()
+    mem = memdb.MemoryDatabase(path, flush_interval=3600)
+    mem.open()
+    load = (time.perf_counter() - t0) * 1000
+
+    def latencies(fn, items):
+        out = []
+        for item in items:
+            t0 = time.perf_counter()
+            fn(item)
+            out.append((time.perf_counter() - t0) * 1000)
+        return out
+
+    print(f"{args.students:,} students, {args.courses:,} courses: copied into memory in {load:.0f} ms")
+    print(f"   {'call':<16} {'disk p50':>9} {'disk p99':>9} {'mem p50':>9} {'mem p99':>9}")
+    def compare(label, call, items):
+        d = latencies(lambda item: call(disk, item), items)
+        m = latencies(lambda item: call(mem, item), items)
+        print(f"   {label:<16} {_percentile(d, 50):>9.3f} {_percentile(d, 99):>9.3f} "
+              f"{_percentile(m, 50):>9.3f} {_percentile(m, 99):>9.3f}")
+
+    writes = min(args.writes, args.students)
+    compare("search_all", lambda h, q: h.search_all(q), terms)
+    compare("list_courses", lambda h, _: h.list_courses(), range(max(10, args.queries // 10)))
+    compare("create_student", lambda h, n: h.create_student(f"{'D' if h is disk else 'M'}{n:07d}", f"New {n}", 20,
+                                                            f"n{n}@school.edu"), range(writes))
+    t0 = time.perf_counter()
+    flushed = mem.flush()
+    print(f"flush of {flushed:,} journaled writes: {(time.perf_counter() - t0) * 1000:.0f} ms")
+    mem.close()
+    disk.close()
+
+    child = multiprocessing.Process(target=_memory_crash_worker, args=(path, writes))
+    child.start()
+    child.join()
+    t0 = time.perf_counter()
+    mem = memdb.MemoryDatabase(path, flush_interval=3600)
+    mem.open()
+    reopen = (time.perf_counter() - t0) * 1000
+    with db.Database(path) as check:
+        on_file = check.connection().execute("SELECT COUNT(*) FROM students WHERE id LIKE 'X%'").fetchone()[0]
+    print(f"process killed after {writes:,} unflushed writes: reopened in {reopen:.0f} ms, "
+          f"{mem.recovered:,} replayed from the journal, {on_file:,} in the file")
+    mem.close()
+
+
+def bench_sync(args):
+    """
+Nightly registrar CSVs with --changed percent of students edited, dropped or new (and
+their enrollments): rostersync.py writing only that delta against deleting every
+student and registration and re-inserting them through create_student and
+enroll_student in one transaction. The first sync of an unchanged export, which only
+records hashes, is timed too.
+"""
+    import csv
+
+    import rostersync
+
+    path = _fresh_db("sync")
+    _populate(args.students, args.instructors, args.courses, args.regs)
+    conn = db.connect()
+    students_csv, enrollments_csv = path.replace(".db", "_students.csv"), path.replace(".db", "_enrollments.csv")
+    rnd = random.Random(1)
+
+    def export(changed: float):
+        share = changed / 100 / 3
+        dropped, new = set(), []
+        with open(students_csv, "w", newline="", encoding="utf-8") as f:
+            out = csv.writer(f)
+            out.writerow(["id", "name", "age", "email"])
+            for sid, name, age, email in conn.execute("SELECT id, name, age, email FROM students ORDER BY id"):
+                roll = rnd.random()
+                if roll < share:
+                    dropped.add(sid)
+                    continue
+                out.writerow([sid, name + " Jr" if roll < 2 * share else name, age, email])
+            for n in range(int(args.students * share)):
+                new.append(f"N{n:07d}")
+                out.writerow([new[-1], f"New {n}", 18, f"new{n}@school.edu"])
+        with open(enrollments_csv, "w", newline="", encoding="utf-8") as f:
+            out = csv.writer(f)
+            out.writerow(["student_id", "course_id"])
+            for sid, cid in conn.execute("SELECT student_id, course_id FROM registrations"):
+                if sid not in dropped and rnd.random() >= share:
+                    out.writerow([sid, cid])
+            for sid in new:
+                out.writerow([sid, f"C{rnd.randrange(args.courses):05d}"])
+
+    def logged():
+        return conn.execute("SELECT IFNULL(MAX(version), 0) FROM change_log").fetchone()[0]
+
+    def show(label, report):
+        print(f"{label}: {report['seconds']:.2f}s")
+        for kind in ("students", "enrollments"):
+            r = report[kind]
+            print(f"   {kind:<12} " + ", ".join(f"{r[k]:,} {k}" for k in r if k != "seconds"))
+
+    registrations = conn.execute("SELECT COUNT(*) FROM registrations").fetchone()[0]
+    print(f"{args.students:,} students, {registrations:,} registrations")
+    export(0)
+    show("first sync (hashes only)", rostersync.sync(students_csv, enrollments_csv))
+    export(args.changed)
+    copy_path = path.replace(".db", "_copy.db")
+    if os.path.exists(copy_path):
+        os.remove(copy_path)
+    target = db.open_connection(copy_path)
+    conn.backup(target)
+    target.close()
+
+    before = logged()
+    show(f"nightly sync, {args.changed:g}% changed", rostersync.sync(students_csv, enrollments_csv))
+    print(f"   change log rows written: {logged() - before:,}")
+
+    db.close()
+    db.connect(copy_path)
+    conn = db.connect()
+    before = logged()
+    t0 = time.perf_counter()
+    conn.execute("BEGIN IMMEDIATE")
+    with db.deferred_commits():
+        conn.execute("DELETE FROM registrations")
+        conn.execute("DELETE FROM students")
+        with open(students_csv, newline="", encoding="utf-8") as f:
+            for sid, name, age, email in list(csv.reader(f))[1:]:
+                db.create_student(sid, name, int(age), email)
+        with open(enrollments_csv, newline="", encoding="utf-8") as f:
+            for sid, cid in list(csv.reader(f))[1:]:
+                db.enroll_student(sid, cid)
+    conn.commit()
+    print(f"delete all + create_student/enroll_student: {time.perf_counter() - t0:.2f}s, "
+          f"change log rows written: {logged() - before:,}")
+    db.close()
+
+
+BENCHMARKS = {
+    "indexes": bench_indexes,
+    "http": bench_http,
+    "writes": bench_writes,
+    "capacity": bench_capacity,
+    "coenroll": bench_coenroll,
+    "fuzzy": bench_fuzzy,
+    "dedup": bench_dedup,
+    "changes": bench_changes,
+    "results": bench_results,
+    "shards": bench_shards,
+    "typeahead": bench_typeahead,
+    "archive": bench_archive,
+    "journal": bench_journal,
+    "records": bench_records,
+    "convert": bench_convert,
+    "schools": bench_schools,
+    "memory": bench_memory,
+    "sync": bench_sync,
+}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("name", choices=sorted(BENCHMARKS))
+    parser.add_argument("--students", type=int, default=20_000)
+    parser.add_argument("--instructors", type=int, default=500)
+    parser.add_argument("--courses", type=int, default=1_000)
+    parser.add_argument("--regs", type=int, default=5, help="registrations per student")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per timing, best one is reported")
+    parser.add_argument("--clients", type=int, default=8, help="concurrent clients/workers")
+    parser.add_argument("--seconds", type=float, default=10, help="duration of timed load runs")
+    parser.add_argument("--writes", type=int, default=4_000, help="total writes for write benchmarks")
+    parser.add_argument("--batch", type=int, default=256, help="writes: WriteQueue batch size")
+    parser.add_argument("--lock-timeout", type=float, default=5.0, help="writes: sqlite busy timeout (s)")
+    parser.add_argument("--hot-requests", type=int, default=10_000, help="capacity: enrollment requests")
+    parser.add_argument("--capacity", type=int, default=500, help="capacity: seats in the hot course")
+    parser.add_argument("--people", type=int, default=1_000_000, help="fuzzy: people to search")
+    parser.add_argument("--queries", type=int, default=300, help="fuzzy, memory: queries to time")
+    parser.add_argument("--threshold", type=float, default=0.3, help="fuzzy: similarity threshold")
+    parser.add_argument("--shards", type=int, default=4, help="shards: database files to split students across")
+    parser.add_argument("--terms", type=int, default=12, help="archive: terms of synthetic history")
+    parser.add_argument("--keep-terms", type=int, default=4, help="archive: latest terms left hot")
+    parser.add_argument("--page", type=int, default=500, help="records: rows per page")
+    parser.add_argument("--changed", type=float, default=1.0, help="sync: percent of students changed per night")
+    parser.add_argument("--schools", type=int, default=8, help="schools: database files served by one process")
+    parser.add_argument("--url", help="http: target an already running server instead of starting one")
+    args = parser.parse_args(argv)
+    BENCHMARKS[args.name](args)
+
+
+if __name__ == "__main__":
+    main()
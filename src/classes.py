@@ -1,8 +1,12 @@
 
 from __future__ import annotations
-from typing import List, Optional, Dict, Tuple
+from contextlib import contextmanager
+from typing import List, Optional, Dict, Tuple, Union
 import json
+import os
 import re
+import tempfile
+import time
 
 
 _EMAIL_RE = re.compile(r"^[^@\s]+@[^@\s]+\.[^@\s]+$")
@@ -115,12 +119,54 @@ class Instructor(Person):
         return i
 
 
+class Section:
+    """
+One weekly meeting pattern of a course. time_slots holds (day, start, end) with
+day 0 (Monday) to 6 and start/end in minutes since midnight.
+"""
+    def __init__(self, section_id: str, course: 'Course'):
+        self.section_id = _validate_nonempty(section_id, "section_id")
+        self.course = course
+        self.time_slots: List[Tuple[int, int, int]] = []
+
+    def add_time_slot(self, day: int, start: int, end: int) -> None:
+        if not isinstance(day, int) or not 0 <= day <= 6:
+            raise ValueError("day must be 0 (Monday) to 6 (Sunday).")
+        if not (isinstance(start, int) and isinstance(end, int)) or not 0 <= start < end <= 24 * 60:
+            raise ValueError("A time slot must start before it ends, within one day.")
+        if any(d == day and s < end and start < e for d, s, e in self.time_slots):
+            raise ValueError("Time slot overlaps another meeting of this section.")
+        self.time_slots.append((day, start, end))
+        self.time_slots.sort()
+
+    def conflicts_with(self, other: 'Section') -> bool:
+        return any(d1 == d2 and s1 < e2 and s2 < e1
+                   for d1, s1, e1 in self.time_slots for d2, s2, e2 in other.time_slots)
+
+    def __repr__(self) -> str:
+        return f"Section({self.section_id}, {self.course.course_id})"
+
+    def to_dict(self) -> dict:
+        return {
+            "section_id": self.section_id,
+            "time_slots": [list(t) for t in self.time_slots],
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict, course: 'Course') -> 'Section':
+        sec = cls(data["section_id"], course)
+        for day, start, end in data.get("time_slots", []):
+            sec.add_time_slot(day, start, end)
+        return sec
+
+
 class Course:
     def __init__(self, course_id: str, course_name: str, instructor: Optional[Instructor] = None):
         self.course_id = _validate_nonempty(course_id, "course_id")
         self.course_name = _validate_nonempty(course_name, "course_name")
         self.instructor: Optional[Instructor] = None
         self.enrolled_students: List[Student] = []
+        self.sections: List[Section] = []
 
         if instructor:
             self.set_instructor(instructor)
@@ -135,6 +181,25 @@ class Course:
             if self not in student.registered_courses:
                 student.register_course(self)
 
+    def remove_student(self, student: Student) -> None:
+        if student in self.enrolled_students:
+            self.enrolled_students.remove(student)
+        if self in student.registered_courses:
+            student.registered_courses.remove(self)
+
+    def remove_instructor(self) -> None:
+        if self.instructor is not None:
+            if self in self.instructor.assigned_courses:
+                self.instructor.assigned_courses.remove(self)
+            self.instructor = None
+
+    def add_section(self, section_id: str) -> Section:
+        if any(sec.section_id == section_id for sec in self.sections):
+            raise ValueError(f"Section {section_id} already exists.")
+        sec = Section(section_id, self)
+        self.sections.append(sec)
+        return sec
+
     def __repr__(self) -> str:
         return f"Course({self.course_id}, {self.course_name})"
 
@@ -144,11 +209,13 @@ class Course:
             "course_name": self.course_name,
             "instructor_id": self.instructor.instructor_id if self.instructor else None,
             "enrolled_students": [s.student_id for s in self.enrolled_students],
+            "sections": [sec.to_dict() for sec in self.sections],
         }
 
     @classmethod
     def from_dict(cls, data: dict) -> 'Course':
         c = cls(course_id=data["course_id"], course_name=data["course_name"], instructor=None)
+        c.sections = [Section.from_dict(sd, c) for sd in data.get("sections", [])]
         return c
 
 
@@ -163,17 +230,41 @@ def save_to_json(
         "instructors": [i.to_dict() for i in instructors],
         "courses": [c.to_dict() for c in courses],
     }
-    with open(path, "w", encoding="utf-8") as f:
+    _write_atomic(path, payload)
+
+
+def _write_atomic(path: str, payload: dict) -> None:
+    with _atomic_open(path) as f:
         json.dump(payload, f, indent=2)
 
 
+@contextmanager
+def _atomic_open(path: str, binary: bool = False):
+    # Write a temp file next to path and rename it over path, so readers (and a
+    # crash) only ever see the old file or the complete new one.
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), prefix=".tmp-",
+                               suffix=os.path.splitext(path)[1])
+    try:
+        with (os.fdopen(fd, "wb") if binary else os.fdopen(fd, "w", encoding="utf-8")) as f:
+            yield f
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
 def load_from_json(path: str) -> Tuple[Dict[str, Student], Dict[str, Instructor], Dict[str, Course]]:
     """
     Returns (students_by_id, instructors_by_id, courses_by_id) with all relationships re-linked.
     """
     with open(path, "r", encoding="utf-8") as f:
         data = json.load(f)
+    return _from_payload(data)
+
 
+def _from_payload(data: dict) -> Tuple[Dict[str, Student], Dict[str, Instructor], Dict[str, Course]]:
     students_by_id: Dict[str, Student] = {}
     instructors_by_id: Dict[str, Instructor] = {}
     courses_by_id: Dict[str, Course] = {}
@@ -208,3 +299,350 @@ def load_from_json(path: str) -> Tuple[Dict[str, Student], Dict[str, Instructor]
 
 
     return students_by_id, instructors_by_id, courses_by_id
+
+
+# Indexed archives: the same JSON document as save_to_json, one record per line, plus a
+# sidecar "<path>.idx" of sorted lines "<kind>\t<json id>\t<offset>\t<length>" giving
+# each record's byte range. The index is binary-searched on disk, so a partial load
+# reads a few small pieces of both files however large the archive is. Each save
+# picks a random generation, stored first in the data file and in the index's header
+# line "#archive\t<generation>\t<data size>"; a reader refuses an index whose header
+# does not match the data file it sits next to.
+
+_ARCHIVE_KEYS = {"students": "student_id", "instructors": "instructor_id", "courses": "course_id"}
+
+def save_archive(
+    path: str,
+    students: List[Student],
+    instructors: List[Instructor],
+    courses: List[Course],
+) -> None:
+    # Both files are replaced atomically, the data first: a crash in between leaves
+    # the new data with the old index, which readers reject by its generation.
+    generation = os.urandom(8).hex().encode("ascii")
+    entries = []
+    with _atomic_open(path, binary=True) as f:
+        f.write(_archive_head(generation))
+        for kind, items in (("students", students), ("instructors", instructors), ("courses", courses)):
+            f.write(b',\n"%s": [' % kind.encode())
+            for m, item in enumerate(items):
+                d = item.to_dict()
+                record = json.dumps(d, separators=(",", ":")).encode("utf-8")
+                f.write(b",\n" if m else b"\n")
+                entries.append((_index_key(kind, d[_ARCHIVE_KEYS[kind]]), f.tell(), len(record)))
+                f.write(record)
+            f.write(b"\n]")
+        f.write(b"}\n")
+        size = f.tell()
+    entries.sort()
+    with _atomic_open(path + ".idx", binary=True) as f:
+        f.write(b"#archive\t%s\t%d\n" % (generation, size))
+        for key, offset, length in entries:
+            f.write(b"%s\t%d\t%d\n" % (key, offset, length))
+
+
+def _archive_head(generation: bytes) -> bytes:
+    return b'{"generation":"%s"' % generation
+
+
+def _index_key(kind: str, entity_id: str) -> bytes:
+    # ensure_ascii keeps tabs and newlines in ids from breaking the line format
+    return f"{kind}\t{json.dumps(entity_id)}".encode("ascii")
+
+
+class _ArchiveReader:
+    def __init__(self, path: str):
+        self._data = open(path, "rb")
+        self._index = open(path + ".idx", "rb")
+        try:
+            header = self._index.readline().rstrip(b"\n").split(b"\t")
+            self._index_start = self._index.tell()
+            self._index.seek(0, 2)
+            self._index_size = self._index.tell()
+            head = _archive_head(header[1]) if len(header) == 3 and header[0] == b"#archive" else None
+            if (head is None or self._data.read(len(head)) != head
+                    or os.fstat(self._data.fileno()).st_size != int(header[2])):
+                raise ValueError(f"{path}.idx does not belong to {path}; save the archive again.")
+        except BaseException:
+            self.close()
+            raise
+
+    def close(self) -> None:
+        self._data.close()
+        self._index.close()
+
+    def _line_at(self, pos: int) -> bytes:
+        # First index line starting at or after pos.
+        if pos:
+            self._index.seek(pos - 1)
+            self._index.readline()
+        else:
+            self._index.seek(0)
+        return self._index.readline()
+
+    def read(self, kind: str, entity_id: str) -> Optional[dict]:
+        key = _index_key(kind, entity_id)
+        lo, hi = self._index_start, self._index_size
+        while lo < hi:
+            mid = (lo + hi) // 2
+            line = self._line_at(mid)
+            if line and line.rsplit(b"\t", 2)[0] < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        parts = self._line_at(lo).rsplit(b"\t", 2)
+        if len(parts) != 3 or parts[0] != key:
+            return None
+        self._data.seek(int(parts[1]))
+        record = json.loads(self._data.read(int(parts[2])))
+        if not isinstance(record, dict) or record.get(_ARCHIVE_KEYS[kind]) != entity_id:
+            raise ValueError(f"Archive index entry for {kind} {entity_id!r} points at another record.")
+        return record
+
+
+def load_from_archive(path: str, course_ids: List[str]) -> Tuple[Dict[str, Student], Dict[str, Instructor], Dict[str, Course]]:
+    """
+    Like load_from_json, but reads only the given courses from an archive written by
+    save_archive, plus the instructors and students they reference. Students'
+    registered_courses only list the loaded courses. Raises KeyError for a course
+    missing from the archive and ValueError when the index does not match the data
+    (e.g. a save interrupted between writing the two files).
+    """
+    reader = _ArchiveReader(path)
+    try:
+        students_by_id: Dict[str, Student] = {}
+        instructors_by_id: Dict[str, Instructor] = {}
+        courses_by_id: Dict[str, Course] = {}
+        for cid in course_ids:
+            cd = reader.read("courses", cid)
+            if cd is None:
+                raise KeyError(f"Course {cid} is not in the archive.")
+            c = courses_by_id[cid] = Course.from_dict(cd)
+
+            inst_id = cd.get("instructor_id")
+            if inst_id:
+                inst = instructors_by_id.get(inst_id)
+                if inst is None:
+                    idd = reader.read("instructors", inst_id)
+                    if idd is not None:
+                        inst = instructors_by_id[inst_id] = Instructor.from_dict(idd)
+                if inst:
+                    c.set_instructor(inst)
+
+            for sid in cd.get("enrolled_students", []):
+                s = students_by_id.get(sid)
+                if s is None:
+                    sd = reader.read("students", sid)
+                    if sd is not None:
+                        s = students_by_id[sid] = Student.from_dict(sd)
+                if s:
+                    c.add_student(s)
+    finally:
+        reader.close()
+    return students_by_id, instructors_by_id, courses_by_id
+
+
+# Journaled persistence: a snapshot in save_to_json's format plus "<path>.journal", one
+# JSON mutation record per line. Every change appends one record instead of rewriting
+# the snapshot; compact() folds the journal into a new snapshot. Records are numbered
+# and the snapshot stores the last number it contains ("journal_seq"), so replay skips
+# records a snapshot already holds if a crash lands between a compaction and the
+# journal truncation.
+
+_KINDS = ((Student, "student", "student_id"), (Instructor, "instructor", "instructor_id"),
+          (Course, "course", "course_id"))
+
+
+def _fields(obj) -> dict:
+    # to_dict() without relationships, which are journaled as link records
+    data = obj.to_dict()
+    for key in ("registered_courses", "assigned_courses", "enrolled_students"):
+        data.pop(key, None)
+    if isinstance(obj, Course):
+        del data["instructor_id"]
+    return data
+
+
+def _kind_of(obj) -> Tuple[str, str]:
+    for cls, kind, key in _KINDS:
+        if isinstance(obj, cls):
+            return kind, getattr(obj, key)
+    raise TypeError(f"Cannot journal {type(obj).__name__} objects.")
+
+
+class Journal:
+    """
+Owns the object graph of one snapshot file and records every change to it.
+
+    journal = Journal("school.json")
+    students, instructors, courses = journal.load()   # snapshot + journal replay
+    journal.create(Student("Ann Lee", 20, "ann@x.org", "S1"))
+    journal.link(courses["C1"], students["S1"])         # enroll (or assign an Instructor)
+    journal.close()                                     # fsync; compact() to fold in
+
+Mutate the graph only through create/update/delete/link/unlink so the journal
+matches it; relationships given to create() are not recorded, use link(). Records
+are written as they happen but fsynced in batches, after sync_every records or
+sync_interval seconds, so an OS crash can lose up to the latest batch; a process
+crash loses nothing. Once the journal holds compact_after records it is compacted
+automatically.
+"""
+    def __init__(self, path: str, sync_every: int = 64, sync_interval: float = 1.0,
+                 compact_after: int = 10_000):
+        self.path = path
+        self.journal_path = path + ".journal"
+        self.sync_every = sync_every
+        self.sync_interval = sync_interval
+        self.compact_after = compact_after
+        self.students: Dict[str, Student] = {}
+        self.instructors: Dict[str, Instructor] = {}
+        self.courses: Dict[str, Course] = {}
+        self.seq = 0
+        self.records = 0
+        self._log = None
+        self._unsynced = 0
+        self._synced_at = time.monotonic()
+
+    def load(self) -> Tuple[Dict[str, Student], Dict[str, Instructor], Dict[str, Course]]:
+        data = {}
+        if os.path.exists(self.path):
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        self.students, self.instructors, self.courses = _from_payload(data)
+        self.seq = data.get("journal_seq", 0)
+        self.records = 0
+        good = 0
+        if os.path.exists(self.journal_path):
+            with open(self.journal_path, "rb") as f:
+                for line in f:
+                    try:
+                        rec = json.loads(line)
+                    except ValueError:
+                        break   # torn tail from a crash mid-append
+                    good += len(line)
+                    if rec["seq"] > self.seq:
+                        self._apply(rec)
+                        self.seq = rec["seq"]
+                    self.records += 1
+        if self._log is not None:
+            self._log.close()
+        self._log = open(self.journal_path, "ab")
+        self._log.truncate(good)
+        return self.students, self.instructors, self.courses
+
+    def _apply(self, rec: dict) -> None:
+        op, kind = rec["op"], rec["kind"]
+        if op == "create":
+            obj = {"student": Student, "instructor": Instructor, "course": Course}[kind].from_dict(rec["data"])
+            self._table(kind)[rec["id"]] = obj
+        elif op == "update":
+            obj, data = self._table(kind)[rec["id"]], rec["data"]
+            if kind == "course":
+                obj.course_name = _validate_nonempty(data["course_name"], "course_name")
+                obj.sections = [Section.from_dict(sd, obj) for sd in data.get("sections", [])]
+            else:
+                obj.name = _validate_nonempty(data["name"], "name")
+                obj.age = _validate_age(data["age"])
+                obj.email = data["_email"]
+        elif op == "delete":
+            obj = self._table(kind).pop(rec["id"])
+            if kind == "student":
+                for c in list(obj.registered_courses):
+                    c.remove_student(obj)
+            elif kind == "instructor":
+                for c in list(obj.assigned_courses):
+                    c.remove_instructor()
+            else:
+                for s in list(obj.enrolled_students):
+                    obj.remove_student(s)
+                obj.remove_instructor()
+        elif op in ("link", "unlink"):
+            course = self.courses[rec["course"]]
+            if kind == "student":
+                student = self.students[rec["id"]]
+                course.add_student(student) if op == "link" else course.remove_student(student)
+            else:
+                course.remove_instructor()
+                if op == "link":
+                    course.set_instructor(self.instructors[rec["id"]])
+        else:
+            raise ValueError(f"Unknown journal operation {op!r}.")
+
+    def _table(self, kind: str) -> dict:
+        return {"student": self.students, "instructor": self.instructors, "course": self.courses}[kind]
+
+    def _append(self, rec: dict) -> None:
+        if self._log is None:
+            raise RuntimeError("Call load() before changing a journaled graph.")
+        self._apply(rec)
+        self.seq += 1
+        rec["seq"] = self.seq
+        self._log.write(json.dumps(rec, separators=(",", ":")).encode("utf-8") + b"\n")
+        self._log.flush()
+        self.records += 1
+        self._unsynced += 1
+        if self._unsynced >= self.sync_every or time.monotonic() - self._synced_at >= self.sync_interval:
+            self.sync()
+        if self.records >= self.compact_after:
+            self.compact()
+
+    def create(self, obj: Union[Student, Instructor, Course]) -> None:
+        kind, obj_id = _kind_of(obj)
+        if obj_id in self._table(kind):
+            raise ValueError(f"{kind.capitalize()} {obj_id} already exists.")
+        self._append({"op": "create", "kind": kind, "id": obj_id, "data": _fields(obj)})
+
+    def update(self, obj: Union[Student, Instructor, Course]) -> None:
+        """
+Record obj's fields (name, age, email, or course_name and sections) as the new
+values of the journaled object with the same id; obj may be that object itself.
+"""
+        kind, obj_id = _kind_of(obj)
+        self._append({"op": "update", "kind": kind, "id": obj_id, "data": _fields(obj)})
+
+    def delete(self, obj: Union[Student, Instructor, Course]) -> None:
+        kind, obj_id = _kind_of(obj)
+        self._append({"op": "delete", "kind": kind, "id": obj_id})
+
+    def link(self, course: Course, person: Union[Student, Instructor]) -> None:
+        kind, person_id = _kind_of(person)
+        self._append({"op": "link", "kind": kind, "course": course.course_id, "id": person_id})
+
+    def unlink(self, course: Course, person: Union[Student, Instructor]) -> None:
+        kind, person_id = _kind_of(person)
+        self._append({"op": "unlink", "kind": kind, "course": course.course_id, "id": person_id})
+
+    def sync(self) -> None:
+        if self._log is not None and self._unsynced:
+            os.fsync(self._log.fileno())
+        self._unsynced = 0
+        self._synced_at = time.monotonic()
+
+    def compact(self) -> None:
+        """
+Write the whole graph as a new snapshot (temp file + rename) and empty the journal.
+"""
+        payload = {
+            "students": [s.to_dict() for s in self.students.values()],
+            "instructors": [i.to_dict() for i in self.instructors.values()],
+            "courses": [c.to_dict() for c in self.courses.values()],
+            "journal_seq": self.seq,
+        }
+        _write_atomic(self.path, payload)
+        if self._log is not None:
+            self._log.truncate(0)
+            os.fsync(self._log.fileno())
+        self.records = 0
+        self._unsynced = 0
+
+    def close(self) -> None:
+        if self._log is not None:
+            self.sync()
+            self._log.close()
+            self._log = None
+
+    def __enter__(self) -> 'Journal':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
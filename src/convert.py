@@ -0,0 +1,350 @@
+"""
+Bulk conversion between classes.py JSON snapshots and school.db, without building
+the object graph or going through db.py one row at a time.
+
+    python src/convert.py to-db school.json school.db [--replace]   # JSON -> new database
+    python src/convert.py to-json school.db school.json             # database -> JSON
+
+to-db streams the JSON records (save_to_json and save_archive files alike) into
+executemany batches inside one transaction. Secondary indexes and triggers are
+dropped for the load and recreated afterwards, and the tables the triggers would
+have maintained (course_stats, instructor_stats, the fuzzy search vocabulary and
+trigrams, the change log) are filled with one set-based statement each. As with
+load_from_json, an unknown instructor_id or enrolled student is skipped. Section ids
+are per course in JSON but global in the database, so section "L1" of course "C1"
+becomes "C1:L1".
+
+to-json walks ordered cursors over the tables in step, writing each record as soon
+as it is complete, in the layout save_to_json writes. Capacity, terms, waitlists and
+schedules have no place in the JSON format and are left out.
+"""
+import argparse
+import json
+import os
+import sqlite3
+import time
+from itertools import groupby
+from typing import Dict, Iterator, Tuple
+
+import classes
+import db
+import maintenance
+
+BATCH_ROWS = 10_000
+READ_CHUNK = 1 << 20
+_KEYS = {"students": "student_id", "instructors": "instructor_id", "courses": "course_id"}
+_INSERTS = {
+    "students": "INSERT INTO students(id, name, age, email) VALUES(?,?,?,?)",
+    "instructors": "INSERT INTO instructors(id, name, age, email) VALUES(?,?,?,?)",
+    "courses": "INSERT INTO courses(id, name, instructor_id) VALUES(?,?,?)",
+    "registrations": "INSERT OR IGNORE INTO registrations(student_id, course_id) VALUES(?,?)",
+    "sections": "INSERT INTO sections(id, course_id) VALUES(?,?)",
+    "section_slots": "INSERT INTO section_slots(section_id, start_min, end_min) VALUES(?,?,?)",
+}
+
+
+class _JsonStream:
+    # Reads {"students": [...], "instructors": [...], "courses": [...]} one array
+    # element at a time; other top-level values are parsed and dropped.
+    def __init__(self, f):
+        self.f = f
+        self.buf = ""
+        self.pos = 0
+        self.decoder = json.JSONDecoder()
+
+    def _more(self) -> bool:
+        chunk = self.f.read(READ_CHUNK)
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        return bool(chunk)
+
+    def _peek(self) -> str:
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in " \t\r\n":
+                self.pos += 1
+            if self.pos < len(self.buf) or not self._more():
+                return self.buf[self.pos:self.pos + 1]
+
+    def _expect(self, chars: str) -> str:
+        ch = self._peek()
+        if not ch or ch not in chars:
+            raise ValueError(f"Not a JSON snapshot: expected {' or '.join(chars)}, found {ch or 'end of file'!r}.")
+        self.pos += 1
+        return ch
+
+    def _value(self):
+        self._peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                if not self._more():
+                    raise
+                continue
+            # a number cut at the chunk boundary still parses: make sure it ended
+            if end < len(self.buf) or isinstance(value, (dict, list, str)) or not self._more():
+                self.pos = end
+                return value
+
+    def records(self) -> Iterator[Tuple[str, dict]]:
+        self._expect("{")
+        if self._peek() == "}":
+            return
+        while True:
+            key = self._value()
+            self._expect(":")
+            if self._peek() == "[":
+                self.pos += 1
+                if self._peek() == "]":
+                    self.pos += 1
+                else:
+                    while True:
+                        yield key, self._value()
+                        if self._expect(",]") == "]":
+                            break
+            else:
+                self._value()
+            if self._expect(",}") == "}":
+                return
+
+
+def iter_json_records(path: str) -> Iterator[Tuple[str, dict]]:
+    """
+(kind, record) for every student, instructor and course of a JSON snapshot, read
+incrementally.
+"""
+    with open(path, "r", encoding="utf-8") as f:
+        for kind, record in _JsonStream(f).records():
+            if kind in _KEYS:
+                yield kind, record
+
+
+def _rebuild_sql() -> str:
+    # Derived tables, as the dropped triggers would have left them after row-by-row inserts.
+    return f"""
+    INSERT INTO course_stats(course_id, instructor_id, enrolled)
+    SELECT c.id, c.instructor_id, IFNULL(r.n, 0) FROM courses c
+    LEFT JOIN (SELECT course_id, COUNT(*) AS n FROM registrations GROUP BY course_id) r ON r.course_id = c.id;
+    INSERT INTO instructor_stats(instructor_id, courses, enrolled)
+    SELECT i.id, COUNT(cs.course_id), IFNULL(SUM(cs.enrolled), 0) FROM instructors i
+    LEFT JOIN course_stats cs ON cs.instructor_id = i.id GROUP BY i.id;
+
+    INSERT OR IGNORE INTO person_words(word, kind, person_id, words)
+    SELECT word, 'student', id, words FROM ({db._fuzzy_words_sql("s", "students")});
+    INSERT OR IGNORE INTO person_words(word, kind, person_id, words)
+    SELECT word, 'instructor', id, words FROM ({db._fuzzy_words_sql("i", "instructors")});
+    INSERT INTO fuzzy_words(word, people) SELECT word, COUNT(*) FROM person_words GROUP BY word;
+    INSERT OR IGNORE INTO word_trigrams(gram, size, word)
+    SELECT substr('  ' || w.word || ' ', n, 3), {db._trigram_count_sql("w.word")}, w.word
+    FROM fuzzy_words w, fuzzy_pos WHERE n <= length(w.word) + 1;
+    INSERT INTO fuzzy_grams(gram, words) SELECT gram, COUNT(*) FROM word_trigrams GROUP BY gram;
+    """ + "".join(f"""
+    INSERT INTO change_log(tbl, k1, k2, op)
+    SELECT '{table}', {cols[0]}, {cols[1] if len(cols) > 1 else "''"}, 'U' FROM {table};"""
+                  for table, cols in db._CHANGE_KEYS.items())
+
+
+def _load(conn: sqlite3.Connection, json_path: str, batch: int) -> Dict[str, int]:
+    pending = {table: [] for table in _INSERTS}
+
+    def add(table: str, row: tuple):
+        rows = pending[table]
+        rows.append(row)
+        if len(rows) >= batch:
+            flush(table)
+
+    def flush(table: str):
+        if pending[table]:
+            conn.executemany(_INSERTS[table], pending[table])
+            pending[table] = []
+
+    # Students may come after the courses that enroll them, and with the indexes gone
+    # every parent insert would scan its child tables for rows waiting on it: foreign
+    # keys are off for the load and checked once before COMMIT.
+    conn.execute("PRAGMA foreign_keys = OFF")
+    conn.execute("BEGIN")
+    schema = conn.execute("""
+        SELECT type, name, sql FROM sqlite_master WHERE type IN ('index', 'trigger') AND sql IS NOT NULL
+    """).fetchall()
+    for kind, name, _ in schema:
+        conn.execute(f'DROP {kind.upper()} "{name}"')
+
+    for kind, r in iter_json_records(json_path):
+        if kind != "courses":
+            add(kind, (r[_KEYS[kind]], r["name"], r["age"], r["_email"]))
+            continue
+        cid = r["course_id"]
+        add("courses", (cid, r["course_name"], r.get("instructor_id") or None))
+        for sid in r.get("enrolled_students", []):
+            add("registrations", (sid, cid))
+        for sec in r.get("sections", []):
+            sec_id = f"{cid}:{sec['section_id']}"
+            add("sections", (sec_id, cid))
+            for day, start, end in sec.get("time_slots", []):
+                add("section_slots", (sec_id, day * 1440 + start, day * 1440 + end))
+    for table in _INSERTS:
+        flush(table)
+
+    # dangling references, which load_from_json skips as well
+    conn.execute("""
+        UPDATE courses SET instructor_id = NULL
+        WHERE instructor_id IS NOT NULL AND instructor_id NOT IN (SELECT id FROM instructors)
+    """)
+    conn.execute("DELETE FROM registrations WHERE student_id NOT IN (SELECT id FROM students)")
+
+    for kind, _, sql in schema:
+        if kind == "index":
+            conn.execute(sql)
+    for statement in _rebuild_sql().split(";"):
+        if statement.strip():
+            conn.execute(statement)
+    for kind, _, sql in schema:
+        if kind == "trigger":
+            conn.execute(sql)
+    broken = conn.execute("PRAGMA foreign_key_check").fetchone()
+    if broken:
+        raise ValueError(f"Row {broken[1]} of {broken[0]} references a missing {broken[2]} row.")
+    conn.commit()
+    conn.execute("PRAGMA foreign_keys = ON")
+    counts = {table: conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0] for table in _INSERTS}
+    conn.execute(f"PRAGMA analysis_limit = {maintenance.ANALYSIS_LIMIT}")
+    conn.execute("ANALYZE")
+    conn.commit()
+    return counts
+
+
+def json_to_db(json_path: str, db_path: str, replace: bool = False, batch: int = BATCH_ROWS) -> Dict[str, int]:
+    """
+Create db_path from a JSON snapshot. The database must not exist yet, unless
+replace is set. Returns the number of rows loaded per table.
+"""
+    if os.path.exists(db_path):
+        if not replace:
+            raise FileExistsError(f"{db_path} already exists (use replace=True to overwrite it).")
+        _remove_db(db_path)
+    conn = db.open_connection(db_path)
+    prev = db.bind_thread(conn)
+    counts = None
+    try:
+        db.init_db()
+        counts = _load(conn, json_path, batch)
+        return counts
+    finally:
+        db.bind_thread(prev)
+        conn.close()
+        if counts is None:
+            _remove_db(db_path)
+
+
+def _remove_db(path: str):
+    for suffix in ("", "-wal", "-shm", "-journal"):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+
+
+def _grouped(cursor) -> Iterator[Tuple[str, list]]:
+    # (key, [rest of each row]) for a cursor ordered by its first column
+    for key, rows in groupby(cursor, key=lambda r: r[0]):
+        yield key, [r[1:] for r in rows]
+
+
+def _merged(parents, *children) -> Iterator[tuple]:
+    # Walk parent rows ordered by their first column with ordered (key, rows) children
+    # in step: a merge join that never holds more than one parent's rows.
+    iters = [iter(c) for c in children]
+    heads = [next(it, None) for it in iters]
+    for parent in parents:
+        out = []
+        for n, it in enumerate(iters):
+            while heads[n] is not None and heads[n][0] < parent[0]:
+                heads[n] = next(it, None)
+            if heads[n] is not None and heads[n][0] == parent[0]:
+                out.append(heads[n][1])
+                heads[n] = next(it, None)
+            else:
+                out.append([])
+        yield (parent, *out)
+
+
+def _course_records(conn: sqlite3.Connection) -> Iterator[dict]:
+    courses = conn.execute("SELECT id, name, instructor_id FROM courses ORDER BY id")
+    rosters = _grouped(conn.execute("SELECT course_id, student_id FROM registrations ORDER BY course_id, student_id"))
+    slots = _grouped(conn.execute("""
+        SELECT s.course_id, s.id, ss.start_min, ss.end_min FROM sections s
+        LEFT JOIN section_slots ss ON ss.section_id = s.id
+        ORDER BY s.course_id, s.id, ss.start_min
+    """))
+    for (cid, name, instructor_id), roster, sections in _merged(courses, rosters, slots):
+        yield {"course_id": cid, "course_name": name, "instructor_id": instructor_id,
+               "enrolled_students": [r[0] for r in roster],
+               "sections": [{"section_id": sec_id[len(cid) + 1:] if sec_id.startswith(cid + ":") else sec_id,
+                             "time_slots": [[start // 1440, start % 1440, end - start // 1440 * 1440]
+                                            for _, start, end in times if start is not None]}
+                            for sec_id, times in groupby(sections, key=lambda r: r[0])]}
+
+
+def _person_records(conn: sqlite3.Connection, kind: str) -> Iterator[dict]:
+    # each person with their registrations or courses, from one join ordered by person
+    key, linked, sql = {
+        "students": ("student_id", "registered_courses", """
+            SELECT p.id, p.name, p.age, p.email, l.course_id FROM students p
+            LEFT JOIN registrations l ON l.student_id = p.id ORDER BY p.id"""),
+        "instructors": ("instructor_id", "assigned_courses", """
+            SELECT p.id, p.name, p.age, p.email, l.id FROM instructors p
+            LEFT JOIN courses l ON l.instructor_id = p.id ORDER BY p.id"""),
+    }[kind]
+    for pid, rows in _grouped(conn.execute(sql)):
+        name, age, email, _ = rows[0]
+        yield {"name": name, "age": age, "_email": email, key: pid,
+               linked: [r[3] for r in rows if r[3] is not None]}
+
+
+def db_to_json(db_path: str, json_path: str) -> Dict[str, int]:
+    """
+Write db_path as a JSON snapshot that load_from_json reads. Returns the number of
+records written per kind.
+"""
+    if not os.path.exists(db_path):
+        raise FileNotFoundError(db_path)
+    conn = db.open_connection(db_path)
+    counts = {}
+    try:
+        with classes._atomic_open(json_path) as f:
+            # the same text json.dump(payload, f, indent=2) writes in save_to_json
+            f.write("{")
+            for n, kind in enumerate(_KEYS):
+                f.write(f'{"," if n else ""}\n  "{kind}": [')
+                counts[kind] = 0
+                for record in (_course_records(conn) if kind == "courses" else _person_records(conn, kind)):
+                    f.write(("," if counts[kind] else "") + "\n    "
+                            + json.dumps(record, indent=2).replace("\n", "\n    "))
+                    counts[kind] += 1
+                f.write("\n  ]" if counts[kind] else "]")
+            f.write("\n}")
+    finally:
+        conn.close()
+    return counts
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Convert between JSON snapshots and school.db.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    to_db = sub.add_parser("to-db", help="load a JSON snapshot into a new database")
+    to_db.add_argument("json")
+    to_db.add_argument("db")
+    to_db.add_argument("--replace", action="store_true", help="overwrite the database if it exists")
+    to_db.add_argument("--batch", type=int, default=BATCH_ROWS, help="rows per executemany batch")
+    to_json = sub.add_parser("to-json", help="write a database out as a JSON snapshot")
+    to_json.add_argument("db")
+    to_json.add_argument("json")
+    args = parser.parse_args(argv)
+    t0 = time.perf_counter()
+    if args.command == "to-db":
+        counts = json_to_db(args.json, args.db, args.replace, args.batch)
+    else:
+        counts = db_to_json(args.db, args.json)
+    print(", ".join(f"{n:,} {table}" for table, n in counts.items()) + f" in {time.perf_counter() - t0:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,21 +1,152 @@
 
-import sqlite3, shutil
-from typing import List, Dict, Optional
+import functools, heapq, inspect, math, os, sqlite3, threading, time, uuid
+from collections import Counter
+from contextlib import contextmanager
+from itertools import repeat
+from operator import itemgetter
+from typing import Any, List, Dict, Optional, Tuple
 
-_DB_PATH = "school.db"
-_CONN: Optional[sqlite3.Connection] = None
+# Connections bound to a single thread (worker pools, Database.use()); see bind_thread().
+_LOCAL = threading.local()
 
-def connect(db_path: str = _DB_PATH):
-    global _CONN, _DB_PATH
-    _DB_PATH = db_path
-    if _CONN is None:
-        _CONN = sqlite3.connect(_DB_PATH)
-        _CONN.execute("PRAGMA foreign_keys = ON;")
-    return _CONN
+def open_connection(db_path: Optional[str] = None, **kwargs) -> sqlite3.Connection:
+    conn = sqlite3.connect(db_path or _DEFAULT.path, **kwargs)
+    conn.execute("PRAGMA foreign_keys = ON;")
+    return conn
+
+def bind_thread(conn: Optional[sqlite3.Connection]) -> Optional[sqlite3.Connection]:
+    """
+Make every db function called on this thread use conn (None unbinds).
+Returns the previously bound connection.
+"""
+    prev = getattr(_LOCAL, "conn", None)
+    _LOCAL.conn = conn
+    return prev
+
+class Database:
+    """
+One school database: its file, connection settings and connections, so that one
+process can serve many schools.
+
+    fall = db.Database("fall.db", timeout=10, pragmas={"journal_mode": "wal"})
+    fall.init_db()
+    fall.create_student("S1", "Ann", 20, "ann@x.io")    # any public db function
+    with fall.use():                                   # or plain db.* calls on this thread
+        db.list_students()
+    fall.close()
+
+Each thread gets its own connection, opened on first use with the instance's
+sqlite3.connect arguments (cached_statements sizes the per-connection prepared
+statement cache) and pragmas. The module-level functions run on default() unless
+a connection is bound to the thread.
+"""
+    CACHED_STATEMENTS = 256   # db.py prepares more distinct statements than sqlite3's default 128
+
+    def __init__(self, path: str = "school.db", pragmas: Optional[Dict[str, Any]] = None, **connect_kwargs):
+        self.path = path
+        self.pragmas = dict(pragmas or {})
+        self.connect_kwargs = dict({"cached_statements": self.CACHED_STATEMENTS}, **connect_kwargs)
+        self._local = threading.local()
+        self._conns: List[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+
+    def connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # used by one thread at a time, but close() may run on another
+            conn = open_connection(self.path, check_same_thread=False, **self.connect_kwargs)
+            for name, value in self.pragmas.items():
+                conn.execute(f"PRAGMA {name} = {value}")
+            self._local.conn = conn
+            with self._lock:
+                self._conns.append(conn)
+        return conn
+
+    def close(self):
+        """
+Close every thread's connection; the next call opens new ones.
+"""
+        with self._lock:
+            conns, self._conns = self._conns, []
+            self._local = threading.local()
+        for conn in conns:
+            conn.close()
+
+    @contextmanager
+    def use(self):
+        prev = bind_thread(self.connection())
+        try:
+            yield self
+        finally:
+            bind_thread(prev)
+
+    def __getattr__(self, name: str):
+        # fall.list_students(...) is db.list_students(...) run inside fall.use(); looked
+        # up per call so wrappers installed later (profiler.enable) apply
+        fn = globals().get(name)
+        if name.startswith("_") or not inspect.isfunction(fn) or fn.__module__ != __name__ or name in _CONNECTION_FUNCTIONS:
+            raise AttributeError(f"{type(self).__name__!r} object has no attribute {name!r}")
+
+        @functools.wraps(fn)
+        def method(*args, **kwargs):
+            return self._call(fn, args, kwargs)
+        return method
+
+    def _call(self, fn, args: tuple, kwargs: dict):
+        with self.use():
+            return fn(*args, **kwargs)
+
+    def __enter__(self) -> "Database":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __repr__(self) -> str:
+        return f"Database({self.path!r})"
+
+# connection plumbing rather than queries: not Database methods, not profiled
+_CONNECTION_FUNCTIONS = {"open_connection", "bind_thread", "connect", "close", "default", "set_default"}
+_DEFAULT = Database()
+
+def default() -> Database:
+    """
+The Database the module-level functions use on threads without a bound connection.
+"""
+    return _DEFAULT
+
+def set_default(database: Database) -> Database:
+    """
+Make database the default (e.g. a memdb.MemoryDatabase for the GUIs); returns the
+previous one, which is left open.
+"""
+    global _DEFAULT
+    prev, _DEFAULT = _DEFAULT, database
+    return prev
+
+def connect(db_path: Optional[str] = None) -> sqlite3.Connection:
+    """
+The connection db functions use on this thread: the one bound with bind_thread() or
+Database.use(), else the default Database's. db_path points the default Database at
+that file (closing its connections to another one).
+"""
+    bound = getattr(_LOCAL, "conn", None)
+    if bound is not None:
+        return bound
+    if db_path is not None and db_path != _DEFAULT.path:
+        _DEFAULT.close()
+        _DEFAULT.path = db_path
+    return _DEFAULT.connection()
+
+def close():
+    _DEFAULT.close()
 
 def init_db():
     conn = connect()
     cur = conn.cursor()
+    # Only takes effect while the file is still empty; older files switch with one
+    # VACUUM (maintenance.enable_incremental_vacuum).
+    cur.execute("PRAGMA auto_vacuum = INCREMENTAL")
     cur.executescript("""
     CREATE TABLE IF NOT EXISTS students (
         id TEXT PRIMARY KEY,
@@ -51,112 +182,1203 @@ def init_db():
     CREATE INDEX IF NOT EXISTS idx_courses_name     ON courses(name);
     """)
     conn.commit()
+    migrate(conn)
+
+# Fuzzy search splits names and email local parts into lowercase words at spaces,
+# digits and the characters below. Triggers cannot use CTEs, so they split text
+# with a join against fuzzy_pos, a table of positions 1..N.
+_FUZZY_SEPARATORS = ".,_-+'\t0123456789"
+_FUZZY_MAX_LEN = 1000
+
+def _fuzzy_words_sql(row: str, table: Optional[str] = None) -> str:
+    # (word, words) for each word of {row}.name and {row}.email, words being the whole
+    # normalized text; with table, (id, word, words) for every row of it.
+    text = f"lower({row}.name || ' ' || substr({row}.email, 1, instr({row}.email || '@', '@') - 1))"
+    for ch in _FUZZY_SEPARATORS:
+        text = f"replace({text}, '{ch.replace(chr(39), chr(39) * 2)}', ' ')"
+    # LIMIT -1 keeps SQLite from flattening the table scan into the join, which would
+    # recompute the normalized text once per position instead of once per row
+    source = f"SELECT id, ' ' || {text} || ' ' AS p FROM {table} AS {row} LIMIT -1" if table else f"SELECT ' ' || {text} || ' ' AS p"
+    return f"""
+        SELECT {"id, " if table else ""}substr(p, n + 1, instr(substr(p, n + 1), ' ') - 1) AS word, p AS words
+        FROM ({source}), fuzzy_pos
+        WHERE n < length(p) AND substr(p, n, 1) = ' ' AND substr(p, n + 1, 1) <> ' '"""
+
+def _trigram_count_sql(word: str) -> str:
+    return f"(SELECT COUNT(DISTINCT substr('  ' || {word} || ' ', n, 3)) FROM fuzzy_pos WHERE n <= length({word}) + 1)"
+
+def _fuzzy_person_triggers(table: str, kind: str) -> str:
+    return f"""
+    CREATE TRIGGER trg_fuzzy_{table}_insert AFTER INSERT ON {table}
+    BEGIN
+        INSERT OR IGNORE INTO person_words(word, kind, person_id, words)
+        SELECT word, '{kind}', NEW.id, words FROM ({_fuzzy_words_sql("NEW")});
+    END;
+
+    CREATE TRIGGER trg_fuzzy_{table}_delete AFTER DELETE ON {table}
+    BEGIN
+        DELETE FROM person_words WHERE kind = '{kind}' AND person_id = OLD.id
+            AND word IN (SELECT word FROM ({_fuzzy_words_sql("OLD")}));
+    END;
+
+    CREATE TRIGGER trg_fuzzy_{table}_update AFTER UPDATE OF name, email ON {table}
+    WHEN OLD.name IS NOT NEW.name OR OLD.email IS NOT NEW.email
+    BEGIN
+        DELETE FROM person_words WHERE kind = '{kind}' AND person_id = OLD.id
+            AND word IN (SELECT word FROM ({_fuzzy_words_sql("OLD")}));
+        INSERT OR IGNORE INTO person_words(word, kind, person_id, words)
+        SELECT word, '{kind}', NEW.id, words FROM ({_fuzzy_words_sql("NEW")});
+    END;
+"""
+
+# Tables covered by the change log (migration 6) and the columns forming their key.
+_CHANGE_KEYS = {
+    "students": ("id",),
+    "instructors": ("id",),
+    "courses": ("id",),
+    "registrations": ("student_id", "course_id"),
+}
+
+def _change_log_triggers(table: str) -> str:
+    # change_log keeps one entry per row, moved to a new version on every change.
+    cols = _CHANGE_KEYS[table]
+    def entry(row: str, op: str, when: str = "") -> str:
+        k1, k2 = f"{row}.{cols[0]}", f"{row}.{cols[1]}" if len(cols) > 1 else "''"
+        return f"""
+        DELETE FROM change_log WHERE tbl = '{table}' AND k1 = {k1} AND k2 = {k2}{" AND " + when if when else ""};
+        INSERT INTO change_log(tbl, k1, k2, op) SELECT '{table}', {k1}, {k2}, '{op}'{" WHERE " + when if when else ""};"""
+    moved = " OR ".join(f"OLD.{c} IS NOT NEW.{c}" for c in cols)
+    return f"""
+    CREATE TRIGGER trg_changes_{table}_insert AFTER INSERT ON {table}
+    BEGIN{entry("NEW", "U")}
+    END;
+
+    CREATE TRIGGER trg_changes_{table}_delete AFTER DELETE ON {table}
+    BEGIN{entry("OLD", "D")}
+    END;
+
+    CREATE TRIGGER trg_changes_{table}_update AFTER UPDATE ON {table}
+    BEGIN{entry("OLD", "D", f"({moved})")}{entry("NEW", "U")}
+    END;
+
+    INSERT INTO change_log(tbl, k1, k2, op)
+    SELECT '{table}', {cols[0]}, {cols[1] if len(cols) > 1 else "''"}, 'U' FROM {table};
+"""
+
+# Schema changes after the base tables above. Each entry is applied once, in order,
+# inside its own transaction; PRAGMA user_version records how many have been applied.
+_MIGRATIONS: List[str] = [
+    # 1: rosters and per-course counts look registrations up by course_id
+    """
+    CREATE INDEX IF NOT EXISTS idx_registrations_course ON registrations(course_id, student_id);
+    CREATE INDEX IF NOT EXISTS idx_students_email       ON students(email);
+    CREATE INDEX IF NOT EXISTS idx_instructors_email    ON instructors(email);
+    CREATE INDEX IF NOT EXISTS idx_courses_instructor   ON courses(instructor_id);
+    """,
+    # 2: course capacity and a FIFO waitlist, promoted by triggers as seats free up
+    """
+    ALTER TABLE courses ADD COLUMN capacity INTEGER CHECK(capacity IS NULL OR capacity >= 0);
+
+    CREATE TABLE waitlist (
+        position INTEGER PRIMARY KEY AUTOINCREMENT,
+        student_id TEXT NOT NULL,
+        course_id TEXT NOT NULL,
+        UNIQUE (course_id, student_id),
+        FOREIGN KEY(student_id) REFERENCES students(id) ON DELETE CASCADE,
+        FOREIGN KEY(course_id) REFERENCES courses(id) ON DELETE CASCADE
+    );
+    CREATE INDEX idx_waitlist_student ON waitlist(student_id);
+
+    CREATE TRIGGER trg_registrations_promote AFTER DELETE ON registrations
+    BEGIN
+        INSERT OR IGNORE INTO registrations(student_id, course_id)
+        SELECT w.student_id, w.course_id FROM waitlist w
+        WHERE w.course_id = OLD.course_id
+          AND (SELECT COUNT(*) FROM registrations r WHERE r.course_id = OLD.course_id)
+              < (SELECT IFNULL(c.capacity, 9e18) FROM courses c WHERE c.id = OLD.course_id)
+        ORDER BY w.position LIMIT 1;
+        DELETE FROM waitlist WHERE course_id = OLD.course_id
+          AND student_id IN (SELECT student_id FROM registrations WHERE course_id = OLD.course_id);
+    END;
+
+    CREATE TRIGGER trg_courses_capacity AFTER UPDATE OF capacity ON courses
+    BEGIN
+        INSERT OR IGNORE INTO registrations(student_id, course_id)
+        SELECT w.student_id, w.course_id FROM waitlist w
+        WHERE w.course_id = NEW.id
+        ORDER BY w.position
+        LIMIT (CASE WHEN NEW.capacity IS NULL THEN -1
+                    ELSE max(0, NEW.capacity - (SELECT COUNT(*) FROM registrations r WHERE r.course_id = NEW.id))
+               END);
+        DELETE FROM waitlist WHERE course_id = NEW.id
+          AND student_id IN (SELECT student_id FROM registrations WHERE course_id = NEW.id);
+    END;
+    """,
+    # 3: reporting aggregates kept current by triggers (see the stats_* functions).
+    # course_stats also remembers each course's instructor so registration triggers can
+    # still find it while a course delete is cascading.
+    """
+    CREATE TABLE course_stats (
+        course_id TEXT PRIMARY KEY,
+        instructor_id TEXT,
+        enrolled INTEGER NOT NULL DEFAULT 0
+    ) WITHOUT ROWID;
+    CREATE INDEX idx_course_stats_instructor ON course_stats(instructor_id);
+
+    CREATE TABLE instructor_stats (
+        instructor_id TEXT PRIMARY KEY,
+        courses INTEGER NOT NULL DEFAULT 0,
+        enrolled INTEGER NOT NULL DEFAULT 0
+    ) WITHOUT ROWID;
+
+    INSERT INTO course_stats(course_id, instructor_id, enrolled)
+    SELECT c.id, c.instructor_id, (SELECT COUNT(*) FROM registrations r WHERE r.course_id = c.id)
+    FROM courses c;
+    INSERT INTO instructor_stats(instructor_id, courses, enrolled)
+    SELECT i.id,
+           (SELECT COUNT(*) FROM course_stats cs WHERE cs.instructor_id = i.id),
+           (SELECT IFNULL(SUM(cs.enrolled), 0) FROM course_stats cs WHERE cs.instructor_id = i.id)
+    FROM instructors i;
+
+    CREATE TRIGGER trg_stats_registration_insert AFTER INSERT ON registrations
+    BEGIN
+        UPDATE course_stats SET enrolled = enrolled + 1 WHERE course_id = NEW.course_id;
+        UPDATE instructor_stats SET enrolled = enrolled + 1
+        WHERE instructor_id = (SELECT instructor_id FROM course_stats WHERE course_id = NEW.course_id);
+    END;
+
+    CREATE TRIGGER trg_stats_registration_delete AFTER DELETE ON registrations
+    BEGIN
+        UPDATE instructor_stats SET enrolled = enrolled - 1
+        WHERE instructor_id = (SELECT instructor_id FROM course_stats WHERE course_id = OLD.course_id);
+        UPDATE course_stats SET enrolled = enrolled - 1 WHERE course_id = OLD.course_id;
+    END;
+
+    CREATE TRIGGER trg_stats_course_insert AFTER INSERT ON courses
+    BEGIN
+        INSERT INTO course_stats(course_id, instructor_id, enrolled) VALUES (NEW.id, NEW.instructor_id, 0);
+        UPDATE instructor_stats SET courses = courses + 1 WHERE instructor_id = NEW.instructor_id;
+    END;
+
+    CREATE TRIGGER trg_stats_course_delete AFTER DELETE ON courses
+    BEGIN
+        UPDATE instructor_stats
+        SET courses = courses - 1,
+            enrolled = enrolled - IFNULL((SELECT enrolled FROM course_stats WHERE course_id = OLD.id), 0)
+        WHERE instructor_id = OLD.instructor_id;
+        DELETE FROM course_stats WHERE course_id = OLD.id;
+    END;
+
+    CREATE TRIGGER trg_stats_course_instructor AFTER UPDATE OF instructor_id ON courses
+    WHEN OLD.instructor_id IS NOT NEW.instructor_id
+    BEGIN
+        UPDATE instructor_stats
+        SET courses = courses - 1,
+            enrolled = enrolled - (SELECT enrolled FROM course_stats WHERE course_id = NEW.id)
+        WHERE instructor_id = OLD.instructor_id;
+        UPDATE instructor_stats
+        SET courses = courses + 1,
+            enrolled = enrolled + (SELECT enrolled FROM course_stats WHERE course_id = NEW.id)
+        WHERE instructor_id = NEW.instructor_id;
+        UPDATE course_stats SET instructor_id = NEW.instructor_id WHERE course_id = NEW.id;
+    END;
+
+    CREATE TRIGGER trg_stats_instructor_insert AFTER INSERT ON instructors
+    BEGIN
+        INSERT INTO instructor_stats(instructor_id, courses, enrolled) VALUES (NEW.id, 0, 0);
+    END;
+
+    CREATE TRIGGER trg_stats_instructor_delete AFTER DELETE ON instructors
+    BEGIN
+        DELETE FROM instructor_stats WHERE instructor_id = OLD.id;
+    END;
+    """,
+    # 4: terms, sections with weekly time slots, and each student's schedule as an
+    # interval index. Times are minutes since Monday 00:00. A student's intervals
+    # never overlap, so a conflict check only needs the nearest interval starting at
+    # or before the new one plus any starting inside it: two index seeks.
+    """
+    ALTER TABLE courses ADD COLUMN term TEXT;
+    CREATE INDEX idx_courses_term ON courses(term);
+
+    CREATE TABLE sections (
+        id TEXT PRIMARY KEY,
+        course_id TEXT NOT NULL,
+        FOREIGN KEY(course_id) REFERENCES courses(id) ON DELETE CASCADE
+    );
+    CREATE INDEX idx_sections_course ON sections(course_id);
+
+    CREATE TABLE section_slots (
+        section_id TEXT NOT NULL,
+        start_min INTEGER NOT NULL,
+        end_min INTEGER NOT NULL,
+        CHECK (0 <= start_min AND start_min < end_min AND end_min <= 10080),
+        PRIMARY KEY (section_id, start_min),
+        FOREIGN KEY(section_id) REFERENCES sections(id) ON DELETE CASCADE
+    ) WITHOUT ROWID;
+
+    ALTER TABLE registrations ADD COLUMN section_id TEXT REFERENCES sections(id) ON DELETE SET NULL;
+    CREATE INDEX idx_registrations_section ON registrations(section_id);
+
+    CREATE TABLE student_schedule (
+        student_id TEXT NOT NULL,
+        start_min INTEGER NOT NULL,
+        end_min INTEGER NOT NULL,
+        section_id TEXT NOT NULL,
+        PRIMARY KEY (student_id, start_min)
+    ) WITHOUT ROWID;
+    CREATE INDEX idx_student_schedule_section ON student_schedule(section_id);
+
+    CREATE TRIGGER trg_schedule_no_overlap BEFORE INSERT ON student_schedule
+    WHEN EXISTS (SELECT 1 FROM (SELECT end_min FROM student_schedule
+                                WHERE student_id = NEW.student_id AND start_min <= NEW.start_min
+                                ORDER BY start_min DESC LIMIT 1)
+                 WHERE end_min > NEW.start_min)
+      OR EXISTS (SELECT 1 FROM student_schedule
+                 WHERE student_id = NEW.student_id AND start_min > NEW.start_min AND start_min < NEW.end_min)
+    BEGIN
+        SELECT RAISE(ABORT, 'schedule conflict');
+    END;
+
+    CREATE TRIGGER trg_schedule_registration_insert AFTER INSERT ON registrations
+    WHEN NEW.section_id IS NOT NULL
+    BEGIN
+        INSERT INTO student_schedule(student_id, start_min, end_min, section_id)
+        SELECT NEW.student_id, start_min, end_min, section_id FROM section_slots WHERE section_id = NEW.section_id;
+    END;
+
+    CREATE TRIGGER trg_schedule_registration_delete AFTER DELETE ON registrations
+    WHEN OLD.section_id IS NOT NULL
+    BEGIN
+        DELETE FROM student_schedule WHERE student_id = OLD.student_id AND section_id = OLD.section_id;
+    END;
+
+    CREATE TRIGGER trg_schedule_registration_section AFTER UPDATE OF section_id ON registrations
+    WHEN OLD.section_id IS NOT NEW.section_id
+    BEGIN
+        DELETE FROM student_schedule WHERE student_id = OLD.student_id AND section_id = OLD.section_id;
+        INSERT INTO student_schedule(student_id, start_min, end_min, section_id)
+        SELECT NEW.student_id, start_min, end_min, section_id FROM section_slots WHERE section_id = NEW.section_id;
+    END;
+
+    CREATE TRIGGER trg_schedule_slot_insert AFTER INSERT ON section_slots
+    BEGIN
+        INSERT INTO student_schedule(student_id, start_min, end_min, section_id)
+        SELECT student_id, NEW.start_min, NEW.end_min, NEW.section_id FROM registrations
+        WHERE section_id = NEW.section_id;
+    END;
+
+    CREATE TRIGGER trg_schedule_slot_delete AFTER DELETE ON section_slots
+    BEGIN
+        DELETE FROM student_schedule WHERE section_id = OLD.section_id AND start_min = OLD.start_min;
+    END;
+    """,
+    # 5: typo-tolerant search (see fuzzy_search). person_words maps every word of a
+    # person's name and email local part to that person, fuzzy_words is the vocabulary
+    # with the number of people using each word, and word_trigrams indexes the
+    # vocabulary by trigram. Names repeat a lot, so the vocabulary is far smaller than
+    # the number of people.
+    f"""
+    CREATE TABLE fuzzy_pos (n INTEGER PRIMARY KEY);
+    WITH RECURSIVE seq(n) AS (SELECT 1 UNION ALL SELECT n + 1 FROM seq WHERE n < {_FUZZY_MAX_LEN})
+    INSERT INTO fuzzy_pos(n) SELECT n FROM seq;
+
+    -- words repeats the person's whole normalized text so that ranking a match needs no
+    -- lookup in students or instructors
+    CREATE TABLE person_words (
+        word TEXT NOT NULL,
+        kind TEXT NOT NULL,
+        person_id TEXT NOT NULL,
+        words TEXT NOT NULL,
+        PRIMARY KEY (word, kind, person_id)
+    ) WITHOUT ROWID;
+
+    CREATE TABLE fuzzy_words (
+        word TEXT PRIMARY KEY,
+        people INTEGER NOT NULL
+    ) WITHOUT ROWID;
+
+    -- size is the word's number of distinct trigrams; lookups only probe the sizes
+    -- that can still reach the requested similarity.
+    CREATE TABLE word_trigrams (
+        gram TEXT NOT NULL,
+        size INTEGER NOT NULL,
+        word TEXT NOT NULL,
+        PRIMARY KEY (gram, size, word)
+    ) WITHOUT ROWID;
+
+    -- how many vocabulary words contain each trigram, so lookups can skip the common ones
+    CREATE TABLE fuzzy_grams (
+        gram TEXT PRIMARY KEY,
+        words INTEGER NOT NULL
+    ) WITHOUT ROWID;
+
+    CREATE TRIGGER trg_fuzzy_word_insert AFTER INSERT ON person_words
+    BEGIN
+        INSERT INTO fuzzy_words(word, people) VALUES (NEW.word, 1)
+            ON CONFLICT(word) DO UPDATE SET people = people + 1;
+    END;
+
+    CREATE TRIGGER trg_fuzzy_word_delete AFTER DELETE ON person_words
+    BEGIN
+        UPDATE fuzzy_words SET people = people - 1 WHERE word = OLD.word;
+        DELETE FROM fuzzy_words WHERE word = OLD.word AND people = 0;
+    END;
+
+    CREATE TRIGGER trg_fuzzy_vocab_insert AFTER INSERT ON fuzzy_words
+    BEGIN
+        INSERT OR IGNORE INTO word_trigrams(gram, size, word)
+        SELECT substr('  ' || NEW.word || ' ', n, 3), {_trigram_count_sql("NEW.word")}, NEW.word
+        FROM fuzzy_pos WHERE n <= length(NEW.word) + 1;
+    END;
+
+    CREATE TRIGGER trg_fuzzy_vocab_delete AFTER DELETE ON fuzzy_words
+    BEGIN
+        DELETE FROM word_trigrams WHERE size = {_trigram_count_sql("OLD.word")} AND word = OLD.word
+            AND gram IN (SELECT substr('  ' || OLD.word || ' ', n, 3) FROM fuzzy_pos WHERE n <= length(OLD.word) + 1);
+    END;
+
+    CREATE TRIGGER trg_fuzzy_gram_insert AFTER INSERT ON word_trigrams
+    BEGIN
+        INSERT INTO fuzzy_grams(gram, words) VALUES (NEW.gram, 1)
+            ON CONFLICT(gram) DO UPDATE SET words = words + 1;
+    END;
+
+    CREATE TRIGGER trg_fuzzy_gram_delete AFTER DELETE ON word_trigrams
+    BEGIN
+        UPDATE fuzzy_grams SET words = words - 1 WHERE gram = OLD.gram;
+        DELETE FROM fuzzy_grams WHERE gram = OLD.gram AND words = 0;
+    END;
+
+    INSERT OR IGNORE INTO person_words(word, kind, person_id, words)
+    SELECT word, 'student', id, words FROM ({_fuzzy_words_sql("s", "students")});
+    INSERT OR IGNORE INTO person_words(word, kind, person_id, words)
+    SELECT word, 'instructor', id, words FROM ({_fuzzy_words_sql("i", "instructors")});
+    """ + _fuzzy_person_triggers("students", "student") + _fuzzy_person_triggers("instructors", "instructor"),
+    # 6: change data capture (see changes_since). Versions come from AUTOINCREMENT, so
+    # they only grow; every existing row is logged once so that version 0 is a full sync.
+    # change_log_pruned holds the highest version removed by prune_changes().
+    """
+    CREATE TABLE change_log (
+        version INTEGER PRIMARY KEY AUTOINCREMENT,
+        tbl TEXT NOT NULL,
+        k1 TEXT NOT NULL,
+        k2 TEXT NOT NULL,
+        op TEXT NOT NULL CHECK (op IN ('U', 'D')),
+        UNIQUE (tbl, k1, k2)
+    );
+
+    CREATE TABLE change_consumers (
+        name TEXT PRIMARY KEY,
+        acked INTEGER NOT NULL
+    ) WITHOUT ROWID;
+
+    CREATE TABLE change_log_pruned (version INTEGER NOT NULL);
+    INSERT INTO change_log_pruned(version) VALUES (0);
+    """ + "".join(map(_change_log_triggers, _CHANGE_KEYS)),
+    # 7: case-insensitive prefix lookups for type-ahead selectors (see prefix_search);
+    # LIKE 'abc%' only uses an index declared with NOCASE.
+    """
+    CREATE INDEX idx_students_id_nocase      ON students(id COLLATE NOCASE);
+    CREATE INDEX idx_students_name_nocase    ON students(name COLLATE NOCASE);
+    CREATE INDEX idx_instructors_id_nocase   ON instructors(id COLLATE NOCASE);
+    CREATE INDEX idx_instructors_name_nocase ON instructors(name COLLATE NOCASE);
+    CREATE INDEX idx_courses_id_nocase       ON courses(id COLLATE NOCASE);
+    CREATE INDEX idx_courses_name_nocase     ON courses(name COLLATE NOCASE);
+    """,
+    # 8: only run waitlist promotion for courses that have a waitlist; its roster
+    # subquery made every registration delete (drops, archiving) scan the roster.
+    """
+    DROP TRIGGER trg_registrations_promote;
+    CREATE TRIGGER trg_registrations_promote AFTER DELETE ON registrations
+    WHEN EXISTS (SELECT 1 FROM waitlist WHERE course_id = OLD.course_id)
+    BEGIN
+        INSERT OR IGNORE INTO registrations(student_id, course_id)
+        SELECT w.student_id, w.course_id FROM waitlist w
+        WHERE w.course_id = OLD.course_id
+          AND (SELECT COUNT(*) FROM registrations r WHERE r.course_id = OLD.course_id)
+              < (SELECT IFNULL(c.capacity, 9e18) FROM courses c WHERE c.id = OLD.course_id)
+        ORDER BY w.position LIMIT 1;
+        DELETE FROM waitlist WHERE course_id = OLD.course_id
+          AND student_id IN (SELECT student_id FROM registrations WHERE course_id = OLD.course_id);
+    END;
+    """,
+    # 9: one row per finished maintenance task (see maintenance.py)
+    """
+    CREATE TABLE maintenance_log (
+        id INTEGER PRIMARY KEY,
+        task TEXT NOT NULL,
+        started_at REAL NOT NULL,
+        duration_ms REAL NOT NULL,
+        steps INTEGER NOT NULL,
+        reclaimed_bytes INTEGER NOT NULL,
+        detail TEXT
+    );
+    CREATE INDEX idx_maintenance_log_task ON maintenance_log(task, started_at);
+    """,
+    # 10: sorted and filtered pages of the All Records grid (see query_records); the
+    # name indexes gain id as the tie-breaker of every sort.
+    """
+    DROP INDEX idx_students_name_nocase;
+    DROP INDEX idx_instructors_name_nocase;
+    DROP INDEX idx_courses_name_nocase;
+    CREATE INDEX idx_students_name_nocase     ON students(name COLLATE NOCASE, id);
+    CREATE INDEX idx_instructors_name_nocase  ON instructors(name COLLATE NOCASE, id);
+    CREATE INDEX idx_courses_name_nocase      ON courses(name COLLATE NOCASE, id);
+    CREATE INDEX idx_students_age             ON students(age, id);
+    CREATE INDEX idx_instructors_age          ON instructors(age, id);
+    CREATE INDEX idx_students_email_nocase    ON students(email COLLATE NOCASE, id);
+    CREATE INDEX idx_instructors_email_nocase ON instructors(email COLLATE NOCASE, id);
+    CREATE INDEX idx_students_email_domain    ON students(lower(substr(email, instr(email, '@') + 1)));
+    CREATE INDEX idx_instructors_email_domain ON instructors(lower(substr(email, instr(email, '@') + 1)));
+    CREATE INDEX idx_course_stats_enrolled    ON course_stats(enrolled, course_id);
+    """,
+    # 11: the last write-behind journal entry applied to this file (see memdb.py)
+    """
+    CREATE TABLE write_behind (id INTEGER PRIMARY KEY CHECK (id = 1), seq INTEGER NOT NULL);
+    INSERT INTO write_behind VALUES (1, 0);
+    """,
+    # 12: content hash of each student's row in the last registrar CSV synced (see rostersync.py)
+    """
+    CREATE TABLE sync_hashes (student_id TEXT PRIMARY KEY, hash BLOB NOT NULL) WITHOUT ROWID;
+    """,
+    # 13: a student's schedule is per term, so meetings in different terms never clash:
+    # student_schedule is keyed by (student_id, term, start_min), term '' for courses
+    # without one, and the migration 4 triggers are rebuilt to fill it in.
+    """
+    DROP TRIGGER trg_schedule_no_overlap;
+    DROP TRIGGER trg_schedule_registration_insert;
+    DROP TRIGGER trg_schedule_registration_delete;
+    DROP TRIGGER trg_schedule_registration_section;
+    DROP TRIGGER trg_schedule_slot_insert;
+    DROP TRIGGER trg_schedule_slot_delete;
+    DROP TABLE student_schedule;
+
+    CREATE TABLE student_schedule (
+        student_id TEXT NOT NULL,
+        term TEXT NOT NULL,
+        start_min INTEGER NOT NULL,
+        end_min INTEGER NOT NULL,
+        section_id TEXT NOT NULL,
+        PRIMARY KEY (student_id, term, start_min)
+    ) WITHOUT ROWID;
+    CREATE INDEX idx_student_schedule_section ON student_schedule(section_id);
+
+    INSERT INTO student_schedule(student_id, term, start_min, end_min, section_id)
+    SELECT r.student_id, coalesce(c.term, ''), sl.start_min, sl.end_min, sl.section_id
+    FROM registrations r
+    JOIN sections s ON s.id = r.section_id
+    JOIN courses c ON c.id = s.course_id
+    JOIN section_slots sl ON sl.section_id = r.section_id
+    WHERE true
+    ON CONFLICT DO NOTHING;
+
+    CREATE TRIGGER trg_schedule_no_overlap BEFORE INSERT ON student_schedule
+    WHEN EXISTS (SELECT 1 FROM (SELECT end_min FROM student_schedule
+                                WHERE student_id = NEW.student_id AND term = NEW.term AND start_min <= NEW.start_min
+                                ORDER BY start_min DESC LIMIT 1)
+                 WHERE end_min > NEW.start_min)
+      OR EXISTS (SELECT 1 FROM student_schedule
+                 WHERE student_id = NEW.student_id AND term = NEW.term
+                   AND start_min > NEW.start_min AND start_min < NEW.end_min)
+    BEGIN
+        SELECT RAISE(ABORT, 'schedule conflict');
+    END;
+
+    CREATE TRIGGER trg_schedule_registration_insert AFTER INSERT ON registrations
+    WHEN NEW.section_id IS NOT NULL
+    BEGIN
+        INSERT INTO student_schedule(student_id, term, start_min, end_min, section_id)
+        SELECT NEW.student_id, coalesce(c.term, ''), sl.start_min, sl.end_min, sl.section_id
+        FROM section_slots sl JOIN sections s ON s.id = sl.section_id JOIN courses c ON c.id = s.course_id
+        WHERE sl.section_id = NEW.section_id;
+    END;
+
+    CREATE TRIGGER trg_schedule_registration_delete AFTER DELETE ON registrations
+    WHEN OLD.section_id IS NOT NULL
+    BEGIN
+        DELETE FROM student_schedule WHERE student_id = OLD.student_id AND section_id = OLD.section_id;
+    END;
+
+    CREATE TRIGGER trg_schedule_registration_section AFTER UPDATE OF section_id ON registrations
+    WHEN OLD.section_id IS NOT NEW.section_id
+    BEGIN
+        DELETE FROM student_schedule WHERE student_id = OLD.student_id AND section_id = OLD.section_id;
+        INSERT INTO student_schedule(student_id, term, start_min, end_min, section_id)
+        SELECT NEW.student_id, coalesce(c.term, ''), sl.start_min, sl.end_min, sl.section_id
+        FROM section_slots sl JOIN sections s ON s.id = sl.section_id JOIN courses c ON c.id = s.course_id
+        WHERE sl.section_id = NEW.section_id;
+    END;
+
+    CREATE TRIGGER trg_schedule_slot_insert AFTER INSERT ON section_slots
+    BEGIN
+        INSERT INTO student_schedule(student_id, term, start_min, end_min, section_id)
+        SELECT r.student_id, coalesce(c.term, ''), NEW.start_min, NEW.end_min, NEW.section_id
+        FROM registrations r JOIN sections s ON s.id = r.section_id JOIN courses c ON c.id = s.course_id
+        WHERE r.section_id = NEW.section_id;
+    END;
+
+    CREATE TRIGGER trg_schedule_slot_delete AFTER DELETE ON section_slots
+    BEGIN
+        DELETE FROM student_schedule WHERE section_id = OLD.section_id AND start_min = OLD.start_min;
+    END;
+
+    CREATE TRIGGER trg_schedule_course_term AFTER UPDATE OF term ON courses
+    WHEN OLD.term IS NOT NEW.term
+    BEGIN
+        UPDATE student_schedule SET term = coalesce(NEW.term, '')
+        WHERE section_id IN (SELECT id FROM sections WHERE course_id = NEW.id);
+    END;
+    """,
+    # 14: when each change consumer last acknowledged (unix seconds), so consumers that
+    # stopped acknowledging can be expired (see CHANGE_CONSUMER_TTL)
+    """
+    ALTER TABLE change_consumers ADD COLUMN acked_at REAL NOT NULL DEFAULT 0;
+    UPDATE change_consumers SET acked_at = CAST(strftime('%s', 'now') AS REAL);
+    """,
+]
+
+def schema_version(conn: Optional[sqlite3.Connection] = None) -> int:
+    conn = conn or connect()
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+def migrate(conn: Optional[sqlite3.Connection] = None) -> int:
+    conn = conn or connect()
+    current = schema_version(conn)
+    if current > len(_MIGRATIONS):
+        raise RuntimeError(f"Database schema version {current} is newer than this program supports.")
+    for version in range(current + 1, len(_MIGRATIONS) + 1):
+        try:
+            conn.executescript(f"BEGIN;\n{_MIGRATIONS[version - 1]}\nPRAGMA user_version = {version};\nCOMMIT;")
+        except Exception:
+            conn.rollback()
+            raise
+    return len(_MIGRATIONS)
+
+
+def _commit(conn: sqlite3.Connection):
+    if not getattr(_LOCAL, "deferred", False):
+        conn.commit()
+
+@contextmanager
+def deferred_commits():
+    """
+Inside the block, write functions called on this thread do not commit;
+the caller owns the transaction (used for group commit, see writeq.py).
+"""
+    prev = getattr(_LOCAL, "deferred", False)
+    _LOCAL.deferred = True
+    try:
+        yield
+    finally:
+        _LOCAL.deferred = prev
+
+def _keyset(key: str, after: Optional[str], limit: Optional[int], where: str = "") -> Tuple[str, list]:
+    # WHERE/ORDER BY/LIMIT tail for paging by key: pass the last key of a page as `after`.
+    clauses = [where] if where else []
+    params: list = []
+    if after is not None:
+        clauses.append(f"{key} > ?")
+        params.append(after)
+    sql = (" WHERE " + " AND ".join(clauses) if clauses else "") + f" ORDER BY {key}"
+    if limit is not None:
+        sql += " LIMIT ?"
+        params.append(int(limit))
+    return sql, params
+
+# Shapes the list_* functions can return, chosen per call with mode=:
+#   "dict"     a list of dicts (the default)
+#   "tuple"    a list of plain tuples in column order, straight from sqlite3
+#   "row"      a list of sqlite3.Row, indexable by position or column name, keys shared
+#   "columns"  {column: list of values}, one list per column
+#   "numpy"    {column: NumPy array}, needs NumPy
+RESULT_MODES = ("dict", "tuple", "row", "columns", "numpy")
+
+def _select(sql: str, params, mode: str = "dict"):
+    if mode not in RESULT_MODES:
+        raise ValueError(f"mode must be one of {', '.join(RESULT_MODES)}.")
+    cur = connect().cursor()
+    if mode == "row":
+        cur.row_factory = sqlite3.Row
+    rows = cur.execute(sql, params).fetchall()
+    if mode in ("tuple", "row"):
+        return rows
+    names = [d[0] for d in cur.description]
+    if mode == "dict":
+        return list(map(dict, map(zip, repeat(names), rows)))
+    columns = [list(map(itemgetter(n), rows)) for n in range(len(names))]
+    if mode == "columns":
+        return dict(zip(names, columns))
+    import numpy as np  # optional dependency, only for this mode
+    out = {}
+    for name, col in zip(names, columns):
+        # Numbers become int64/float64 arrays; text and NULLs stay Python objects.
+        types = set(map(type, col))
+        dtype = np.int64 if types == {int} else np.float64 if types and types <= {int, float} else object
+        out[name] = np.array(col, dtype=dtype)
+    return out
 
 
 def create_student(sid: str, name: str, age: int, email: str):
     conn = connect()
     conn.execute("INSERT INTO students(id, name, age, email) VALUES(?,?,?,?)",
                  (sid.strip(), name.strip(), int(age), email.strip()))
-    conn.commit()
+    _commit(conn)
 
-def list_students() -> List[Dict]:
+def list_students(after: Optional[str] = None, limit: Optional[int] = None, mode: str = "dict"):
+    tail, params = _keyset("id", after, limit)
+    return _select("SELECT id, name, age, email FROM students" + tail, params, mode)
+
+def get_student(sid: str) -> Optional[Dict]:
     conn = connect()
-    rows = conn.execute("SELECT id, name, age, email FROM students ORDER BY id").fetchall()
-    return [{"id": r[0], "name": r[1], "age": r[2], "email": r[3]} for r in rows]
+    r = conn.execute("SELECT id, name, age, email FROM students WHERE id=?", (sid,)).fetchone()
+    return {"id": r[0], "name": r[1], "age": r[2], "email": r[3]} if r else None
 
 def update_student(sid: str, name: str, age: int, email: str):
     conn = connect()
     conn.execute("UPDATE students SET name=?, age=?, email=? WHERE id=?",
                  (name.strip(), int(age), email.strip(), sid))
-    conn.commit()
+    _commit(conn)
 
 def delete_student(sid: str):
     conn = connect()
     conn.execute("DELETE FROM students WHERE id=?", (sid,))
-    conn.commit()
+    _commit(conn)
 
 
 def create_instructor(iid: str, name: str, age: int, email: str):
     conn = connect()
     conn.execute("INSERT INTO instructors(id, name, age, email) VALUES(?,?,?,?)",
                  (iid.strip(), name.strip(), int(age), email.strip()))
-    conn.commit()
+    _commit(conn)
+
+def list_instructors(after: Optional[str] = None, limit: Optional[int] = None, mode: str = "dict"):
+    tail, params = _keyset("id", after, limit)
+    return _select("SELECT id, name, age, email FROM instructors" + tail, params, mode)
 
-def list_instructors() -> List[Dict]:
+def get_instructor(iid: str) -> Optional[Dict]:
     conn = connect()
-    rows = conn.execute("SELECT id, name, age, email FROM instructors ORDER BY id").fetchall()
-    return [{"id": r[0], "name": r[1], "age": r[2], "email": r[3]} for r in rows]
+    r = conn.execute("SELECT id, name, age, email FROM instructors WHERE id=?", (iid,)).fetchone()
+    return {"id": r[0], "name": r[1], "age": r[2], "email": r[3]} if r else None
 
 def update_instructor(iid: str, name: str, age: int, email: str):
     conn = connect()
     conn.execute("UPDATE instructors SET name=?, age=?, email=? WHERE id=?",
                  (name.strip(), int(age), email.strip(), iid))
-    conn.commit()
+    _commit(conn)
 
 def delete_instructor(iid: str):
     conn = connect()
     conn.execute("DELETE FROM instructors WHERE id=?", (iid,))
-    conn.commit()
+    _commit(conn)
+
+def merge_people(kind: str, keep_id: str, duplicate_id: str) -> Dict:
+    """
+Fold duplicate_id into keep_id and delete it, in one transaction. kind is "student"
+or "instructor" (as in fuzzy_search). A student's registrations and waitlist places
+move to keep_id unless keep_id already has them; a moved registration keeps its
+section when it fits keep_id's schedule and loses it otherwise. An instructor's
+courses are reassigned. Returns what moved (see dedup.py for finding duplicates).
+"""
+    if kind not in ("student", "instructor"):
+        raise ValueError("kind must be 'student' or 'instructor'.")
+    if keep_id == duplicate_id:
+        raise ValueError("Cannot merge a record into itself.")
+    conn = connect()
+    if not conn.in_transaction:
+        conn.execute("BEGIN IMMEDIATE")
+    try:
+        for pid in (keep_id, duplicate_id):
+            if not conn.execute(f"SELECT 1 FROM {kind}s WHERE id=?", (pid,)).fetchone():
+                raise ValueError(f"{kind.capitalize()} {pid} not found.")
+        if kind == "instructor":
+            cur = conn.execute("UPDATE courses SET instructor_id=? WHERE instructor_id=?", (keep_id, duplicate_id))
+            moved = {"courses": cur.rowcount}
+        else:
+            moved = {"registrations": 0, "waitlist": 0, "sections_dropped": []}
+            held = dict(conn.execute("SELECT course_id, section_id FROM registrations WHERE student_id=?",
+                                     (keep_id,)).fetchall())
+            for course_id, section_id in conn.execute(
+                    "SELECT course_id, section_id FROM registrations WHERE student_id=? ORDER BY course_id",
+                    (duplicate_id,)).fetchall():
+                fits = section_id is not None and not _schedule_conflicts(conn, keep_id, section_id)
+                if course_id not in held:
+                    # Added before the duplicate's seat is released, so no waitlisted
+                    # student is promoted into it.
+                    conn.execute("INSERT INTO registrations(student_id, course_id, section_id) VALUES(?,?,?)",
+                                 (keep_id, course_id, section_id if fits else None))
+                    moved["registrations"] += 1
+                    if section_id is not None and not fits:
+                        moved["sections_dropped"].append(course_id)
+                elif held[course_id] is None and fits:
+                    conn.execute("UPDATE registrations SET section_id=? WHERE student_id=? AND course_id=?",
+                                 (section_id, keep_id, course_id))
+            conn.execute("""
+                DELETE FROM waitlist WHERE student_id = :keep
+                  AND (course_id IN (SELECT course_id FROM registrations WHERE student_id = :keep)
+                       OR position > (SELECT d.position FROM waitlist d
+                                      WHERE d.student_id = :dup AND d.course_id = waitlist.course_id))
+            """, {"keep": keep_id, "dup": duplicate_id})
+            cur = conn.execute("""
+                UPDATE OR IGNORE waitlist SET student_id = :keep WHERE student_id = :dup
+                  AND course_id NOT IN (SELECT course_id FROM registrations WHERE student_id = :keep)
+            """, {"keep": keep_id, "dup": duplicate_id})
+            moved["waitlist"] = cur.rowcount
+        conn.execute(f"DELETE FROM {kind}s WHERE id=?", (duplicate_id,))
+    except Exception:
+        if not getattr(_LOCAL, "deferred", False):
+            conn.rollback()
+        raise
+    _commit(conn)
+    return moved
+
 
+_COURSE_SELECT = """
+    SELECT c.id, c.name, c.instructor_id, NULLIF(i.name, '') AS instructor_name,
+           IFNULL(cs.enrolled, 0) AS enrolled_count, c.capacity, c.term
+    FROM courses c
+    LEFT JOIN instructors i ON i.id = c.instructor_id
+    LEFT JOIN course_stats cs ON cs.course_id = c.id
+"""
 
-def create_course(cid: str, name: str, instructor_id: Optional[str] = None):
+def _course_dict(r) -> Dict:
+    return {
+        "id": r[0], "name": r[1],
+        "instructor_id": r[2],
+        "instructor_name": r[3],
+        "enrolled_count": r[4],
+        "capacity": r[5],
+        "term": r[6],
+    }
+
+def create_course(cid: str, name: str, instructor_id: Optional[str] = None, capacity: Optional[int] = None,
+                  term: Optional[str] = None):
     conn = connect()
-    conn.execute("INSERT INTO courses(id, name, instructor_id) VALUES(?,?,?)",
-                 (cid.strip(), name.strip(), instructor_id))
-    conn.commit()
+    conn.execute("INSERT INTO courses(id, name, instructor_id, capacity, term) VALUES(?,?,?,?,?)",
+                 (cid.strip(), name.strip(), instructor_id, None if capacity is None else int(capacity),
+                  term.strip() if term else None))
+    _commit(conn)
+
+def list_courses(after: Optional[str] = None, limit: Optional[int] = None, mode: str = "dict"):
+    tail, params = _keyset("c.id", after, limit)
+    return _select(_COURSE_SELECT + tail, params, mode)
 
-def list_courses() -> List[Dict]:
+def get_course(cid: str) -> Optional[Dict]:
     conn = connect()
-    rows = conn.execute("""
-        SELECT c.id, c.name, c.instructor_id, i.name
-        FROM courses c
-        LEFT JOIN instructors i ON i.id = c.instructor_id
-        ORDER BY c.id
-    """).fetchall()
-    out = []
-    for cid, cname, inst_id, inst_name in rows:
-        n = conn.execute("SELECT COUNT(*) FROM registrations WHERE course_id=?", (cid,)).fetchone()[0]
-        out.append({
-            "id": cid, "name": cname,
-            "instructor_id": inst_id,
-            "instructor_name": inst_name if inst_name else None,
-            "enrolled_count": n
-        })
-    return out
+    r = conn.execute(_COURSE_SELECT + " WHERE c.id=?", (cid,)).fetchone()
+    return _course_dict(r) if r else None
 
 def update_course(cid: str, name: str, instructor_id: Optional[str]):
     conn = connect()
     conn.execute("UPDATE courses SET name=?, instructor_id=? WHERE id=?",
                  (name.strip(), instructor_id, cid))
-    conn.commit()
+    _commit(conn)
 
 def delete_course(cid: str):
     conn = connect()
     conn.execute("DELETE FROM courses WHERE id=?", (cid,))
-    conn.commit()
+    _commit(conn)
 
 def assign_instructor(course_id: str, instructor_id: Optional[str]):
     conn = connect()
     conn.execute("UPDATE courses SET instructor_id=? WHERE id=?", (instructor_id, course_id))
-    conn.commit()
+    _commit(conn)
+
 
+ENROLLED = "enrolled"
+WAITLISTED = "waitlisted"
+ALREADY_ENROLLED = "already enrolled"
 
-def enroll_student(student_id: str, course_id: str):
+def enroll_student(student_id: str, course_id: str, section_id: Optional[str] = None) -> str:
+    """
+Enroll a student, or put them on the course waitlist when it is full.
+The capacity check and the insert are one statement under the write lock,
+so concurrent enrollments can never oversubscribe a course.
+With section_id, the section's meeting times must not clash with the student's
+schedule (ValueError otherwise); a waitlisted student picks a section after
+promotion with set_student_section().
+Returns ENROLLED, WAITLISTED or ALREADY_ENROLLED.
+"""
     conn = connect()
-    conn.execute("INSERT OR IGNORE INTO registrations(student_id, course_id) VALUES(?,?)",
-                 (student_id, course_id))
-    conn.commit()
+    if not conn.in_transaction:
+        conn.execute("BEGIN IMMEDIATE")
+    try:
+        if section_id is not None:
+            _check_section(conn, student_id, course_id, section_id)
+        cur = conn.execute("""
+            INSERT OR IGNORE INTO registrations(student_id, course_id, section_id)
+            SELECT ?, c.id, ? FROM courses c
+            WHERE c.id = ?
+              AND (c.capacity IS NULL
+                   OR (SELECT COUNT(*) FROM registrations r WHERE r.course_id = c.id) < c.capacity)
+        """, (student_id, section_id, course_id))
+        if cur.rowcount == 1:
+            status = ENROLLED
+        elif conn.execute("SELECT 1 FROM registrations WHERE student_id=? AND course_id=?",
+                          (student_id, course_id)).fetchone():
+            status = ALREADY_ENROLLED
+        else:
+            conn.execute("INSERT OR IGNORE INTO waitlist(student_id, course_id) VALUES(?,?)",
+                         (student_id, course_id))
+            status = WAITLISTED
+    except Exception:
+        if not getattr(_LOCAL, "deferred", False):
+            conn.rollback()
+        raise
+    _commit(conn)
+    return status
+
+def drop_student(student_id: str, course_id: str):
+    """
+Remove a registration (or a waitlist entry); the next waitlisted student is promoted.
+"""
+    conn = connect()
+    conn.execute("DELETE FROM registrations WHERE student_id=? AND course_id=?", (student_id, course_id))
+    conn.execute("DELETE FROM waitlist WHERE student_id=? AND course_id=?", (student_id, course_id))
+    _commit(conn)
+
+def set_course_capacity(course_id: str, capacity: Optional[int]):
+    """
+None means unlimited. Raising the capacity promotes waitlisted students into the new seats.
+"""
+    conn = connect()
+    conn.execute("UPDATE courses SET capacity=? WHERE id=?",
+                 (None if capacity is None else int(capacity), course_id))
+    _commit(conn)
+
+def list_waitlist(course_id: str, mode: str = "dict"):
+    return _select("""
+        SELECT s.id, s.name, s.age, s.email
+        FROM waitlist w
+        JOIN students s ON s.id = w.student_id
+        WHERE w.course_id=?
+        ORDER BY w.position
+    """, (course_id,), mode)
+
+WEEK_DAYS = ("Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun")
+
+def _week_minute(day: int, hhmm: str) -> int:
+    # "24:00" is only valid as an end time; add_section_slot checks start < end.
+    h, m = map(int, hhmm.split(":"))
+    if not 0 <= int(day) <= 6 or not 0 <= m < 60 or not (0 <= h <= 23 or (h, m) == (24, 0)):
+        raise ValueError(f"Invalid time slot {day} {hhmm}")
+    return int(day) * 1440 + h * 60 + m
+
+def _slot_dict(start: int, end: int, **extra) -> Dict:
+    day, start_in_day = divmod(start, 1440)
+    end_in_day = end - day * 1440
+    return dict(extra, day=WEEK_DAYS[day], start=f"{start_in_day // 60:02d}:{start_in_day % 60:02d}",
+                end=f"{end_in_day // 60:02d}:{end_in_day % 60:02d}")
+
+def create_section(section_id: str, course_id: str):
+    conn = connect()
+    conn.execute("INSERT INTO sections(id, course_id) VALUES(?,?)", (section_id.strip(), course_id))
+    _commit(conn)
+
+def add_section_slot(section_id: str, day: int, start: str, end: str):
+    """
+Add a weekly meeting: day 0 (Mon) .. 6 (Sun), start/end as "HH:MM".
+Fails with sqlite3.IntegrityError if it clashes with the schedule of an enrolled student.
+"""
+    lo, hi = _week_minute(day, start), _week_minute(day, end)
+    if hi <= lo:
+        raise ValueError("A time slot must end after it starts.")
+    conn = connect()
+    clash = conn.execute("""
+        SELECT 1 FROM section_slots WHERE section_id = ? AND start_min < ? AND end_min > ?
+    """, (section_id, hi, lo)).fetchone()
+    if clash:
+        raise ValueError("Time slot overlaps another meeting of the same section.")
+    try:
+        conn.execute("INSERT INTO section_slots(section_id, start_min, end_min) VALUES(?,?,?)",
+                     (section_id, lo, hi))
+    except Exception:
+        if not getattr(_LOCAL, "deferred", False):
+            conn.rollback()
+        raise
+    _commit(conn)
+
+def delete_section(section_id: str):
+    conn = connect()
+    conn.execute("DELETE FROM sections WHERE id=?", (section_id,))
+    _commit(conn)
+
+def list_sections(course_id: str) -> List[Dict]:
+    conn = connect()
+    rows = conn.execute("""
+        SELECT s.id, sl.start_min, sl.end_min
+        FROM sections s LEFT JOIN section_slots sl ON sl.section_id = s.id
+        WHERE s.course_id = ?
+        ORDER BY s.id, sl.start_min
+    """, (course_id,)).fetchall()
+    out: Dict[str, Dict] = {}
+    for sec_id, start, end in rows:
+        sec = out.setdefault(sec_id, {"id": sec_id, "course_id": course_id, "slots": []})
+        if start is not None:
+            sec["slots"].append(_slot_dict(start, end))
+    return list(out.values())
+
+def _schedule_conflicts(conn, student_id: str, section_id: str, ignore_section: Optional[str] = None) -> List[Dict]:
+    # Two index seeks per meeting of the section, within its term (see migrations 4 and 13).
+    found = []
+    for term, lo, hi in conn.execute("""
+            SELECT coalesce(c.term, ''), sl.start_min, sl.end_min
+            FROM section_slots sl JOIN sections s ON s.id = sl.section_id JOIN courses c ON c.id = s.course_id
+            WHERE sl.section_id = ?""", (section_id,)).fetchall():
+        rows = conn.execute("""
+            SELECT * FROM (SELECT section_id, start_min, end_min FROM student_schedule
+                           WHERE student_id = ?1 AND term = ?2 AND start_min <= ?3 ORDER BY start_min DESC LIMIT 1)
+            WHERE end_min > ?3
+            UNION ALL
+            SELECT section_id, start_min, end_min FROM student_schedule
+            WHERE student_id = ?1 AND term = ?2 AND start_min > ?3 AND start_min < ?4
+        """, (student_id, term, lo, hi)).fetchall()
+        found += [_slot_dict(start, end, section_id=sec) for sec, start, end in rows if sec != ignore_section]
+    return found
+
+def schedule_conflicts(student_id: str, section_id: str) -> List[Dict]:
+    """
+Meetings in the student's schedule that clash with section_id (empty when it fits).
+"""
+    return _schedule_conflicts(connect(), student_id, section_id)
+
+def _check_section(conn, student_id: str, course_id: str, section_id: str, ignore_section: Optional[str] = None):
+    row = conn.execute("SELECT course_id FROM sections WHERE id=?", (section_id,)).fetchone()
+    if not row or row[0] != course_id:
+        raise ValueError(f"Section {section_id} does not belong to course {course_id}.")
+    clashes = _schedule_conflicts(conn, student_id, section_id, ignore_section)
+    if clashes:
+        when = ", ".join(f"{c['section_id']} {c['day']} {c['start']}-{c['end']}" for c in clashes)
+        raise ValueError(f"Schedule conflict with {when}.")
+
+def set_student_section(student_id: str, course_id: str, section_id: Optional[str]):
+    """
+Move an enrolled student to another section of the course (None clears it).
+"""
+    conn = connect()
+    if not conn.in_transaction:
+        conn.execute("BEGIN IMMEDIATE")
+    try:
+        current = conn.execute("SELECT section_id FROM registrations WHERE student_id=? AND course_id=?",
+                               (student_id, course_id)).fetchone()
+        if current is None:
+            raise ValueError(f"Student {student_id} is not enrolled in {course_id}.")
+        if section_id is not None:
+            _check_section(conn, student_id, course_id, section_id, ignore_section=current[0])
+        conn.execute("UPDATE registrations SET section_id=? WHERE student_id=? AND course_id=?",
+                     (section_id, student_id, course_id))
+    except Exception:
+        if not getattr(_LOCAL, "deferred", False):
+            conn.rollback()
+        raise
+    _commit(conn)
 
-def list_enrolled(course_id: str) -> List[Dict]:
+def student_schedule(student_id: str) -> List[Dict]:
     conn = connect()
     rows = conn.execute("""
+        SELECT ss.section_id, s.course_id, ss.start_min, ss.end_min
+        FROM student_schedule ss JOIN sections s ON s.id = ss.section_id
+        WHERE ss.student_id = ?
+        ORDER BY ss.start_min
+    """, (student_id,)).fetchall()
+    return [_slot_dict(start, end, section_id=sec, course_id=cid) for sec, cid, start, end in rows]
+
+def find_schedule_conflicts(term: Optional[str] = None,
+                            proposed: Optional[List[Tuple[str, str]]] = None) -> List[Dict]:
+    """
+Bulk check of a whole term (or of every term, each on its own): existing section
+registrations plus optional proposed (student_id, section_id) pairs, in one pass
+over all meetings sorted by student, term and start time (O(n log n) rather than
+checking every pair).
+Returns one entry per clash: student, the two sections and the overlapping meeting.
+"""
+    conn = connect()
+    conn.execute("CREATE TEMP TABLE IF NOT EXISTS proposed_sections (student_id TEXT, section_id TEXT)")
+    conn.execute("DELETE FROM temp.proposed_sections")
+    if proposed:
+        conn.executemany("INSERT INTO temp.proposed_sections VALUES(?,?)", proposed)
+    term_filter = "" if term is None else "WHERE c.term = :term"
+    rows = conn.execute(f"""
+        SELECT p.student_id, coalesce(c.term, ''), p.section_id, sl.start_min, sl.end_min
+        FROM (
+            SELECT r.student_id, r.section_id FROM registrations r WHERE r.section_id IS NOT NULL
+            UNION
+            SELECT student_id, section_id FROM temp.proposed_sections
+        ) p
+        JOIN sections s ON s.id = p.section_id
+        JOIN courses c ON c.id = s.course_id
+        JOIN section_slots sl ON sl.section_id = p.section_id
+        {term_filter}
+        ORDER BY p.student_id, 2, sl.start_min, sl.end_min
+    """, {"term": term})
+    conflicts = []
+    current, reach, reach_section = None, -1, None
+    for sid, sec_term, sec, start, end in rows:
+        if (sid, sec_term) != current:
+            current, reach, reach_section = (sid, sec_term), -1, None
+        if start < reach and sec != reach_section:
+            conflicts.append(_slot_dict(start, min(end, reach), student_id=sid,
+                                        section_id=sec, conflicts_with=reach_section))
+        if end > reach:
+            reach, reach_section = end, sec
+    conn.execute("DELETE FROM temp.proposed_sections")
+    if not getattr(_LOCAL, "deferred", False) and conn.in_transaction:
+        conn.commit()
+    return conflicts
+
+def list_enrolled(course_id: str, after: Optional[str] = None, limit: Optional[int] = None,
+                  mode: str = "dict"):
+    tail, params = _keyset("r.student_id", after, limit, where="r.course_id=?")
+    return _select("""
         SELECT s.id, s.name, s.age, s.email
         FROM registrations r
         JOIN students s ON s.id = r.student_id
-        WHERE r.course_id=?
-        ORDER BY s.id
-    """, (course_id,)).fetchall()
-    return [{"id": r[0], "name": r[1], "age": r[2], "email": r[3]} for r in rows]
+    """ + tail, [course_id] + params, mode)
+
+RECORD_TYPES = ("Student", "Instructor", "Course")
+# sort name: per record type, the sort key expression (None: the type has no such
+# value and sorts after those that do), whether it can be NULL, and its collation
+RECORD_SORTS = {
+    "type": {"Student": "0", "Instructor": "0", "Course": "0"},
+    "id": {"Student": "s.id", "Instructor": "s.id", "Course": "c.id"},
+    "name": {"Student": "s.name", "Instructor": "s.name", "Course": "c.name"},
+    "age": {"Student": "s.age", "Instructor": "s.age", "Course": None},
+    "email": {"Student": "s.email", "Instructor": "s.email", "Course": None},
+    "instructor": {"Student": None, "Instructor": None, "Course": "i.name"},
+    "enrolled": {"Student": None, "Instructor": None, "Course": "cs.enrolled"},
+    # the GUIs' Extra column: a person's email, a course's instructor
+    "extra": {"Student": "s.email", "Instructor": "s.email", "Course": "i.name"},
+}
+_NULLABLE_SORTS = {"instructor", "extra"}   # NULL for courses without an instructor
+_NOCASE_SORTS = {"name", "email", "instructor", "extra"}
+_EMAIL_DOMAIN = "lower(substr(s.email, instr(s.email, '@') + 1))"
+
+def _records_branch(rec_type: str, order_by: str, descending: bool, filters: Dict, after,
+                    limit: Optional[int]) -> Optional[Tuple[str, list]]:
+    # One type's sorted page for query_records, or None if none of its rows can match.
+    # The page's own ORDER BY leaves out the columns that are constant for the type,
+    # so it walks the sort index instead of sorting the table.
+    rank = RECORD_TYPES.index(rec_type)
+    people = rec_type != "Course"
+    if people and (filters["instructor_id"] is not None or filters["min_enrolled"] is not None):
+        return None
+    if not people and (filters["min_age"] is not None or filters["max_age"] is not None or filters["email_domain"]):
+        return None
+    expr = RECORD_SORTS[order_by][rec_type]
+    collate = " COLLATE NOCASE" if order_by in _NOCASE_SORTS else ""
+    if expr is None:
+        null_sql, key_sql = "1", "0"
+    elif order_by in _NULLABLE_SORTS and not people:
+        null_sql, key_sql = f"({expr} IS NULL)", f"IFNULL({expr}, 0)"
+    else:
+        null_sql, key_sql = "0", expr
+    if people:
+        sql = (f"SELECT '{rec_type}' AS type, s.id AS id, s.name AS name, s.age AS age, s.email AS email, NULL AS instructor_id, "
+               f"NULL AS instructor_name, NULL AS enrolled_count, {null_sql} AS _null, {key_sql}{collate} AS _key, "
+               f"{rank} AS _rank FROM {rec_type.lower()}s s")
+    else:
+        sql = (f"SELECT 'Course' AS type, c.id AS id, c.name AS name, NULL AS age, NULL AS email, c.instructor_id, "
+               f"NULLIF(i.name, '') AS instructor_name, cs.enrolled AS enrolled_count, {null_sql} AS _null, "
+               f"{key_sql}{collate} AS _key, {rank} AS _rank FROM courses c "
+               "JOIN course_stats cs ON cs.course_id = c.id LEFT JOIN instructors i ON i.id = c.instructor_id")
+    where: List[str] = []
+    params: list = []
+    t = "s" if people else "c"
+    # sorting by enrolled walks idx_course_stats_enrolled, which holds course_id
+    idc = "cs.course_id" if order_by == "enrolled" and not people else f"{t}.id"
+    if filters["q"]:
+        q = f"%{filters['q'].lower().strip()}%"
+        where.append(f"(lower({t}.id) LIKE ? OR lower({t}.name) LIKE ?" + (" OR lower(s.email) LIKE ?)" if people else ")"))
+        params += [q] * (3 if people else 2)
+    if filters["min_age"] is not None:
+        where.append("s.age >= ?"); params.append(int(filters["min_age"]))
+    if filters["max_age"] is not None:
+        where.append("s.age <= ?"); params.append(int(filters["max_age"]))
+    if filters["email_domain"]:
+        where.append(f"{_EMAIL_DOMAIN} = ?"); params.append(filters["email_domain"].strip().lstrip("@").lower())
+    if filters["instructor_id"] is not None:
+        where.append("c.instructor_id = ?"); params.append(filters["instructor_id"])
+    if filters["min_enrolled"] is not None:
+        where.append("cs.enrolled >= ?"); params.append(int(filters["min_enrolled"]))
+    if after is not None:
+        # keyset on (_null, _key, _rank, id), simplified for this branch so that
+        # the sort index can seek instead of filtering
+        # (_null always ascends: rows without the value stay last either way)
+        a_null, a_key, a_rank, a_id = after
+        gt, ge = ("<", "<=") if descending else (">", ">=")
+        ahead = (lambda x, y: x < y) if descending else (lambda x, y: x > y)
+        if expr is None or order_by == "type":
+            # the whole branch has one (_null, _key, _rank)
+            this = (int(null_sql), 0, rank)
+            if this == (a_null, a_key, a_rank):
+                where.append(f"{idc} {gt} ?"); params.append(a_id)
+            elif this[0] < a_null or (this[0] == a_null and not ahead(this[1:], (a_key, a_rank))):
+                return None
+        elif null_sql == "0":
+            if a_null != 0:
+                return None
+            elif rank == a_rank:
+                where.append(f"({expr}{collate}, {idc}) {gt} (?, ?)"); params += [a_key, a_id]
+            else:
+                where.append(f"{expr}{collate} {gt if ahead(a_rank, rank) else ge} ?"); params.append(a_key)
+        else:
+            where.append(f"({null_sql} > ? OR ({null_sql} = ? AND ({key_sql}{collate}, {rank}, {idc}) {gt} (?, ?, ?)))")
+            params += [a_null, a_null, a_key, a_rank, a_id]
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    d = " DESC" if descending else ""
+    if expr is None or order_by == "type":
+        sql += f" ORDER BY {idc}{d}"
+    elif null_sql == "0":
+        sql += f" ORDER BY {expr}{collate}{d}, {idc}{d}"
+    else:
+        sql += f" ORDER BY {null_sql}, {key_sql}{collate}{d}, {idc}{d}"
+    if limit is not None:
+        sql += " LIMIT ?"
+        params.append(int(limit))
+    return sql, params
+
+def query_records(types: Optional[List[str]] = None, q: Optional[str] = None, min_age: Optional[int] = None,
+                  max_age: Optional[int] = None, email_domain: Optional[str] = None,
+                  instructor_id: Optional[str] = None, min_enrolled: Optional[int] = None,
+                  order_by: str = "type", descending: bool = False, after: Optional[list] = None,
+                  limit: Optional[int] = None) -> Dict:
+    """
+Students, instructors and courses as one list, filtered and sorted in SQL.
+
+Filters combine with AND; age and email_domain only match people, instructor_id and
+min_enrolled only courses, q is a substring of id, name or email. order_by is a key
+of RECORD_SORTS; rows without that value (e.g. courses by age) come last in either
+direction, ties go by type then id. Returns {"records": [{"type", "id", "name", "age", "email",
+"instructor_id", "instructor_name", "enrolled_count"}, ...], "next": cursor or None};
+pass the cursor back as `after` for the next page of `limit` rows.
+"""
+    if order_by not in RECORD_SORTS:
+        raise ValueError(f"order_by must be one of {', '.join(RECORD_SORTS)}.")
+    wanted = RECORD_TYPES if types is None else [t.capitalize() for t in types]
+    for t in wanted:
+        if t not in RECORD_TYPES:
+            raise ValueError(f"Unknown record type {t!r}; expected one of {', '.join(RECORD_TYPES)}.")
+    filters = {"q": q, "min_age": min_age, "max_age": max_age, "email_domain": email_domain,
+               "instructor_id": instructor_id, "min_enrolled": min_enrolled}
+    branches = [b for b in (_records_branch(t, order_by, descending, filters, after, limit)
+                            for t in RECORD_TYPES if t in wanted) if b is not None]
+    if not branches:
+        return {"records": [], "next": None}
+    direction = " DESC" if descending else ""
+    collate = " COLLATE NOCASE" if order_by in _NOCASE_SORTS else ""
+    # merge the per-type pages: at most len(branches) * limit rows to sort
+    sql = (" UNION ALL ".join(f"SELECT * FROM ({b[0]})" for b in branches)
+           + f" ORDER BY _null, _key{collate}{direction}, _rank{direction}, id{direction}")
+    params = [p for b in branches for p in b[1]]
+    if limit is not None:
+        sql += " LIMIT ?"
+        params.append(int(limit))
+    rows = connect().execute(sql, params).fetchall()
+    names = ("type", "id", "name", "age", "email", "instructor_id", "instructor_name", "enrolled_count")
+    records = [dict(zip(names, r)) for r in rows]
+    last = rows[-1] if rows and limit is not None and len(rows) == int(limit) else None
+    return {"records": records, "next": [last[8], last[9], last[10], last[1]] if last else None}
 
 def search_all(q: str) -> Dict[str, List[Dict]]:
     q = f"%{q.lower().strip()}%"
@@ -171,9 +1393,7 @@ def search_all(q: str) -> Dict[str, List[Dict]]:
         WHERE lower(id) LIKE ? OR lower(name) LIKE ? OR lower(email) LIKE ?
         ORDER BY id
     """, (q, q, q)).fetchall()
-    crows = conn.execute("""
-        SELECT c.id, c.name, c.instructor_id, i.name
-        FROM courses c LEFT JOIN instructors i ON i.id = c.instructor_id
+    crows = conn.execute(_COURSE_SELECT + """
         WHERE lower(c.id) LIKE ? OR lower(c.name) LIKE ?
         ORDER BY c.id
     """, (q, q)).fetchall()
@@ -181,19 +1401,348 @@ def search_all(q: str) -> Dict[str, List[Dict]]:
     res = {
         "students": [{"id": r[0], "name": r[1], "age": r[2], "email": r[3]} for r in srows],
         "instructors": [{"id": r[0], "name": r[1], "age": r[2], "email": r[3]} for r in irows],
-        "courses": []
+        "courses": [_course_dict(r) for r in crows],
     }
-    for cid, cname, inst_id, inst_name in crows:
-        n = conn.execute("SELECT COUNT(*) FROM registrations WHERE course_id=?", (cid,)).fetchone()[0]
-        res["courses"].append({
-            "id": cid, "name": cname,
-            "instructor_id": inst_id,
-            "instructor_name": inst_name if inst_name else None,
-            "enrolled_count": n
-        })
     return res
 
+def prefix_search(kind: str, prefix: str, limit: int = 20) -> List[Dict]:
+    """
+Type-ahead lookup: up to limit {"id", "name"} rows of kind ("students", "instructors"
+or "courses") whose id or name starts with prefix, ignoring ASCII case. Id matches
+come first in id order, then name matches in name order; both are range scans of
+the NOCASE indexes, so the cost depends on limit, not on the table size.
+"""
+    if kind not in ("students", "instructors", "courses"):
+        raise ValueError("kind must be students, instructors or courses.")
+    pattern = prefix.strip().replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+    conn = connect()
+    sql = f"SELECT id, name FROM {kind} WHERE {{0}} LIKE ? ESCAPE '\\' ORDER BY {{0}} COLLATE NOCASE LIMIT ?"
+    rows = conn.execute(sql.format("id"), (pattern, limit)).fetchall()
+    if len(rows) < limit:
+        seen = {r[0] for r in rows}
+        rows += [r for r in conn.execute(sql.format("name"), (pattern, limit)) if r[0] not in seen][:limit - len(rows)]
+    return [{"id": r[0], "name": r[1]} for r in rows]
+
+_FUZZY_TRANS = str.maketrans("ABCDEFGHIJKLMNOPQRSTUVWXYZ" + _FUZZY_SEPARATORS,
+                              "abcdefghijklmnopqrstuvwxyz" + " " * len(_FUZZY_SEPARATORS))
+
+def _fuzzy_words(text: str) -> List[str]:
+    # Same split as the triggers (SQLite's lower() only folds ASCII).
+    return list(dict.fromkeys(w for w in text.translate(_FUZZY_TRANS).split(" ") if w))
+
+def _trigrams(word: str) -> set:
+    p = f"  {word} "
+    return {p[i:i + 3] for i in range(len(word) + 1)}
+
+def _similar_words(conn, word: str, threshold: float) -> List[Tuple[str, float]]:
+    # Vocabulary words whose trigram similarity to word reaches threshold, best first.
+    grams = _trigrams(word)
+    g = len(grams)
+    df = dict(conn.execute(f"SELECT gram, words FROM fuzzy_grams WHERE gram IN ({','.join('?' * g)})", list(grams)))
+    # A word with w trigrams needs s = ceil(t(g + w)/(1 + t)) of them shared, so it has at
+    # least min(s, 2) among the g - s + 2 rarest query trigrams. Probe those (rarer ones
+    # for more sizes) and only check the words hit often enough.
+    lo = max(1, math.ceil(threshold * g - 1e-9))
+    hi = math.floor(g / threshold + 1e-9)
+    hits: Counter = Counter()
+    for rank, gram in enumerate(sorted(grams, key=lambda x: (df.get(x, 0), x))):
+        top = min(hi, math.floor((g - rank + 1) * (1 + threshold) / threshold - g + 1e-9))
+        if df.get(gram) and top >= lo:
+            hits.update(conn.execute("SELECT word, size FROM word_trigrams WHERE gram = ? AND size BETWEEN ? AND ?",
+                                     (gram, lo, top)))
+    found = []
+    query = list(grams)
+    for (other, size), n in hits.items():
+        if n < 2 and math.ceil(threshold * (g + size) / (1 + threshold) - 1e-9) > 1:
+            continue
+        shared = sum(map(f"  {other} ".__contains__, query))
+        sim = shared / (g + size - shared)
+        if sim >= threshold:
+            found.append((other, sim))
+    found.sort(key=lambda ws: (-ws[1], ws[0]))
+    return found
+
+def _fuzzy_postings(conn, matches: List[Tuple[str, float]]):
+    # (similarity, kind, id, words) of the people using each matched word, best word first.
+    for word, sim in matches:
+        for row in conn.execute("SELECT kind, person_id, words FROM person_words WHERE word = ?", (word,)):
+            yield (sim,) + row
+
+def fuzzy_search(q: str, threshold: float = 0.3, limit: Optional[int] = 20) -> List[Dict]:
+    """
+Students and instructors whose name or email resembles q, best match first.
+
+Each word of q is compared with the indexed words by trigram similarity (shared
+trigrams / distinct trigrams of both, as in pg_trgm); words scoring below threshold
+are ignored. A person's score is the mean, over the words of q, of their best
+matching word, and people scoring below threshold are left out. When more than
+limit people tie at the cut-off score, which of them are returned is unspecified.
+"""
+    if not 0 < threshold <= 1:
+        raise ValueError("threshold must be in (0, 1].")
+    words = _fuzzy_words(q)
+    if not words:
+        return []
+    conn = connect()
+    similar = [_similar_words(conn, word, threshold) for word in words]
+    # word -> its similarity to each query word
+    table: Dict[str, list] = {}
+    for n, found in enumerate(similar):
+        for other, sim in found:
+            table.setdefault(other, [0.0] * len(words))[n] = sim
+    postings = [_fuzzy_postings(conn, found) for found in similar]
+    # Threshold algorithm: read every word's list of people round-robin, best matches
+    # first. Nobody unread can score above the mean of the similarities just read, so
+    # stop once that bound falls below threshold or the top `limit` all reach it.
+    current = [found[0][1] if found else 0.0 for found in similar]
+    scored: Dict[Tuple[str, str], float] = {}
+    best: list = []   # min-heap of the top `limit` scores so far
+    while True:
+        bound = sum(current) / len(words)
+        if bound < threshold or (limit is not None and len(best) >= limit and best[0] >= bound - 1e-9):
+            break
+        read = False
+        for n, rows in enumerate(postings):
+            row = next(rows, None)
+            if row is None:
+                current[n] = 0.0
+                continue
+            read = True
+            current[n] = row[0]
+            if row[1:3] in scored:
+                continue
+            own = [table[w] for w in row[3].split(" ") if w in table]
+            score = sum(map(max, zip(*own))) / len(words)
+            scored[row[1:3]] = score
+            if score >= threshold and limit is not None:
+                if len(best) < limit:
+                    heapq.heappush(best, score)
+                elif score > best[0]:
+                    heapq.heapreplace(best, score)
+        if not read:
+            break
+    hits = sorted((-score, kind, pid) for (kind, pid), score in scored.items() if score >= threshold)
+    result = []
+    for score, kind, pid in (hits if limit is None else hits[:limit]):
+        name, age, email = conn.execute(f"SELECT name, age, email FROM {kind}s WHERE id = ?", (pid,)).fetchone()
+        result.append({"kind": kind, "id": pid, "name": name, "age": age, "email": email, "score": round(-score, 4)})
+    return result
+
+def stats_course_sizes(limit: Optional[int] = None) -> List[Dict]:
+    """
+Courses by enrollment, largest first.
+"""
+    conn = connect()
+    rows = conn.execute("""
+        SELECT cs.course_id, c.name, cs.enrolled, c.capacity
+        FROM course_stats cs JOIN courses c ON c.id = cs.course_id
+        ORDER BY cs.enrolled DESC, cs.course_id
+        LIMIT ?
+    """, (-1 if limit is None else int(limit),)).fetchall()
+    return [{"id": r[0], "name": r[1], "enrolled_count": r[2], "capacity": r[3]} for r in rows]
+
+def stats_enrollment_histogram(bucket: int = 10) -> List[Dict]:
+    """
+Number of courses per enrollment-size bucket: [{"low": 0, "high": 9, "courses": n}, ...].
+"""
+    conn = connect()
+    rows = conn.execute("""
+        SELECT enrolled / ? AS b, COUNT(*) FROM course_stats GROUP BY b ORDER BY b
+    """, (int(bucket),)).fetchall()
+    return [{"low": b * bucket, "high": (b + 1) * bucket - 1, "courses": n} for b, n in rows]
+
+def stats_instructor_load() -> List[Dict]:
+    """
+Courses taught and students enrolled (seats, summed over their courses) per instructor.
+"""
+    conn = connect()
+    rows = conn.execute("""
+        SELECT i.id, i.name, st.courses, st.enrolled
+        FROM instructor_stats st JOIN instructors i ON i.id = st.instructor_id
+        ORDER BY st.enrolled DESC, i.id
+    """).fetchall()
+    return [{"id": r[0], "name": r[1], "courses": r[2], "enrolled_count": r[3]} for r in rows]
+
+def stats_unassigned_courses() -> List[Dict]:
+    conn = connect()
+    rows = conn.execute(_COURSE_SELECT + " WHERE c.instructor_id IS NULL ORDER BY c.id").fetchall()
+    return [_course_dict(r) for r in rows]
+
+_STATS_FRESH_COURSES = """
+    SELECT c.id, c.instructor_id, (SELECT COUNT(*) FROM registrations r WHERE r.course_id = c.id)
+    FROM courses c
+"""
+_STATS_FRESH_INSTRUCTORS = """
+    SELECT i.id,
+           (SELECT COUNT(*) FROM courses c WHERE c.instructor_id = i.id),
+           (SELECT COUNT(*) FROM registrations r JOIN courses c ON c.id = r.course_id
+            WHERE c.instructor_id = i.id)
+    FROM instructors i
+"""
+
+def stats_rebuild() -> Dict[str, List[str]]:
+    """
+Recompute every aggregate from scratch and replace the incremental tables.
+Returns the course and instructor ids whose incremental values did not match
+(both lists are empty when the triggers kept everything current).
+"""
+    conn = connect()
+    if not conn.in_transaction:
+        conn.execute("BEGIN IMMEDIATE")
+    try:
+        courses = conn.execute(f"""
+            SELECT id FROM ({_STATS_FRESH_COURSES} EXCEPT SELECT course_id, instructor_id, enrolled FROM course_stats)
+            UNION
+            SELECT course_id FROM (SELECT course_id, instructor_id, enrolled FROM course_stats EXCEPT {_STATS_FRESH_COURSES})
+        """).fetchall()
+        instructors = conn.execute(f"""
+            SELECT id FROM ({_STATS_FRESH_INSTRUCTORS} EXCEPT SELECT instructor_id, courses, enrolled FROM instructor_stats)
+            UNION
+            SELECT instructor_id FROM (SELECT instructor_id, courses, enrolled FROM instructor_stats
+                                       EXCEPT {_STATS_FRESH_INSTRUCTORS})
+        """).fetchall()
+        conn.execute("DELETE FROM course_stats")
+        conn.execute("INSERT INTO course_stats(course_id, instructor_id, enrolled) " + _STATS_FRESH_COURSES)
+        conn.execute("DELETE FROM instructor_stats")
+        conn.execute("INSERT INTO instructor_stats(instructor_id, courses, enrolled) " + _STATS_FRESH_INSTRUCTORS)
+    except Exception:
+        if not getattr(_LOCAL, "deferred", False):
+            conn.rollback()
+        raise
+    _commit(conn)
+    return {"courses": sorted(r[0] for r in courses), "instructors": sorted(r[0] for r in instructors)}
+
+_CHANGE_ROWS = {
+    "students": "SELECT id, name, age, email FROM students WHERE id IN ({keys})",
+    "instructors": "SELECT id, name, age, email FROM instructors WHERE id IN ({keys})",
+    "courses": "SELECT id, name, instructor_id, capacity, term FROM courses WHERE id IN ({keys})",
+    "registrations": ("SELECT student_id, course_id, section_id FROM registrations "
+                      "WHERE (student_id, course_id) IN ({keys})"),
+}
+_CHANGE_COLUMNS = {
+    "students": ("id", "name", "age", "email"),
+    "instructors": ("id", "name", "age", "email"),
+    "courses": ("id", "name", "instructor_id", "capacity", "term"),
+    "registrations": ("student_id", "course_id", "section_id"),
+}
+
+CHANGE_LOG_KEEP = 10000   # versions prune_changes() keeps while no consumer is registered
+CHANGE_CONSUMER_TTL = 3600   # seconds without an ack before prune_changes() drops a consumer
+
+def current_version() -> int:
+    conn = connect()
+    row = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'change_log'").fetchone()
+    return row[0] if row else 0
+
+def changes_since(version: int, limit: Optional[int] = None) -> Dict:
+    """
+Rows of students, instructors, courses and registrations changed after version, oldest
+change first. Each row appears once with its current state, however often it changed:
+{"version": v, "changes": [{"table", "op": "upsert"|"delete", "key": {...}, "row": {...}|None}]}.
+Pass the returned version next time; with limit, call again until changes is empty.
+Version 0 returns every row until the log is first pruned; a version older than the
+pruned part of the log raises ValueError (reload everything, then continue from
+current_version()).
+"""
+    conn = connect()
+    own = not conn.in_transaction
+    if own:
+        conn.execute("BEGIN")  # one snapshot for the log and the rows it points at
+    try:
+        pruned = conn.execute("SELECT version FROM change_log_pruned").fetchone()[0]
+        if version < pruned:
+            raise ValueError(f"Changes up to version {pruned} have been pruned; reload and "
+                             f"continue from current_version().")
+        sql = "SELECT version, tbl, k1, k2, op FROM change_log WHERE version > ? ORDER BY version"
+        log = conn.execute(sql + (" LIMIT ?" if limit is not None else ""),
+                           (version,) if limit is None else (version, int(limit))).fetchall()
+        upto = log[-1][0] if log else max(version, current_version())
+        rows: Dict[Tuple[str, str, str], Dict] = {}
+        for table in {tbl for _, tbl, _, _, op in log if op == "U"}:
+            cols = _CHANGE_COLUMNS[table]
+            # "+tbl" keeps SQLite on the version range instead of the (tbl, k1, k2) index
+            keys = (f"SELECT k1{', k2' if len(_CHANGE_KEYS[table]) > 1 else ''} FROM change_log "
+                    "WHERE version > ? AND version <= ? AND +tbl = ? AND op = 'U'")
+            for r in conn.execute(_CHANGE_ROWS[table].format(keys=keys), (version, upto, table)):
+                row = dict(zip(cols, r))
+                key = [row[c] for c in _CHANGE_KEYS[table]]
+                rows[(table, key[0], key[1] if len(key) > 1 else "")] = row
+    finally:
+        if own:
+            conn.commit()
+    changes = []
+    for _, table, k1, k2, _ in log:
+        row = rows.get((table, k1, k2))
+        key = dict(zip(_CHANGE_KEYS[table], (k1, k2)))
+        changes.append({"table": table, "op": "upsert" if row else "delete", "key": key, "row": row})
+    return {"version": upto, "changes": changes}
+
+def consumer_name(app: str) -> str:
+    """
+A consumer name unique to one window of app ("app_tk-4242-1f9c0a3b"), so windows
+never acknowledge or drop each other's progress.
+"""
+    return f"{app}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+
+def register_consumer(name: str, version: Optional[int] = None) -> int:
+    """
+Keep the change log from being pruned past what consumer name has acknowledged.
+A new consumer starts at version (default: now); returns its acknowledged version.
+A consumer that has not acknowledged for CHANGE_CONSUMER_TTL seconds is dropped, so
+live consumers should ack at least that often even when nothing changed.
+"""
+    conn = connect()
+    conn.execute("INSERT INTO change_consumers(name, acked, acked_at) VALUES(?,?,?) "
+                 "ON CONFLICT(name) DO UPDATE SET acked_at = excluded.acked_at",
+                 (name, current_version() if version is None else int(version), time.time()))
+    _commit(conn)
+    return conn.execute("SELECT acked FROM change_consumers WHERE name=?", (name,)).fetchone()[0]
+
+def ack_changes(name: str, version: int) -> int:
+    """
+Record that consumer name has applied every change up to version, then prune what
+all consumers have seen. Returns the number of log entries pruned. Raises ValueError
+for a consumer that was never registered or has been dropped (register it again).
+"""
+    conn = connect()
+    cur = conn.execute("UPDATE change_consumers SET acked = max(acked, ?), acked_at = ? WHERE name=?",
+                       (min(int(version), current_version()), time.time(), name))
+    if cur.rowcount == 0:
+        raise ValueError(f"Unknown change consumer {name}.")
+    return prune_changes()
+
+def drop_consumer(name: str) -> int:
+    conn = connect()
+    conn.execute("DELETE FROM change_consumers WHERE name=?", (name,))
+    return prune_changes()
+
+def prune_changes(keep: int = CHANGE_LOG_KEEP, ttl: float = CHANGE_CONSUMER_TTL) -> int:
+    """
+Delete log entries every registered consumer has acknowledged. Consumers silent for
+more than ttl seconds (a crashed or hung window) are dropped first, so they cannot
+hold the log back forever. With no consumer registered, the newest keep versions
+stay so that pollers (and consumers about to register) can still catch up. Returns
+the number of entries deleted.
+"""
+    conn = connect()
+    conn.execute("DELETE FROM change_consumers WHERE acked_at < ?", (time.time() - ttl,))
+    upto = conn.execute("SELECT MIN(acked) FROM change_consumers").fetchone()[0]
+    if upto is None:
+        upto = max(current_version() - keep, 0)
+    cur = conn.execute("DELETE FROM change_log WHERE version <= ?", (upto,))
+    conn.execute("UPDATE change_log_pruned SET version = max(version, ?)", (upto,))
+    _commit(conn)
+    return cur.rowcount
+
 def backup_to(path: str):
+    """
+Copy the database with SQLite's online backup API, which reads a consistent
+snapshot (WAL included) while other connections keep writing.
+"""
     conn = connect()
     conn.commit()
-    shutil.copyfile(_DB_PATH, path)
+    dest = sqlite3.connect(path)
+    try:
+        conn.backup(dest)
+    finally:
+        dest.close()
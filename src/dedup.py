@@ -0,0 +1,209 @@
+"""
+Duplicate-person detection for students and instructors.
+
+Comparing every pair of people is quadratic, so candidates come from blocking:
+each person gets a few cheap keys and only people sharing a key are compared.
+
+    email   the address lowercased, with any +tag dropped from the local part
+    name    the Soundex codes of the name's words, sorted, so "Lee, Ann" and
+            "Ann Leigh" land in the same block
+
+Candidate pairs are scored on name and email similarity, and pairs scoring at
+least min_score become merge proposals. Blocks larger than max_block (very
+common names) are skipped rather than compared pairwise. Only people of the
+same kind are paired, since a student cannot be merged into an instructor.
+
+    proposals = find_duplicates()        # [{"kind", "keep", "duplicate", "score", "keys"}, ...]
+    apply_merges(proposals)              # db.merge_people for each, one transaction per merge
+
+    python src/dedup.py --db school.db [--apply]
+"""
+import argparse
+import re
+from collections import defaultdict
+from difflib import SequenceMatcher
+from typing import Dict, Iterable, List, Tuple
+
+import db
+
+_SOUNDEX = {c: d for d, letters in enumerate(("bfpv", "cgjkqsxz", "dt", "l", "mn", "r"), 1) for c in letters}
+_WORD_RE = re.compile(r"[^\W\d_]+")
+
+
+def soundex(word: str) -> str:
+    """
+American Soundex: first letter plus three digits ("Robert" -> "r163").
+"""
+    word = "".join(c for c in word.lower() if "a" <= c <= "z")
+    if not word:
+        return ""
+    code, last = word[0], _SOUNDEX.get(word[0])
+    for c in word[1:]:
+        d = _SOUNDEX.get(c)
+        if d and d != last:
+            code += str(d)
+            if len(code) == 4:
+                break
+        if c not in "hw":  # h and w do not separate equal codes, vowels do
+            last = d
+    return code.ljust(4, "0")
+
+
+def normalize_email(email: str) -> str:
+    local, _, domain = email.strip().lower().partition("@")
+    return f"{local.split('+', 1)[0]}@{domain}"
+
+
+def _name_words(name: str) -> List[str]:
+    return sorted(_WORD_RE.findall(name.lower()))
+
+
+def _prepare(person: Dict) -> Tuple[str, str, str]:
+    # (sorted name words, normalized email, digits of the email's local part)
+    email = normalize_email(person["email"])
+    return " ".join(_name_words(person["name"])), email, "".join(filter(str.isdigit, email.split("@")[0]))
+
+
+def _blocking_keys(prepared: Tuple[str, str, str]) -> List[Tuple[str, str]]:
+    name, email, _ = prepared
+    keys = [("email", email)]
+    codes = sorted(filter(None, map(soundex, name.split())))
+    if codes:
+        keys.append(("name", " ".join(codes)))
+    return keys
+
+
+def _similarity(a: Tuple[str, str, str], b: Tuple[str, str, str], floor: float = 0.0) -> float:
+    # Returns 0 as soon as the result is known to be below floor; cheap checks first.
+    if a[1] == b[1]:
+        email = 1.0
+    elif a[2] != b[2]:
+        # Addresses numbered differently (jsmith2 / jsmith7) belong to different people.
+        email = 0.0
+    else:
+        email = SequenceMatcher(None, a[1].split("@")[0], b[1].split("@")[0]).ratio()
+    need = 2 * floor - email
+    if need > 1:
+        return 0.0
+    if a[0] == b[0]:
+        return (1.0 + email) / 2
+    m = SequenceMatcher(None, a[0], b[0])
+    name = m.ratio() if m.real_quick_ratio() >= need and m.quick_ratio() >= need else 0.0
+    if name < need:
+        # Sorting misplaces words whose first letter has a typo (brock / trock), so
+        # also pair every word with its closest counterpart in the other name.
+        wa, wb = a[0].split(), b[0].split()
+        if not wa or not wb:
+            return 0.0
+        r = [[SequenceMatcher(None, x, y).ratio() for y in wb] for x in wa]
+        name = (sum(map(max, r)) + sum(map(max, zip(*r)))) / (len(wa) + len(wb))
+        if name < need:
+            return 0.0
+    return (name + email) / 2
+
+
+def score(a: Dict, b: Dict) -> float:
+    """
+Similarity of two people in [0, 1]: the mean of name similarity (word order
+ignored) and email similarity (1 for the same normalized address, 0 when the
+local parts carry different numbers).
+"""
+    return _similarity(_prepare(a), _prepare(b))
+
+
+def _people(conn, kind: str) -> Iterable[Tuple[str, Tuple[str, str, str]]]:
+    cur = conn.execute(f"SELECT id, name, email FROM {kind}s")
+    while True:
+        rows = cur.fetchmany(50_000)
+        if not rows:
+            return
+        for pid, name, email in rows:
+            yield pid, _prepare({"name": name, "email": email})
+
+
+def _activity(conn, kind: str, pid: str) -> int:
+    # Registrations (students) or courses taught (instructors): the busier record is kept.
+    if kind == "student":
+        return conn.execute("SELECT COUNT(*) FROM registrations WHERE student_id=?", (pid,)).fetchone()[0]
+    return conn.execute("SELECT COUNT(*) FROM courses WHERE instructor_id=?", (pid,)).fetchone()[0]
+
+
+def find_duplicates(min_score: float = 0.8, max_block: int = 100, conn=None) -> List[Dict]:
+    """
+Merge proposals for likely duplicates, best first. "keep" is the record with more
+registrations (students) or courses (instructors), ties going to the smaller id.
+"""
+    conn = conn or db.connect()
+    proposals = []
+    for kind in ("student", "instructor"):
+        ids: List[str] = []
+        people: List[Tuple[str, str, str]] = []
+        blocks: Dict[Tuple[str, str], List[int]] = defaultdict(list)
+        for pid, prepared in _people(conn, kind):
+            for key in _blocking_keys(prepared):
+                blocks[key].append(len(people))
+            ids.append(pid)
+            people.append(prepared)
+        candidates: Dict[Tuple[int, int], List[str]] = defaultdict(list)
+        for (key_kind, _), members in blocks.items():
+            if len(members) < 2 or len(members) > max_block:
+                continue
+            for x, i in enumerate(members):
+                for j in members[x + 1:]:
+                    candidates[(i, j)].append(key_kind)
+        for (i, j), keys in candidates.items():
+            s = _similarity(people[i], people[j], min_score)
+            if s < min_score:
+                continue
+            a, b = sorted((ids[i], ids[j]))
+            if _activity(conn, kind, b) > _activity(conn, kind, a):
+                a, b = b, a
+            proposals.append({"kind": kind, "keep": a, "duplicate": b, "score": round(s, 4), "keys": keys})
+    proposals.sort(key=lambda p: (-p["score"], p["kind"], p["keep"], p["duplicate"]))
+    return proposals
+
+
+def apply_merges(proposals: Iterable[Dict]) -> List[Dict]:
+    """
+Merge every proposal with db.merge_people. Chains such as A~B and B~C collapse
+into one surviving record, so a record is never merged into one already gone.
+Returns one {"kind", "keep", "duplicate", "moved"} entry per merge performed.
+"""
+    parent: Dict[Tuple[str, str], Tuple[str, str]] = {}
+
+    def find(node):
+        while parent.get(node, node) != node:
+            node = parent[node] = parent.get(parent[node], parent[node])
+        return node
+
+    done = []
+    for p in proposals:
+        keep, dup = find((p["kind"], p["keep"])), find((p["kind"], p["duplicate"]))
+        if keep == dup:
+            continue
+        moved = db.merge_people(p["kind"], keep[1], dup[1])
+        parent[dup] = keep
+        done.append({"kind": p["kind"], "keep": keep[1], "duplicate": dup[1], "moved": moved})
+    return done
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Find (and optionally merge) duplicate people.")
+    parser.add_argument("--db", default="school.db")
+    parser.add_argument("--min-score", type=float, default=0.8)
+    parser.add_argument("--max-block", type=int, default=100, help="skip blocking keys shared by more people")
+    parser.add_argument("--apply", action="store_true", help="merge the proposals instead of only listing them")
+    args = parser.parse_args(argv)
+    db.connect(args.db)
+    db.init_db()
+    proposals = find_duplicates(args.min_score, args.max_block)
+    for p in proposals:
+        print(f"{p['kind']:<10} keep {p['keep']:<12} merge {p['duplicate']:<12} score {p['score']:.2f} ({', '.join(p['keys'])})")
+    print(f"{len(proposals)} proposal(s)")
+    if args.apply:
+        print(f"merged {len(apply_merges(proposals))} record(s)")
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,258 @@
+"""
+Multi-process load test of the db layer: simulated workstations sharing one school.db,
+each its own process with its own connection, as in production.
+
+    python src/loadtest.py --example > scenario.json    # a starting scenario
+    python src/loadtest.py scenario.json                # run it
+    python src/loadtest.py scenario.json --out run.json # also save the results
+
+A scenario is a JSON file:
+
+    {
+      "db": "loadtest.db",
+      "populate": {"students": 20000, "instructors": 500, "courses": 1000, "regs": 5},
+      "seconds": 30,
+      "seed": 1,
+      "busy_timeout": 5.0,
+      "journal_mode": "wal",
+      "sessions": [
+        {"name": "registrar", "processes": 4, "think_ms": 100,
+         "mix": {"refresh": 4, "search": 2, "lookup": 4, "enroll": 2, "drop": 1, "edit": 1}},
+        {"name": "admin", "processes": 1, "think_ms": 2000, "mix": {"refresh": 1, "backup": 1}}
+      ]
+    }
+
+"populate" (re)creates db with synthetic data first; leave it out to run against an
+existing file. Each session type runs in "processes" processes that pick operations
+at random, weighted by "mix", pausing think_ms on average (exponentially distributed)
+between them; 0 means back to back. Operations, modelled on what the GUIs do:
+
+    refresh   first page (page_size rows, default 100) of courses, instructors, students
+    search    search_all on part of a generated name
+    lookup    get_student, then the roster of one course
+    enroll    enroll_student in a random course
+    drop      drop_student from a random course
+    edit      get_student, then update_student
+    backup    backup_to a scratch file per process
+
+A call failing with "database is locked" (the busy timeout ran out) counts as a lock
+timeout, any other exception as an error; neither is included in the latencies.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import sqlite3
+import tempfile
+import time
+from typing import Dict, List
+
+import bench
+import db
+
+EXAMPLE = {
+    "db": "loadtest.db",
+    "populate": {"students": 20_000, "instructors": 500, "courses": 1_000, "regs": 5},
+    "seconds": 30,
+    "seed": 1,
+    "busy_timeout": 5.0,
+    "journal_mode": "wal",
+    "sessions": [
+        {"name": "registrar", "processes": 4, "think_ms": 100,
+         "mix": {"refresh": 4, "search": 2, "lookup": 4, "enroll": 2, "drop": 1, "edit": 1}},
+        {"name": "admin", "processes": 1, "think_ms": 2000, "mix": {"refresh": 1, "backup": 1}},
+    ],
+}
+
+
+class _Session:
+    def __init__(self, rnd: random.Random, students: List[str], courses: List[str], page_size: int,
+                 backup_path: str):
+        self.rnd = rnd
+        self.students = students
+        self.courses = courses
+        self.page_size = page_size
+        self.backup_path = backup_path
+
+    def refresh(self):
+        db.list_courses(limit=self.page_size)
+        db.list_instructors(limit=self.page_size)
+        db.list_students(limit=self.page_size)
+
+    def search(self):
+        db.search_all(f"student {self.rnd.randrange(1000)}")
+
+    def lookup(self):
+        db.get_student(self.rnd.choice(self.students))
+        db.list_enrolled(self.rnd.choice(self.courses), limit=self.page_size)
+
+    def enroll(self):
+        db.enroll_student(self.rnd.choice(self.students), self.rnd.choice(self.courses))
+
+    def drop(self):
+        db.drop_student(self.rnd.choice(self.students), self.rnd.choice(self.courses))
+
+    def edit(self):
+        s = db.get_student(self.rnd.choice(self.students))
+        if s:
+            db.update_student(s["id"], s["name"], 17 + (s["age"] + 1) % 10, s["email"])
+
+    def backup(self):
+        db.backup_to(self.backup_path)
+
+
+OPERATIONS = ("refresh", "search", "lookup", "enroll", "drop", "edit", "backup")
+
+
+def _is_lock_timeout(e: Exception) -> bool:
+    return isinstance(e, sqlite3.OperationalError) and ("locked" in str(e) or "busy" in str(e))
+
+
+def _worker(job) -> Dict:
+    scenario, session, index, start_at = job
+    conn = db.connect(scenario["db"])
+    conn.execute(f"PRAGMA busy_timeout = {int(scenario.get('busy_timeout', 5.0) * 1000)}")
+    rnd = random.Random(f"{scenario.get('seed', 1)}/{session['name']}/{index}")
+    students = [r[0] for r in conn.execute("SELECT id FROM students")]
+    courses = [r[0] for r in conn.execute("SELECT id FROM courses")]
+    backup_path = os.path.join(tempfile.gettempdir(), f"loadtest_{os.getpid()}.db")
+    ops = _Session(rnd, students, courses, session.get("page_size", 100), backup_path)
+    names = list(session["mix"])
+    weights = [session["mix"][n] for n in names]
+    think = session.get("think_ms", 0) / 1000
+    results = {n: {"latencies": [], "lock_timeouts": 0, "errors": 0} for n in names}
+
+    time.sleep(max(0.0, start_at - time.time()))
+    deadline = start_at + scenario.get("seconds", 30)
+    while time.time() < deadline:
+        name = rnd.choices(names, weights)[0]
+        t0 = time.perf_counter()
+        try:
+            getattr(ops, name)()
+        except Exception as e:
+            if conn.in_transaction:
+                conn.rollback()
+            results[name]["lock_timeouts" if _is_lock_timeout(e) else "errors"] += 1
+        else:
+            results[name]["latencies"].append((time.perf_counter() - t0) * 1000)
+        if think:
+            time.sleep(min(rnd.expovariate(1 / think), max(0.0, deadline - time.time())))
+    db.close()
+    if os.path.exists(backup_path):
+        os.remove(backup_path)
+    return {"session": session["name"], "results": results}
+
+
+def _check(scenario: Dict):
+    if not scenario.get("sessions"):
+        raise ValueError("A scenario needs at least one session.")
+    for session in scenario["sessions"]:
+        unknown = set(session.get("mix", {})) - set(OPERATIONS)
+        if unknown or not session.get("mix"):
+            raise ValueError(f"Session {session.get('name')!r}: mix must weight some of "
+                             f"{', '.join(OPERATIONS)} (unknown: {', '.join(sorted(unknown)) or 'none'}).")
+
+
+def prepare(scenario: Dict):
+    """
+Create and populate the scenario's database if it has a "populate" section.
+"""
+    path = scenario["db"]
+    db.close()
+    pop = scenario.get("populate")
+    if pop is not None:
+        for suffix in ("", "-wal", "-shm", "-journal"):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+    db.connect(path)
+    db.init_db()
+    if pop is not None:
+        bench._populate(pop.get("students", 20_000), pop.get("instructors", 500), pop.get("courses", 1_000),
+                        pop.get("regs", 5), scenario.get("seed", 1))
+    if scenario.get("journal_mode"):
+        db.connect().execute(f"PRAGMA journal_mode = {scenario['journal_mode']}")
+    db.close()
+
+
+def run(scenario: Dict) -> Dict:
+    """
+Run a scenario (see the module docstring) and return its summary:
+{"seconds", "processes", "operations": {op: {"count", "ops_per_s", "p50_ms", "p95_ms",
+"p99_ms", "max_ms", "lock_timeouts", "errors"}}, "sessions": {name: {op: ...}}}.
+"""
+    _check(scenario)
+    prepare(scenario)
+    # every process loads its ids, then waits for start_at so the load starts at once
+    start_at = time.time() + 1.0 + 0.1 * sum(s.get("processes", 1) for s in scenario["sessions"])
+    jobs = [(scenario, session, n, start_at)
+            for session in scenario["sessions"] for n in range(session.get("processes", 1))]
+    with multiprocessing.Pool(len(jobs)) as pool:
+        outputs = pool.map(_worker, jobs, chunksize=1)
+    seconds = scenario.get("seconds", 30)
+
+    def summarize(per_op: Dict[str, Dict]) -> Dict[str, Dict]:
+        out = {}
+        for name, r in sorted(per_op.items()):
+            lat = r["latencies"]
+            out[name] = {"count": len(lat), "ops_per_s": round(len(lat) / seconds, 1),
+                         "p50_ms": round(bench._percentile(lat, 50), 3), "p95_ms": round(bench._percentile(lat, 95), 3),
+                         "p99_ms": round(bench._percentile(lat, 99), 3), "max_ms": round(max(lat, default=0.0), 3),
+                         "lock_timeouts": r["lock_timeouts"], "errors": r["errors"]}
+        return out
+
+    def merge(into: Dict[str, Dict], results: Dict[str, Dict]):
+        for name, r in results.items():
+            acc = into.setdefault(name, {"latencies": [], "lock_timeouts": 0, "errors": 0})
+            acc["latencies"] += r["latencies"]
+            acc["lock_timeouts"] += r["lock_timeouts"]
+            acc["errors"] += r["errors"]
+
+    total: Dict[str, Dict] = {}
+    sessions: Dict[str, Dict] = {}
+    for out in outputs:
+        merge(total, out["results"])
+        merge(sessions.setdefault(out["session"], {}), out["results"])
+    return {"seconds": seconds, "processes": len(jobs), "operations": summarize(total),
+            "sessions": {name: summarize(per_op) for name, per_op in sessions.items()}}
+
+
+def _print_table(title: str, ops: Dict[str, Dict]):
+    print(title)
+    print(f"   {'operation':<10} {'count':>8} {'ops/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} "
+          f"{'max ms':>9} {'locked':>7} {'errors':>7}")
+    for name, s in ops.items():
+        print(f"   {name:<10} {s['count']:>8} {s['ops_per_s']:>8.1f} {s['p50_ms']:>9.2f} {s['p95_ms']:>9.2f} "
+              f"{s['p99_ms']:>9.2f} {s['max_ms']:>9.2f} {s['lock_timeouts']:>7} {s['errors']:>7}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Multi-process load test of the db layer.")
+    parser.add_argument("scenario", nargs="?", help="scenario JSON file")
+    parser.add_argument("--example", action="store_true", help="print an example scenario and exit")
+    parser.add_argument("--seconds", type=float, help="override the scenario's duration")
+    parser.add_argument("--out", help="write the scenario and results as JSON to this file")
+    args = parser.parse_args(argv)
+    if args.example:
+        print(json.dumps(EXAMPLE, indent=2))
+        return
+    if not args.scenario:
+        parser.error("a scenario file is required (or --example)")
+    with open(args.scenario, encoding="utf-8") as f:
+        scenario = json.load(f)
+    if args.seconds is not None:
+        scenario["seconds"] = args.seconds
+    summary = run(scenario)
+    total = sum(s["count"] for s in summary["operations"].values())
+    print(f"{summary['processes']} processes, {summary['seconds']}s: {total} operations, "
+          f"{total / summary['seconds']:.1f} ops/s")
+    _print_table("all sessions", summary["operations"])
+    for name, ops in summary["sessions"].items():
+        _print_table(f"session {name}", ops)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump({"scenario": scenario, "results": summary}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
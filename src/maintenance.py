@@ -0,0 +1,325 @@
+"""
+Background database maintenance in small time slices.
+
+    sched = MaintenanceScheduler("school.db")   # its own connection and thread
+    sched.start()
+    ...
+    sched.stop()
+    maintenance.history()       # [{"task", "started_at", "duration_ms", "steps", "reclaimed_bytes", "detail"}, ...]
+
+    python src/maintenance.py --db school.db              # run whatever is due, now
+    python src/maintenance.py --db school.db --enable-incremental-vacuum
+
+Tasks, and how long after their last run they are due again:
+
+    prune_changes     10 min   drop change-log entries every consumer has acknowledged,
+                               while at least one consumer is registered
+    optimize          1 hour   PRAGMA optimize (re-analyzes tables whose statistics drifted)
+    vacuum            1 hour   PRAGMA incremental_vacuum, VACUUM_PAGES pages per step,
+                               when more than VACUUM_MIN_FREE of the file is free pages
+    analyze           1 day    ANALYZE, one table per step, bounded by ANALYSIS_LIMIT
+    integrity_check   1 week   PRAGMA quick_check, one table per step
+
+A task runs as a series of short steps. The scheduler only steps while the database
+is idle, meaning no other connection has committed (PRAGMA data_version) and touch()
+was not called for idle_after seconds. It gives the database back after slice_ms, so
+requests never queue behind a whole ANALYZE or vacuum. Each finished task is logged
+in maintenance_log with the time its steps took and the bytes it gave back to the
+file system; the log also decides when a task is next due, so schedules survive
+restarts.
+
+New databases are created with auto_vacuum=INCREMENTAL (see db.init_db). Older files
+need one full VACUUM to switch, enable_incremental_vacuum(); until then the vacuum
+task is never due, and freed pages are reused by later inserts without the file
+shrinking.
+"""
+import argparse
+import threading
+import time
+from typing import Dict, Iterable, List, Optional
+
+import db
+
+VACUUM_PAGES = 256
+VACUUM_MIN_FREE = 0.01
+ANALYSIS_LIMIT = 1000
+_INCREMENTAL = 2   # PRAGMA auto_vacuum value
+
+
+def _pragma(conn, name: str):
+    return conn.execute(f"PRAGMA {name}").fetchone()[0]
+
+
+def _tables(conn) -> List[str]:
+    return [r[0] for r in conn.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%' ORDER BY name")]
+
+
+# Each task is a generator that yields after every step and returns a short detail.
+
+def _prune_changes(conn):
+    n = db.prune_changes()
+    yield
+    return f"{n} change-log entries pruned"
+
+
+def _optimize(conn):
+    conn.execute(f"PRAGMA analysis_limit = {ANALYSIS_LIMIT}")
+    conn.execute("PRAGMA optimize")
+    yield
+    return "PRAGMA optimize"
+
+
+def _vacuum(conn):
+    if _pragma(conn, "auto_vacuum") != _INCREMENTAL:
+        yield
+        return "skipped: auto_vacuum is not INCREMENTAL (see enable_incremental_vacuum)"
+    before = free = _pragma(conn, "freelist_count")
+    while free:
+        # execute() steps a statement only once, freeing a single page; executescript
+        # runs it to completion
+        conn.executescript(f"PRAGMA incremental_vacuum({VACUUM_PAGES});")
+        free, last = _pragma(conn, "freelist_count"), free
+        yield
+        if free >= last:
+            break
+    return f"{before - free} free pages released"
+
+
+def _analyze(conn):
+    conn.execute(f"PRAGMA analysis_limit = {ANALYSIS_LIMIT}")
+    tables = _tables(conn)
+    for table in tables:
+        conn.execute(f'ANALYZE "{table}"')
+        conn.commit()
+        yield
+    return f"{len(tables)} tables analyzed"
+
+
+def _integrity_check(conn):
+    problems = []
+    tables = _tables(conn)
+    for table in tables:
+        problems += [r[0] for r in conn.execute(f'PRAGMA quick_check("{table}")') if r[0] != "ok"]
+        yield
+    if problems:
+        return f"{len(problems)} problem(s): " + "; ".join(problems[:5])
+    return f"ok ({len(tables)} tables)"
+
+
+def _prune_due(conn) -> bool:
+    # without consumers nothing is waiting on the log; db.prune_changes would only trim
+    # it to CHANGE_LOG_KEEP versions, which pollers may still need
+    return conn.execute("SELECT 1 FROM change_consumers LIMIT 1").fetchone() is not None
+
+
+def _vacuum_due(conn) -> bool:
+    return (_pragma(conn, "auto_vacuum") == _INCREMENTAL
+            and _pragma(conn, "freelist_count") > VACUUM_MIN_FREE * _pragma(conn, "page_count"))
+
+
+# name: (task, seconds between runs, extra condition or None)
+TASKS = {
+    "prune_changes": (_prune_changes, 600, _prune_due),
+    "optimize": (_optimize, 3600, None),
+    "vacuum": (_vacuum, 3600, _vacuum_due),
+    "analyze": (_analyze, 86400, None),
+    "integrity_check": (_integrity_check, 7 * 86400, None),
+}
+
+
+def due_tasks(conn=None, now: Optional[float] = None) -> List[str]:
+    conn = conn or db.connect()
+    now = time.time() if now is None else now
+    last = dict(conn.execute("SELECT task, MAX(started_at) FROM maintenance_log GROUP BY task"))
+    return [name for name, (_, every, when) in TASKS.items()
+            if now - last.get(name, 0) >= every and (when is None or when(conn))]
+
+
+class _TaskRun:
+    def __init__(self, conn, name: str):
+        self.conn = conn
+        self.name = name
+        self.started_at = time.time()
+        self.pages = _pragma(conn, "page_count")
+        self.work = 0.0
+        self.steps = 0
+        self._steps = TASKS[name][0](conn)
+
+    def step(self) -> Optional[Dict]:
+        """
+Run one step; returns the log entry once the task has finished.
+"""
+        t0 = time.perf_counter()
+        try:
+            next(self._steps)
+            detail = None
+        except StopIteration as done:
+            detail = done.value or ""
+        except Exception as e:
+            if self.conn.in_transaction:
+                self.conn.rollback()
+            detail = f"failed: {e}"
+        self.work += time.perf_counter() - t0
+        self.steps += 1
+        if detail is None:
+            return None
+        entry = {"task": self.name, "started_at": self.started_at, "duration_ms": round(self.work * 1000, 3),
+                 "steps": self.steps,
+                 "reclaimed_bytes": (self.pages - _pragma(self.conn, "page_count")) * _pragma(self.conn, "page_size"),
+                 "detail": detail}
+        self.conn.execute("""
+            INSERT INTO maintenance_log(task, started_at, duration_ms, steps, reclaimed_bytes, detail)
+            VALUES (:task, :started_at, :duration_ms, :steps, :reclaimed_bytes, :detail)
+        """, entry)
+        self.conn.commit()
+        return entry
+
+
+def run_pending(tasks: Optional[Iterable[str]] = None) -> List[Dict]:
+    """
+Run tasks to completion on db.connect(), right away: the given ones, or else every
+task that is due. Returns their log entries.
+"""
+    conn = db.connect()
+    names = list(tasks) if tasks is not None else due_tasks(conn)
+    for name in names:
+        if name not in TASKS:
+            raise ValueError(f"Unknown task {name!r}; expected one of {', '.join(TASKS)}.")
+    done = []
+    for name in names:
+        run = _TaskRun(conn, name)
+        entry = None
+        while entry is None:
+            entry = run.step()
+        done.append(entry)
+    return done
+
+
+def history(limit: Optional[int] = 50, task: Optional[str] = None) -> List[Dict]:
+    """
+Logged task runs, newest first.
+"""
+    where = "" if task is None else " WHERE task = ?"
+    params = [] if task is None else [task]
+    return db._select("SELECT task, started_at, duration_ms, steps, reclaimed_bytes, detail FROM maintenance_log"
+                      + where + " ORDER BY id DESC" + ("" if limit is None else " LIMIT ?"),
+                      params + ([] if limit is None else [limit]))
+
+
+def enable_incremental_vacuum() -> bool:
+    """
+Switch the database to auto_vacuum=INCREMENTAL. This rewrites the whole file with
+VACUUM, so run it during downtime. Returns False if it already was incremental.
+"""
+    conn = db.connect()
+    if _pragma(conn, "auto_vacuum") == _INCREMENTAL:
+        return False
+    if conn.in_transaction:
+        conn.commit()
+    conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+    conn.execute("VACUUM")
+    return True
+
+
+class MaintenanceScheduler:
+    def __init__(self, db_path: Optional[str] = None, slice_ms: float = 50, idle_after: float = 2.0,
+                 poll: float = 1.0):
+        """
+:param db_path: database file, defaults to the one db.py is using.
+:param slice_ms: longest stretch of maintenance steps between checks for activity.
+:param idle_after: seconds without commits from other connections (or touch())
+    before maintenance may run.
+:param poll: seconds between checks while busy or with nothing due.
+"""
+        self.db_path = db_path or db.default().path
+        self.slice_ms = slice_ms
+        self.idle_after = idle_after
+        self.poll = poll
+        self.completed: List[Dict] = []
+        self._activity = time.monotonic()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def touch(self):
+        """
+Report activity the scheduler cannot see, such as reads; maintenance waits
+idle_after seconds from now.
+"""
+        self._activity = time.monotonic()
+
+    def start(self):
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="db-maintenance", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """
+Stop after the current step; an unfinished task starts over next time.
+"""
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self) -> "MaintenanceScheduler":
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _run(self):
+        conn = db.open_connection(self.db_path)
+        db.bind_thread(conn)
+        version = _pragma(conn, "data_version")
+        current: Optional[_TaskRun] = None
+        try:
+            while not self._stop.wait(self.poll):
+                v = _pragma(conn, "data_version")
+                if v != version:
+                    version = v
+                    self._activity = time.monotonic()
+                deadline = time.monotonic() + self.slice_ms / 1000
+                while (not self._stop.is_set() and time.monotonic() - self._activity >= self.idle_after
+                       and time.monotonic() < deadline):
+                    if current is None:
+                        due = due_tasks(conn)
+                        if not due:
+                            break
+                        current = _TaskRun(conn, due[0])
+                    entry = current.step()
+                    if entry is not None:
+                        self.completed.append(entry)
+                        current = None
+                    if _pragma(conn, "data_version") != version:
+                        break   # someone else wrote: back off, the next poll notices
+        finally:
+            db.bind_thread(None)
+            conn.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run database maintenance tasks.")
+    parser.add_argument("--db", default="school.db")
+    parser.add_argument("--task", action="append", choices=sorted(TASKS), help="run this task even if not due (repeatable)")
+    parser.add_argument("--enable-incremental-vacuum", action="store_true",
+                        help="switch the file to auto_vacuum=INCREMENTAL first (one full VACUUM)")
+    parser.add_argument("--history", action="store_true", help="only print the maintenance log")
+    args = parser.parse_args(argv)
+    db.connect(args.db)
+    db.init_db()
+    if args.enable_incremental_vacuum:
+        print("switched to auto_vacuum=INCREMENTAL" if enable_incremental_vacuum() else "already incremental")
+    entries = history(20) if args.history else run_pending(args.task)
+    for e in entries:
+        print(f"{e['task']:<16} {e['duration_ms']:10.1f} ms  {e['steps']:4} step(s)  "
+              f"reclaimed {e['reclaimed_bytes']:>12,} bytes  {e['detail']}")
+    if not entries:
+        print("nothing due")
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,279 @@
+"""
+In-memory mode for interactive use: school.db is copied into a :memory: database when
+opened, so every read runs at memory speed, and writes reach the file in the background.
+
+    mem = memdb.enable("school.db", flush_interval=2.0)   # db.* calls now run in memory
+    db.enroll_student("S1", "C1")                         # applied in memory, journaled
+    mem.flush()                                           # or wait; close() at exit flushes
+
+    SCHOOL_MEMORY=2 python src/app_tk.py    # the GUIs in memory mode, flushing every 2 s
+
+Each db function call that changes rows is appended to the journal (school.db.pending)
+as one JSON line with a sequence number before it returns. Every flush_interval seconds,
+and at close(), a flusher thread replays the pending calls on the file in one
+transaction that also stores the last sequence number applied (table write_behind);
+each call runs in its own savepoint, so one failing on the file is rolled back alone
+and reported in errors.
+
+Crash recovery: opening first replays the journal lines newer than the file's
+write_behind sequence, so after a crash, even one mid-flush, no write is lost or
+applied twice; a torn last line is dropped. Lines are handed to the OS as they are
+written, so a process crash loses nothing, but fsynced only with durable=True: an OS
+crash or power cut can otherwise lose up to flush_interval of writes.
+
+Only db function calls are journaled, not SQL run on connection() directly, and their
+arguments must be JSON values. The copy is private: writes by other processes are
+applied to the file but not seen until reopening. Calls are serialized.
+"""
+import atexit
+import functools
+import inspect
+import json
+import os
+import threading
+from typing import Dict, List, Optional
+
+import db
+
+FLUSH_INTERVAL = 2.0
+
+_OWNERS: Dict[int, "MemoryDatabase"] = {}   # id(memory connection) -> its MemoryDatabase
+_routed = False
+
+
+def _route():
+    # Send module-level db calls made on a memory connection (the default, or bound by
+    # use()) through MemoryDatabase._call so they are journaled.
+    global _routed
+    if _routed:
+        return
+    for name, fn in list(vars(db).items()):
+        if (inspect.isfunction(fn) and fn.__module__ == db.__name__ and not name.startswith("_")
+                and name not in db._CONNECTION_FUNCTIONS):
+            setattr(db, name, _routed_call(fn))
+    _routed = True
+
+
+def _routed_call(fn):
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        bound = getattr(db._LOCAL, "conn", None)
+        target = db.default() if bound is None else _OWNERS.get(id(bound))
+        if isinstance(target, MemoryDatabase):
+            return target._call(fn, args, kwargs)
+        return fn(*args, **kwargs)
+    return wrapper
+
+
+class MemoryDatabase(db.Database):
+    """
+A Database whose connection is an in-memory copy of path, with write-behind to the
+file (see the module docstring). All threads share the one memory connection.
+"""
+    def __init__(self, path: str = "school.db", flush_interval: float = FLUSH_INTERVAL, durable: bool = False,
+                 pragmas: Optional[Dict] = None, **connect_kwargs):
+        super().__init__(path, pragmas, **connect_kwargs)
+        self.flush_interval = flush_interval
+        self.durable = durable
+        self.seq = 0          # last journaled write
+        self.flushed = 0      # last write applied to the file
+        self.recovered = 0    # writes replayed from the journal when opening
+        self.flushes = 0
+        self.errors: List[Dict] = []
+        self._mem = self._disk = self._journal = self._flusher = None
+        self._pending: List[Dict] = []
+        self._calls = threading.RLock()
+        self._journal_lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._state = threading.local()
+        _route()   # before the first call, which may be the one that opens
+
+    @property
+    def journal_path(self) -> str:
+        return self.path + ".pending"
+
+    def open(self):
+        """
+Replay any journal left by a crash onto the file, copy the file into memory and start
+the flusher. Called by the first db call.
+"""
+        with self._calls:
+            if self._mem is not None:
+                return
+            disk = db.open_connection(self.path, check_same_thread=False, **self.connect_kwargs)
+            for name, value in self.pragmas.items():
+                disk.execute(f"PRAGMA {name} = {value}")
+            prev = db.bind_thread(disk)
+            try:
+                db.init_db()
+            finally:
+                db.bind_thread(prev)
+            self._disk = disk
+            self.flushed = self.seq = disk.execute("SELECT seq FROM write_behind").fetchone()[0]
+            self._pending = self._read_journal()
+            self.recovered = len(self._pending)
+            self._journal = open(self.journal_path, "ab")
+            try:
+                self.flush()
+            except Exception:
+                self._journal.close()
+                disk.close()
+                self._disk = self._journal = None
+                raise
+            mem = db.open_connection(":memory:", check_same_thread=False, **self.connect_kwargs)
+            disk.backup(mem)
+            _OWNERS[id(mem)] = self
+            self._mem = mem
+            _route()
+            self._stop.clear()
+            self._flusher = threading.Thread(target=self._run, name="db-write-behind", daemon=True)
+            self._flusher.start()
+
+    def _read_journal(self) -> List[Dict]:
+        entries, good = [], 0
+        if os.path.exists(self.journal_path):
+            with open(self.journal_path, "r+b") as f:
+                for line in f:
+                    try:
+                        rec = json.loads(line)
+                    except ValueError:
+                        break   # torn tail from a crash mid-append
+                    good += len(line)
+                    if rec["seq"] > self.flushed:
+                        entries.append(rec)
+                    self.seq = max(self.seq, rec["seq"])
+                f.truncate(good if entries else 0)
+        return entries
+
+    def connection(self):
+        if self._mem is None:
+            self.open()
+        return self._mem
+
+    def _call(self, fn, args: tuple, kwargs: dict):
+        if getattr(self._state, "depth", 0):
+            return fn(*args, **kwargs)   # called from inside another db call
+        try:
+            line = json.dumps({"fn": fn.__name__, "args": args, "kwargs": kwargs}, separators=(",", ":"))
+        except TypeError as e:
+            raise TypeError(f"{fn.__name__}: MemoryDatabase journals only JSON arguments ({e}).") from None
+        with self._calls:
+            conn = self.connection()
+            before = conn.total_changes
+            self._state.depth = 1
+            prev = db.bind_thread(conn)
+            try:
+                result = fn(*args, **kwargs)
+            finally:
+                db.bind_thread(prev)
+                self._state.depth = 0
+            if conn.total_changes != before:
+                self._append(line)
+            return result
+
+    def _append(self, line: str):
+        with self._journal_lock:
+            self.seq += 1
+            rec = json.loads(line)
+            rec["seq"] = self.seq
+            self._journal.write(json.dumps(rec, separators=(",", ":")).encode("utf-8") + b"\n")
+            self._journal.flush()
+            if self.durable:
+                os.fsync(self._journal.fileno())
+            self._pending.append(rec)
+
+    def flush(self) -> int:
+        """
+Apply the pending writes to the file now; returns how many were applied.
+"""
+        with self._flush_lock:
+            with self._journal_lock:
+                entries = list(self._pending)
+            if not entries:
+                return 0
+            self._apply(entries)
+            with self._journal_lock:
+                del self._pending[:len(entries)]
+                if not self._pending:
+                    self._journal.truncate(0)   # everything in it is in the file now
+            self.flushes += 1
+            return len(entries)
+
+    def _apply(self, entries: List[Dict]):
+        disk = self._disk
+        prev = db.bind_thread(disk)
+        try:
+            disk.execute("BEGIN IMMEDIATE")
+            with db.deferred_commits():
+                for rec in entries:
+                    disk.execute("SAVEPOINT pending_write")
+                    try:
+                        inspect.unwrap(getattr(db, rec["fn"]))(*rec["args"], **rec["kwargs"])
+                    except Exception as e:
+                        disk.execute("ROLLBACK TO pending_write")
+                        self.errors.append({"seq": rec["seq"], "fn": rec["fn"], "error": str(e)})
+                    disk.execute("RELEASE pending_write")
+            disk.execute("UPDATE write_behind SET seq = ?", (entries[-1]["seq"],))
+            disk.commit()
+        except Exception:
+            if disk.in_transaction:
+                disk.rollback()
+            raise
+        finally:
+            db.bind_thread(prev)
+        self.flushed = entries[-1]["seq"]
+
+    def _run(self):
+        while not self._stop.wait(self.flush_interval):
+            try:
+                self.flush()
+            except Exception as e:   # e.g. the file is locked by another process: retried next time
+                self.errors.append({"seq": None, "fn": "flush", "error": str(e)})
+
+    def close(self):
+        """
+Stop the flusher, apply the pending writes and close; the next db call reopens.
+If the last flush fails, its writes stay in the journal for the next open.
+"""
+        with self._calls:
+            if self._mem is None:
+                return
+            self._stop.set()
+            self._flusher.join()
+            try:
+                self.flush()
+            finally:
+                self._journal.close()
+                if not self._pending:
+                    os.remove(self.journal_path)
+                del _OWNERS[id(self._mem)]
+                self._mem.close()
+                self._disk.close()
+                self._mem = self._disk = self._journal = self._flusher = None
+                self._pending = []
+
+    def __repr__(self) -> str:
+        return f"MemoryDatabase({self.path!r})"
+
+
+def enable(path: Optional[str] = None, flush_interval: float = FLUSH_INTERVAL, **kwargs) -> MemoryDatabase:
+    """
+Make a MemoryDatabase of path (default: the current default's file) the default
+Database, so module-level db calls run in memory; it is closed, and flushed, at exit.
+"""
+    mem = MemoryDatabase(path or db.default().path, flush_interval, **kwargs)
+    mem.open()
+    db.set_default(mem).close()
+    atexit.register(mem.close)
+    return mem
+
+
+def enable_from_env(var: str = "SCHOOL_MEMORY") -> Optional[MemoryDatabase]:
+    """
+enable() if the environment variable is set to a flush interval in seconds.
+"""
+    value = os.environ.get(var, "").strip()
+    if value and value != "0":
+        return enable(flush_interval=float(value))
+    return None
@@ -0,0 +1,216 @@
+"""
+Opt-in profiling of GUI actions: for each click, the wall time split into database
+and widget time, the db calls and SQL statements issued and the widget rows created.
+
+    SCHOOL_PROFILE=1 python src/app_tk.py               # log to stderr, status-line overlay
+    SCHOOL_PROFILE=profile.log python src/qt_app.py     # append to profile.log instead
+
+In GUI code:
+
+    @profiler.action()
+    def add_student(): ...          # one record per outermost call
+    profiler.rows(n)                # after creating n widget rows (list/tree/table rows)
+    profiler.subscribe(callback)    # callback(record) after every action, e.g. an overlay
+
+A record is {"action", "at", "wall_ms", "db_ms", "widget_ms", "wait_ms", "db_calls",
+"statements", "rows", "parts"}. DB time is time inside public db functions; widget time
+is the rest of the action. Time in modal dialogs (message boxes, file pickers,
+QDialog.exec_) is the user's, so it is kept out of wall time and reported as wait_ms;
+actions started from inside a dialog are recorded on their own. Actions called from
+another action are not recorded separately but listed in its "parts" with their time.
+Disabled (the default), decorated functions only check a flag.
+"""
+import functools
+import inspect
+import os
+import sys
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, List, Optional
+
+import db
+
+_enabled = False
+_log = None
+_listeners: List[Callable[[Dict], None]] = []
+_stack: List[List] = []      # [name, start] of the running actions, outermost first
+_current: Optional[Dict] = None
+_db_depth = 0
+_traced = None
+recent: Deque[Dict] = deque(maxlen=200)
+
+# Modal calls whose time belongs to the user: (module, class or None, attributes).
+_MODALS = (
+    ("tkinter.messagebox", None, ("showinfo", "showwarning", "showerror", "askquestion", "askokcancel",
+                                  "askyesno", "askyesnocancel", "askretrycancel")),
+    ("tkinter.filedialog", None, ("askopenfilename", "asksaveasfilename", "askdirectory")),
+    ("PyQt5.QtWidgets", "QMessageBox", ("information", "warning", "critical", "question")),
+    ("PyQt5.QtWidgets", "QFileDialog", ("getOpenFileName", "getSaveFileName", "getExistingDirectory")),
+    ("PyQt5.QtWidgets", "QDialog", ("exec_",)),
+)
+
+
+def enabled() -> bool:
+    return _enabled
+
+
+def enable(log=None):
+    """
+Start profiling. log is a file path to append records to, a file object, or None
+for stderr. Call after importing tkinter or PyQt5 so their dialogs are excluded.
+"""
+    global _enabled, _log
+    if _enabled:
+        return
+    _log = open(log, "a", encoding="utf-8") if isinstance(log, str) else (log or sys.stderr)
+    for name, fn in list(vars(db).items()):
+        if (inspect.isfunction(fn) and fn.__module__ == db.__name__ and not name.startswith("_")
+                and name not in db._CONNECTION_FUNCTIONS):
+            setattr(db, name, _timed_db(fn))
+    for module, owner, names in _MODALS:
+        target = sys.modules.get(module)
+        if target is not None and owner:
+            target = getattr(target, owner, None)
+        for name in names if target is not None else ():
+            if hasattr(target, name):
+                setattr(target, name, _waiting(getattr(target, name)))
+    _enabled = True
+
+
+def enable_from_env(var: str = "SCHOOL_PROFILE") -> bool:
+    """
+enable() if the environment variable is set: "1" logs to stderr, anything else is a
+log file path. Returns whether profiling is on.
+"""
+    value = os.environ.get(var, "").strip()
+    if value and value != "0":
+        enable(None if value == "1" else value)
+    return _enabled
+
+
+def subscribe(callback: Callable[[Dict], None]):
+    _listeners.append(callback)
+
+
+def rows(n: int = 1):
+    if _current is not None:
+        _current["rows"] += n
+
+
+def _on_statement(sql: str):
+    # statements run by triggers are traced as "-- TRIGGER ..." comments
+    if _current is not None and not sql.startswith("--"):
+        _current["statements"] += 1
+
+
+def _trace_connection():
+    global _traced
+    conn = db.connect()
+    if conn is not None and conn is not _traced:
+        conn.set_trace_callback(_on_statement)
+        _traced = conn
+
+
+def _timed_db(fn: Callable) -> Callable:
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        global _db_depth
+        if _current is None or _db_depth:
+            return fn(*args, **kwargs)
+        _trace_connection()
+        _db_depth += 1
+        t0 = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            _db_depth -= 1
+            _current["db_ms"] += (time.perf_counter() - t0) * 1000
+            _current["db_calls"] += 1
+            _trace_connection()
+    return wrapper
+
+
+def _waiting(fn: Callable) -> Callable:
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        global _current
+        if _current is None:
+            return fn(*args, **kwargs)
+        # set the running actions aside: whatever runs inside the dialog is its own action
+        saved, stack = _current, _stack[:]
+        _current = None
+        del _stack[:]
+        t0 = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            waited = time.perf_counter() - t0
+            _current, _stack[:] = saved, stack
+            _current["wait_ms"] += waited * 1000
+            for frame in _stack:
+                frame[1] += waited
+    return wrapper
+
+
+def _arity(fn: Callable) -> Optional[int]:
+    # Toolkits pass extra arguments (a Tk event, Qt's "checked") the callback may not take.
+    # Trimmed only while profiling; the GUIs connect actions through lambdas, so they get
+    # no extra arguments either way.
+    params = inspect.signature(fn).parameters.values()
+    if any(p.kind == p.VAR_POSITIONAL for p in params):
+        return None
+    return sum(p.kind in (p.POSITIONAL_ONLY, p.POSITIONAL_OR_KEYWORD) for p in params)
+
+
+def action(name: Optional[str] = None) -> Callable:
+    def decorate(fn: Callable) -> Callable:
+        label = name or fn.__name__
+        arity = _arity(fn)
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            global _current
+            if not _enabled:
+                return fn(*args, **kwargs)
+            if arity is not None:
+                args = args[:arity]
+            outermost = _current is None
+            if outermost:
+                _current = {"action": label, "at": time.time(), "wall_ms": 0.0, "db_ms": 0.0, "widget_ms": 0.0,
+                            "wait_ms": 0.0, "db_calls": 0, "statements": 0, "rows": 0, "parts": {}}
+            frame = [label, time.perf_counter()]
+            _stack.append(frame)
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                _stack.remove(frame)
+                elapsed = (time.perf_counter() - frame[1]) * 1000
+                if outermost:
+                    record, _current = _current, None
+                    record["wall_ms"] = round(elapsed, 3)
+                    record["db_ms"] = round(record["db_ms"], 3)
+                    record["widget_ms"] = round(max(0.0, elapsed - record["db_ms"]), 3)
+                    record["wait_ms"] = round(record["wait_ms"], 3)
+                    _finish(record)
+                elif _current is not None:
+                    parts = _current["parts"]
+                    parts[label] = round(parts.get(label, 0.0) + elapsed, 3)
+        return wrapper
+    return decorate
+
+
+def format_record(r: Dict) -> str:
+    parts = ", ".join(f"{k} {v:.1f}" for k, v in r["parts"].items())
+    return (f"{r['action']}: {r['wall_ms']:.1f} ms = db {r['db_ms']:.1f} ms ({r['db_calls']} calls, "
+            f"{r['statements']} statements) + widgets {r['widget_ms']:.1f} ms ({r['rows']} rows)"
+            + (f" [{parts}]" if parts else "") + (f", {r['wait_ms']:.0f} ms in dialogs" if r["wait_ms"] >= 1 else ""))
+
+
+def _finish(record: Dict):
+    recent.append(record)
+    if _log is not None:
+        stamp = time.strftime("%H:%M:%S", time.localtime(record["at"]))
+        _log.write(f"{stamp} {format_record(record)}\n")
+        _log.flush()
+    for callback in _listeners:
+        callback(record)
@@ -1,14 +1,16 @@
 
-import sys, re, csv
+import sys, re, csv, time
 from PyQt5.QtWidgets import (
     QApplication, QMainWindow, QWidget, QLabel, QLineEdit, QPushButton,
     QComboBox, QTableWidget, QTableWidgetItem, QHeaderView, QMessageBox,
-    QFileDialog, QHBoxLayout, QVBoxLayout, QFormLayout, QGroupBox, QDialog
+    QFileDialog, QHBoxLayout, QVBoxLayout, QFormLayout, QGroupBox, QDialog, QCompleter
 )
-from PyQt5.QtCore import Qt
+from PyQt5.QtCore import Qt, QTimer
 
 
 import db
+import memdb
+import profiler
 
 EMAIL_RE= re.compile(r"^[^@\s]+@[^@\s]+\.[^@\s]+$")
 
@@ -36,6 +38,80 @@ def validate_email(email: str) -> str:
     return email
 
 
+class TypeAheadCombo(QComboBox):
+    """
+Editable selector that only loads the first LIMIT ids/names starting with the
+typed text (db.prefix_search), re-queried DELAY_MS after the last key press.
+"""
+    LIMIT = 50
+    DELAY_MS = 150
+
+    def __init__(self, kind: str, extra=(), parent=None):
+        super().__init__(parent)
+        self.kind = kind
+        self.extra = list(extra)   # fixed (label, id) items listed first, e.g. ("(None)", None)
+        self.setEditable(True)
+        self.setInsertPolicy(QComboBox.NoInsert)
+        # the query already filtered the items, so the popup shows them all
+        self.completer().setCompletionMode(QCompleter.UnfilteredPopupCompletion)
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(self.DELAY_MS)
+        self._timer.timeout.connect(self._typed)
+        self.lineEdit().textEdited.connect(lambda _text: self._timer.start())
+
+    @profiler.action("type_ahead")
+    def refresh(self):
+        text = self.currentText()
+        prefix = text.split(" – ")[0]
+        if any(prefix == label for label, _ in self.extra):
+            prefix = ""
+        self.blockSignals(True)
+        self.clear()
+        for label, data in self.extra:
+            self.addItem(label, data)
+        for r in db.prefix_search(self.kind, prefix, self.LIMIT):
+            self.addItem(f"{r['id']} – {r['name']}", r["id"])
+        profiler.rows(self.count())
+        if text:
+            self.setCurrentIndex(self.findText(text))
+            self.setEditText(text)
+        self.blockSignals(False)
+
+    def update_row(self, id_, rec) -> bool:
+        """
+Redraw the item for id_ after a change elsewhere (rec None: it was deleted). Returns
+False for a new id, which may belong among the matches: the caller refresh()es then.
+"""
+        n = self.findData(id_)
+        if n < 0:
+            return rec is None
+        text = self.currentText()
+        self.blockSignals(True)
+        if rec is None:
+            self.removeItem(n)
+        else:
+            self.setItemText(n, f"{rec['id']} – {rec['name']}")
+        self.setEditText(text)
+        self.blockSignals(False)
+        return True
+
+    def _typed(self):
+        self.refresh()
+        if self.count():
+            self.completer().complete()
+
+    def selected_id(self):
+        """
+The chosen item's id; text that matches no item is taken as a typed id.
+"""
+        text = self.currentText().strip()
+        n = self.findText(text)
+        if n >= 0:
+            return self.itemData(n)
+        return text.split(" – ")[0].strip() or None
+
+
 class MainWindow(QMainWindow):
     def __init__(self):
         super().__init__()
@@ -63,18 +139,18 @@ class MainWindow(QMainWindow):
         main.addLayout(mid_row)
 
         self.register_btn=QPushButton("Register selected Student → Course")
-        self.register_btn.clicked.connect(self.register_student_to_course)
+        self.register_btn.clicked.connect(lambda: self.register_student_to_course())
         mid_row.addWidget(self.register_btn)
 
         self.assign_btn=QPushButton("Assign selected Instructor → Course")
-        self.assign_btn.clicked.connect(self.assign_instructor_to_course)
+        self.assign_btn.clicked.connect(lambda: self.assign_instructor_to_course())
         mid_row.addWidget(self.assign_btn)
 
         mid_row.addStretch(1)
         mid_row.addWidget(QLabel("Search:"))
         self.search_edit = QLineEdit()
         self.search_edit.setPlaceholderText("name, ID, email, course…")
-        self.search_edit.textChanged.connect(self.refresh_table_filtered)
+        self.search_edit.textChanged.connect(lambda: self.refresh_table_filtered())
         mid_row.addWidget(self.search_edit, stretch=1)
 
         self.table = QTableWidget(0, 4)
@@ -82,39 +158,63 @@ class MainWindow(QMainWindow):
         self.table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
         self.table.setSelectionBehavior(QTableWidget.SelectRows)
         self.table.setEditTriggers(QTableWidget.NoEditTriggers)
+        # header clicks re-query in that column's order (see sort_by_column)
+        header = self.table.horizontalHeader()
+        header.setSectionsClickable(True)
+        header.setSortIndicatorShown(True)
+        header.setSortIndicator(0, Qt.AscendingOrder)
+        header.sectionClicked.connect(self.sort_by_column)
+        self._sort = {"order_by": "type", "descending": False}
+        self._records_query = {}    # filters of the rows shown, None for a hand-picked list
+        self._records_next = None   # cursor of the next page, None when every row is shown
         main.addWidget(self.table, stretch=1)
 
         bottom_row=QHBoxLayout()
         main.addLayout(bottom_row)
 
         self.edit_btn=QPushButton("Edit")
-        self.edit_btn.clicked.connect(self.edit_selected)
+        self.edit_btn.clicked.connect(lambda: self.edit_selected())
         bottom_row.addWidget(self.edit_btn)
 
         self.delete_btn = QPushButton("Delete")
-        self.delete_btn.clicked.connect(self.delete_selected)
+        self.delete_btn.clicked.connect(lambda: self.delete_selected())
         bottom_row.addWidget(self.delete_btn)
 
         self.export_btn = QPushButton("Export")
-        self.export_btn.clicked.connect(self.export_csv)
+        self.export_btn.clicked.connect(lambda: self.export_csv())
         bottom_row.addWidget(self.export_btn)
 
         bottom_row.addStretch(1)
+        self.more_btn = QPushButton("More")
+        self.more_btn.setEnabled(False)
+        self.more_btn.clicked.connect(lambda: self.load_more_records())
+        bottom_row.addWidget(self.more_btn)
 
 
         self._build_menu()
-
+        if profiler.enabled():
+            # debug overlay: the last profiled action (SCHOOL_PROFILE=1, see profiler.py)
+            self.statusBar().showMessage("profiling: click something")
+            profiler.subscribe(lambda rec: self.statusBar().showMessage(profiler.format_record(rec)))
 
         self.refresh_combos()
         self.refresh_table()
 
+        self._change_version = db.current_version()
+        self._consumer = db.consumer_name("qt_app")
+        db.register_consumer(self._consumer, self._change_version)
+        self._ack_changes(self._change_version)
+        self._poll_timer = QTimer(self)
+        self._poll_timer.timeout.connect(self.poll_changes)
+        self._poll_timer.start(2000)
+
     #UI builders
     def _build_menu(self):
         bar = self.menuBar()
         file_menu = bar.addMenu("&File")
 
         act_backup = file_menu.addAction("Backup DB")
-        act_backup.triggered.connect(self.backup_db)
+        act_backup.triggered.connect(lambda: self.backup_db())
 
         file_menu.addSeparator()
         act_quit = file_menu.addAction("Exit")
@@ -132,11 +232,10 @@ class MainWindow(QMainWindow):
         form.addRow("Email:",self.in_email)
         form.addRow("ID:",self.in_id)
         btn = QPushButton("Add Instructor")
-        btn.clicked.connect(self.add_instructor)
+        btn.clicked.connect(lambda: self.add_instructor())
         form.addRow(btn)
 
-        self.in_selector = QComboBox()
-        self.in_selector.setEditable(False)
+        self.in_selector = TypeAheadCombo("instructors")
         form.addRow("Select to assign:", self.in_selector)
         return box
 
@@ -149,11 +248,10 @@ class MainWindow(QMainWindow):
         form.addRow("Name:", self.c_name)
 
         btn = QPushButton("Add Course")
-        btn.clicked.connect(self.add_course)
+        btn.clicked.connect(lambda: self.add_course())
         form.addRow(btn)
 
-        self.c_selector = QComboBox()
-        self.c_selector.setEditable(False)
+        self.c_selector = TypeAheadCombo("courses")
         form.addRow("Select Course:", self.c_selector)
         return box
 
@@ -169,82 +267,190 @@ class MainWindow(QMainWindow):
         form.addRow("Email:", self.s_email)
         form.addRow("ID:", self.s_id)
         btn = QPushButton("Add Student")
-        btn.clicked.connect(self.add_student)
+        btn.clicked.connect(lambda: self.add_student())
         form.addRow(btn)
 
-        self.s_selector = QComboBox()
-        self.s_selector.setEditable(False)
+        self.s_selector = TypeAheadCombo("students")
         form.addRow("Select Student:", self.s_selector)
         return box
 
 # UI
+    @profiler.action()
     def refresh_combos(self):
-        # Students selector
-        self.s_selector.blockSignals(True)
-        self.s_selector.clear()
-        for s in db.list_students():
-            self.s_selector.addItem(f"{s['id']} – {s['name']}", s['id'])
-        self.s_selector.blockSignals(False)
-
-        # Instructors selector
-        self.in_selector.blockSignals(True)
-        self.in_selector.clear()
-        for i in db.list_instructors():
-            self.in_selector.addItem(f"{i['id']} – {i['name']}", i['id'])
-        self.in_selector.blockSignals(False)
-
-        # Courses selector
-        self.c_selector.blockSignals(True)
-        self.c_selector.clear()
-        for c in db.list_courses():
-            inst_name = c['instructor_name'] if c['instructor_name'] else "None"
-            self.c_selector.addItem(f"{c['id']} – {c['name']} (Instructor: {inst_name})", c['id'])
-        self.c_selector.blockSignals(False)
+        # type-ahead selectors: reload the matches for whatever is typed in each
+        self.s_selector.refresh()
+        self.in_selector.refresh()
+        self.c_selector.refresh()
+
+    RECORDS_PAGE = 500
+    SORT_COLUMNS = ("type", "id", "name", "extra")   # per table column
 
+    @profiler.action()
     def refresh_table(self, filtered=None):
+        if filtered is None:
+            self.load_records({})
+            return
+        self.table.setRowCount(0)
+        for s in filtered.get("students", []):
+            self._set_row(self.table.rowCount(), "Student", s)
+
+        for i in filtered.get("instructors", []):
+            self._set_row(self.table.rowCount(), "Instructor", i)
+
+        for c in filtered.get("courses", []):
+            self._set_row(self.table.rowCount(), "Course", c)
+        profiler.rows(self.table.rowCount())
+        # a hand-picked list (fuzzy matches) has no next page and keeps its own order
+        self._records_query, self._records_next = None, None
+        self.more_btn.setEnabled(False)
+
+    def load_records(self, query):
+        """
+Show the first page of db.query_records(**query), sorted by the clicked header.
+"""
         self.table.setRowCount(0)
+        self._records_query, self._records_next = query, None
+        self.load_more_records()
 
-        if filtered is None:
-            students= db.list_students()
-            instructors= db.list_instructors()
-            courses =db.list_courses()
+    @profiler.action()
+    def load_more_records(self):
+        if self._records_query is None:
+            return
+        res = db.query_records(after=self._records_next, limit=self.RECORDS_PAGE, **self._sort, **self._records_query)
+        for rec in res["records"]:
+            self._set_row(self.table.rowCount(), rec["type"], rec)
+        self._records_next = res["next"]
+        self.more_btn.setEnabled(res["next"] is not None)
+        profiler.rows(len(res["records"]))
+
+    @profiler.action()
+    def sort_by_column(self, col):
+        """
+Header click: re-query sorted by that column, or the other way round if it already is.
+"""
+        order_by = self.SORT_COLUMNS[col]
+        descending = not self._sort["descending"] if self._sort["order_by"] == order_by else False
+        self._sort = {"order_by": order_by, "descending": descending}
+        self.table.horizontalHeader().setSortIndicator(col, Qt.DescendingOrder if descending else Qt.AscendingOrder)
+        if self._records_query is None:
+            self.refresh_table_filtered()
         else:
-            students =filtered.get("students", [])
-            instructors = filtered.get("instructors", [])
-            courses = filtered.get("courses", [])
+            self.load_records(self._records_query)
 
-        def add_row(type_, id_, name_, extra_, iid):
-            r = self.table.rowCount()
-            self.table.insertRow(r)
-            self.table.setItem(r,0,QTableWidgetItem(type_))
-            self.table.setItem(r, 1,QTableWidgetItem(id_))
-            self.table.setItem(r, 2,QTableWidgetItem(name_))
-            self.table.setItem(r,3, QTableWidgetItem(extra_))
-            for c in range(4):
-                self.table.item(r, c).setData(Qt.UserRole, iid)
-
-        for s in students:
-            add_row("Student", s["id"], s["name"], f"Age: {s['age']}, Email: {s['email']}", f"Student:{s['id']}")
-
-        for i in instructors:
-            add_row("Instructor", i["id"], i["name"], f"Age: {i['age']}, Email: {i['email']}", f"Instructor:{i['id']}")
+    def _showing_everything(self):
+        # new rows from other programs can only be placed when every row is shown in type order
+        return (self._records_query == {} and self._records_next is None
+                and self._sort == {"order_by": "type", "descending": False})
 
-        for c in courses:
-            inst_name = c["instructor_name"] if c["instructor_name"] else "None"
-            extra = f"Instructor: {inst_name}, Students: {c['enrolled_count']}"
-            add_row("Course", c["id"], c["name"], extra, f"Course:{c['id']}")
+    INSTRUCTOR_ROLE = Qt.UserRole + 1   # a course row's instructor_id, on its first cell
 
+    def _set_row(self, r, type_, rec, insert=True):
+        if type_ == "Course":
+            inst_name = rec["instructor_name"] if rec["instructor_name"] else "None"
+            extra = f"Instructor: {inst_name}, Students: {rec['enrolled_count']}"
+        else:
+            extra = f"Email: {rec['email']}, Age: {rec['age']}"   # sorted by email
+        if insert:
+            self.table.insertRow(r)
+        for c, text in enumerate((type_, rec["id"], rec["name"], extra)):
+            item = QTableWidgetItem(text)
+            item.setData(Qt.UserRole, f"{type_}:{rec['id']}")
+            self.table.setItem(r, c, item)
+        if type_ == "Course":
+            self.table.item(r, 0).setData(self.INSTRUCTOR_ROLE, rec["instructor_id"])
+
+    def _ack_changes(self, version):
+        # as a registered consumer, the change log is not pruned past what we have drawn
+        try:
+            db.ack_changes(self._consumer, version)
+        except ValueError:   # expired after CHANGE_CONSUMER_TTL without an ack (e.g. suspended)
+            db.register_consumer(self._consumer, version)
+        self._acked_at = time.monotonic()
+
+    def closeEvent(self, event):
+        self._poll_timer.stop()
+        db.drop_consumer(self._consumer)
+        super().closeEvent(event)
+
+    def poll_changes(self):
+        """
+Pick up changes made by other programs (or the server) since the last poll and
+redraw only the table rows and selector items they touch; new rows are added when
+the whole list is shown in its default order, otherwise they appear on the next refresh.
+"""
+        try:
+            res = db.changes_since(self._change_version)
+        except ValueError:
+            # the change log was pruned past our version: reload everything
+            self._change_version = db.current_version()
+            self.refresh_combos(); self.refresh_table_filtered()
+            self._ack_changes(self._change_version)
+            return
+        if res["version"] != self._change_version or time.monotonic() - self._acked_at > db.CHANGE_CONSUMER_TTL / 4:
+            self._ack_changes(res["version"])
+        self._change_version = res["version"]
+        rows = set()
+        for ch in res["changes"]:
+            if ch["table"] == "registrations":
+                rows.add(("Course", ch["key"]["course_id"]))
+            else:
+                rows.add((ch["table"][:-1].capitalize(), ch["key"]["id"]))
+        if not rows:
+            return
+        def row_map():
+            return {self.table.item(r, 0).data(Qt.UserRole): r for r in range(self.table.rowCount())}
+
+        shown = row_map()
+        changed, stale = set(rows), set()
+        instructors = {id_ for t, id_ in rows if t == "Instructor"}
+        if instructors:
+            # course rows show their instructor's name
+            rows.update(tuple(iid.split(":", 1)) for iid, r in shown.items()
+                        if iid.startswith("Course:") and self.table.item(r, 0).data(self.INSTRUCTOR_ROLE) in instructors)
+        getters = {"Student": db.get_student, "Instructor": db.get_instructor, "Course": db.get_course}
+        combos = {"Student": self.s_selector, "Instructor": self.in_selector, "Course": self.c_selector}
+        order = ("Student", "Instructor", "Course")
+        everything = self._showing_everything()
+        for type_, id_ in sorted(rows, key=lambda row: order.index(row[0])):
+            iid = f"{type_}:{id_}"
+            rec = getters[type_](id_)
+            if (type_, id_) in changed and not combos[type_].update_row(id_, rec):
+                stale.add(combos[type_])
+            r = shown.get(iid)
+            if rec is None:
+                if r is not None:
+                    self.table.removeRow(r)
+                    shown = row_map()
+            elif r is not None:
+                self._set_row(r, type_, rec, insert=False)
+            elif everything:
+                rank = order.index(type_)
+                self._set_row(sum(1 for k in shown if order.index(k.split(":", 1)[0]) <= rank), type_, rec)
+                shown = row_map()
+        for combo in stale:
+            combo.refresh()
+
+    @profiler.action()
     def refresh_table_filtered(self):
         q = (self.search_edit.text() or "").lower().strip()
         if not q:
             self.refresh_table()
             return
         try:
-            filtered = db.search_all(q)
-            self.refresh_table(filtered)
+            if db.query_records(types=["Student", "Instructor"], q=q, limit=1)["records"]:
+                self.load_records({"q": q})
+                return
+            # no exact substring match: fall back to typo-tolerant name search
+            hits = db.fuzzy_search(q)
+            self.refresh_table({
+                "students": [h for h in hits if h["kind"] == "student"],
+                "instructors": [h for h in hits if h["kind"] == "instructor"],
+                "courses": db.query_records(types=["Course"], q=q, order_by="id")["records"],
+            })
         except Exception as e:
             QMessageBox.critical(self, "Search Error", str(e))
 
+    @profiler.action()
     def add_instructor(self):
         try:
             name = validate_nonempty(self.in_name.text(), "Instructor name")
@@ -257,21 +463,19 @@ class MainWindow(QMainWindow):
         except Exception as e:
             QMessageBox.critical(self, "Error", str(e))
 
+    @profiler.action()
     def add_course(self):
         try:
             cid = validate_nonempty(self.c_id.text(), "Course ID")
             cname = validate_nonempty(self.c_name.text(), "Course name")
-            inst_id = None
-            if self.in_selector.count():
-                sel_idx = self.in_selector.currentIndex()
-                if sel_idx >= 0:
-                    inst_id = self.in_selector.itemData(sel_idx)
+            inst_id = self.in_selector.selected_id()
             db.create_course(cid, cname, inst_id)
             self.c_id.clear(); self.c_name.clear()
             self.refresh_combos(); self.refresh_table()
         except Exception as e:
             QMessageBox.critical(self, "Error", str(e))
 
+    @profiler.action()
     def add_student(self):
         try:
             name = validate_nonempty(self.s_name.text(), "Student name")
@@ -284,26 +488,32 @@ class MainWindow(QMainWindow):
         except Exception as e:
             QMessageBox.critical(self, "Error", str(e))
 
+    @profiler.action()
     def register_student_to_course(self):
-        if self.s_selector.count() == 0 or self.c_selector.count() == 0:
-            QMessageBox.warning(self, "Select", "You need at least one student and one course.")
+        sid = self.s_selector.selected_id()
+        cid = self.c_selector.selected_id()
+        if sid is None or cid is None:
+            QMessageBox.warning(self, "Select", "Pick a student and a course.")
             return
-        sid = self.s_selector.currentData()
-        cid = self.c_selector.currentData()
         try:
-            db.enroll_student(sid, cid)
+            status = db.enroll_student(sid, cid)
             self.refresh_table()
-            QMessageBox.information(self, "Enrolled",
-                f"{self.s_selector.currentText()} enrolled in {self.c_selector.currentText()}")
+            if status == db.WAITLISTED:
+                QMessageBox.information(self, "Waitlisted",
+                    f"{self.c_selector.currentText()} is full, {self.s_selector.currentText()} was waitlisted")
+            else:
+                QMessageBox.information(self, "Enrolled",
+                    f"{self.s_selector.currentText()} enrolled in {self.c_selector.currentText()}")
         except Exception as e:
             QMessageBox.critical(self, "Error", str(e))
 
+    @profiler.action()
     def assign_instructor_to_course(self):
-        if self.in_selector.count() == 0 or self.c_selector.count() == 0:
-            QMessageBox.warning(self, "Select", "You need at least one instructor and one course.")
+        iid = self.in_selector.selected_id()
+        cid = self.c_selector.selected_id()
+        if iid is None or cid is None:
+            QMessageBox.warning(self, "Select", "Pick an instructor and a course.")
             return
-        iid = self.in_selector.currentData()
-        cid = self.c_selector.currentData()
         try:
             db.assign_instructor(cid, iid)
             self.refresh_combos()
@@ -333,6 +543,7 @@ class MainWindow(QMainWindow):
         t, id_ = iid.split(":", 1)
         return t, id_
 
+    @profiler.action()
     def edit_selected(self):
         t, id_ = self._selected_row_key()
         if not t:
@@ -356,6 +567,7 @@ class MainWindow(QMainWindow):
         except Exception as e:
             QMessageBox.critical(self, "Error", str(e))
 
+    @profiler.action()
     def delete_selected(self):
         t, id_ = self._selected_row_key()
         if not t:
@@ -391,6 +603,7 @@ class MainWindow(QMainWindow):
         row.addWidget(ok); row.addWidget(cancel)
         layout.addRow(row)
 
+        @profiler.action()
         def save():
             try:
                 new_name = validate_nonempty(name.text(), "Name")
@@ -401,7 +614,7 @@ class MainWindow(QMainWindow):
             except Exception as e:
                 QMessageBox.critical(self, "Invalid data", str(e))
 
-        ok.clicked.connect(save)
+        ok.clicked.connect(lambda: save())
         cancel.clicked.connect(dlg.reject)
 
         if dlg.exec_():
@@ -422,6 +635,7 @@ class MainWindow(QMainWindow):
         row.addWidget(ok); row.addWidget(cancel)
         layout.addRow(row)
 
+        @profiler.action()
         def save():
             try:
                 new_name = validate_nonempty(name.text(), "Name")
@@ -432,7 +646,7 @@ class MainWindow(QMainWindow):
             except Exception as e:
                 QMessageBox.critical(self, "Invalid data", str(e))
 
-        ok.clicked.connect(save)
+        ok.clicked.connect(lambda: save())
         cancel.clicked.connect(dlg.reject)
 
         if dlg.exec_():
@@ -445,18 +659,10 @@ class MainWindow(QMainWindow):
         name = QLineEdit(c["name"])
         layout.addRow("Name:", name)
 
-        inst_combo = QComboBox()
-        inst_combo.addItem("(None)", None)
-        sel_index = 0
-        idx = 1
-        all_instructors = db.list_instructors()
-        for ins in all_instructors:
-            label = f"{ins['id']} – {ins['name']}"
-            inst_combo.addItem(label, ins["id"])
-            if c["instructor_id"] == ins["id"]:
-                sel_index = idx
-            idx += 1
-        inst_combo.setCurrentIndex(sel_index)
+        inst_combo = TypeAheadCombo("instructors", extra=[("(None)", None)])
+        if c["instructor_id"]:
+            inst_combo.setEditText(f"{c['instructor_id']} – {c['instructor_name']}")
+        inst_combo.refresh()
         layout.addRow("Instructor:", inst_combo)
 
         row = QHBoxLayout()
@@ -464,22 +670,24 @@ class MainWindow(QMainWindow):
         row.addWidget(ok); row.addWidget(cancel)
         layout.addRow(row)
 
+        @profiler.action()
         def save():
             try:
                 cname = validate_nonempty(name.text(), "Course name")
-                iid = inst_combo.currentData()
+                iid = inst_combo.selected_id()
                 db.update_course(c["id"], cname, iid)
                 dlg.accept()
             except Exception as e:
                 QMessageBox.critical(self, "Invalid data", str(e))
 
-        ok.clicked.connect(save)
+        ok.clicked.connect(lambda: save())
         cancel.clicked.connect(dlg.reject)
 
         if dlg.exec_():
             self.refresh_combos()
             self.refresh_table()
 
+    @profiler.action()
     def export_csv(self):
         if self.table.rowCount() == 0:
             QMessageBox.warning(self, "Nothing to export", "No rows to export.")
@@ -501,6 +709,7 @@ class MainWindow(QMainWindow):
         except Exception as e:
             QMessageBox.critical(self, "Error", str(e))
 
+    @profiler.action()
     def backup_db(self):
         path, _ = QFileDialog.getSaveFileName(self, "Backup DB", filter="SQLite DB (*.db)")
         if not path:
@@ -514,6 +723,8 @@ class MainWindow(QMainWindow):
 
 def main():
     app = QApplication(sys.argv)
+    profiler.enable_from_env()
+    memdb.enable_from_env()
     w = MainWindow()
     w.show()
     sys.exit(app.exec_())
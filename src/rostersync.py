@@ -0,0 +1,284 @@
+"""
+Nightly sync of school.db with the registrar's full CSV exports, writing only what changed.
+
+    python src/rostersync.py --db school.db --students students.csv --enrollments enrollments.csv
+    python src/rostersync.py --db school.db --students students.csv --dry-run   # counts only
+
+    rostersync.sync("students.csv", "enrollments.csv")
+    # {"students": {"rows", "inserted", "updated", "deleted", "unchanged", "duplicates", "seconds"},
+    #  "enrollments": {"rows", "inserted", "deleted", "unchanged", "skipped", "duplicates", "seconds"}, "seconds"}
+
+students.csv has the columns id, name, age, email and enrollments.csv student_id,
+course_id (header names in any order and case; other columns are ignored). Values are
+stripped as create_student strips them, and the first of two rows with the same key
+wins (counted as duplicates).
+
+Each file is streamed into a temp table and compared in SQL. A student row is hashed
+and checked against the hash stored for that id by the previous sync (sync_hashes):
+an unchanged hash skips the row without reading it, so edits made in the app survive
+until the registrar changes that row. A new or changed hash is written only if the
+stored row differs. Students and enrollments the file no longer lists are deleted
+(keep_missing to turn off; deleting a student also drops their registrations);
+enrollments naming an unknown student or course are skipped. Waitlists give way to
+the file: enrolled students leave them, and courses the file drops students from
+(directly, or by deleting the student) lose theirs rather than promote students the
+file does not list. Every row is validated while the file is staged, before anything
+is written. The changes are then applied in batches of batch rows, each in its own
+transaction, so the triggers, indexes and change log see only the rows that changed.
+"""
+import argparse
+import csv
+import hashlib
+import time
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import db
+
+BATCH_ROWS = 5_000
+
+_STAGE_STUDENTS = """
+    CREATE TEMP TABLE IF NOT EXISTS sync_students (
+        id TEXT PRIMARY KEY, name TEXT, age INTEGER, email TEXT, hash BLOB) WITHOUT ROWID;
+    CREATE TEMP TABLE IF NOT EXISTS sync_student_changes (
+        n INTEGER PRIMARY KEY, op TEXT NOT NULL, id TEXT NOT NULL, name TEXT, age INTEGER, email TEXT, hash BLOB);
+    DELETE FROM temp.sync_students;
+    DELETE FROM temp.sync_student_changes;
+"""
+# 'hash' only records the hash of a row that already matches the file.
+_DIFF_STUDENTS = """
+    INSERT INTO temp.sync_student_changes(op, id, name, age, email, hash)
+    SELECT CASE WHEN s.id IS NULL THEN 'insert'
+                WHEN s.name IS NOT t.name OR s.age IS NOT t.age OR s.email IS NOT t.email THEN 'update'
+                ELSE 'hash' END,
+           t.id, t.name, t.age, t.email, t.hash
+    FROM temp.sync_students t
+    LEFT JOIN students s ON s.id = t.id
+    LEFT JOIN sync_hashes h ON h.student_id = t.id
+    WHERE s.id IS NULL OR h.hash IS NOT t.hash
+"""
+_MISSING_STUDENTS = """
+    INSERT INTO temp.sync_student_changes(op, id)
+    SELECT 'delete', s.id FROM students s
+    WHERE NOT EXISTS (SELECT 1 FROM temp.sync_students t WHERE t.id = s.id)
+"""
+# A student delete cascades to their registrations, so, as in _APPLY_ENROLLMENTS, the
+# waitlists of those courses are cleared first and trg_registrations_promote finds no one.
+_APPLY_STUDENTS = [
+    """INSERT INTO students(id, name, age, email)
+       SELECT id, name, age, email FROM temp.sync_student_changes WHERE n > ?1 AND n <= ?2 AND op = 'insert'""",
+    """UPDATE students SET name = c.name, age = c.age, email = c.email
+       FROM temp.sync_student_changes c WHERE c.id = students.id AND c.n > ?1 AND c.n <= ?2 AND c.op = 'update'""",
+    """DELETE FROM waitlist WHERE course_id IN
+       (SELECT r.course_id FROM registrations r JOIN temp.sync_student_changes c ON c.id = r.student_id
+        WHERE c.n > ?1 AND c.n <= ?2 AND c.op = 'delete')""",
+    """DELETE FROM students
+       WHERE id IN (SELECT id FROM temp.sync_student_changes WHERE n > ?1 AND n <= ?2 AND op = 'delete')""",
+    """INSERT INTO sync_hashes(student_id, hash)
+       SELECT id, hash FROM temp.sync_student_changes WHERE n > ?1 AND n <= ?2 AND op != 'delete'
+       ON CONFLICT(student_id) DO UPDATE SET hash = excluded.hash""",
+    """DELETE FROM sync_hashes
+       WHERE student_id IN (SELECT id FROM temp.sync_student_changes WHERE n > ?1 AND n <= ?2 AND op = 'delete')""",
+]
+
+_STAGE_ENROLLMENTS = """
+    CREATE TEMP TABLE IF NOT EXISTS sync_enrollments (
+        student_id TEXT, course_id TEXT, PRIMARY KEY(student_id, course_id)) WITHOUT ROWID;
+    CREATE TEMP TABLE IF NOT EXISTS sync_enrollment_changes (
+        n INTEGER PRIMARY KEY, op TEXT NOT NULL, student_id TEXT NOT NULL, course_id TEXT NOT NULL);
+    DELETE FROM temp.sync_enrollments;
+    DELETE FROM temp.sync_enrollment_changes;
+"""
+# An enrollment row is all key, so enrollments are compared by presence.
+_DIFF_ENROLLMENTS = """
+    INSERT INTO temp.sync_enrollment_changes(op, student_id, course_id)
+    SELECT 'insert', t.student_id, t.course_id FROM temp.sync_enrollments t
+    WHERE NOT EXISTS (SELECT 1 FROM registrations r WHERE r.student_id = t.student_id AND r.course_id = t.course_id)
+      AND EXISTS (SELECT 1 FROM students s WHERE s.id = t.student_id)
+      AND EXISTS (SELECT 1 FROM courses c WHERE c.id = t.course_id)
+"""
+_UNKNOWN_ENROLLMENTS = """
+    SELECT COUNT(*) FROM temp.sync_enrollments t
+    WHERE NOT EXISTS (SELECT 1 FROM students s WHERE s.id = t.student_id)
+       OR NOT EXISTS (SELECT 1 FROM courses c WHERE c.id = t.course_id)
+"""
+_MISSING_ENROLLMENTS = """
+    INSERT INTO temp.sync_enrollment_changes(op, student_id, course_id)
+    SELECT 'delete', r.student_id, r.course_id FROM registrations r
+    WHERE NOT EXISTS (SELECT 1 FROM temp.sync_enrollments t
+                      WHERE t.student_id = r.student_id AND t.course_id = r.course_id)
+"""
+# Waitlists are cleared before the registration deletes, in the same transaction, so
+# trg_registrations_promote finds no one to promote (see the module docstring).
+_APPLY_ENROLLMENTS = [
+    """INSERT OR IGNORE INTO registrations(student_id, course_id)
+       SELECT student_id, course_id FROM temp.sync_enrollment_changes WHERE n > ?1 AND n <= ?2 AND op = 'insert'""",
+    """DELETE FROM waitlist WHERE (student_id, course_id) IN
+       (SELECT student_id, course_id FROM temp.sync_enrollment_changes WHERE n > ?1 AND n <= ?2 AND op = 'insert')""",
+    """DELETE FROM waitlist WHERE course_id IN
+       (SELECT course_id FROM temp.sync_enrollment_changes WHERE n > ?1 AND n <= ?2 AND op = 'delete')""",
+    """DELETE FROM registrations WHERE (student_id, course_id) IN
+       (SELECT student_id, course_id FROM temp.sync_enrollment_changes WHERE n > ?1 AND n <= ?2 AND op = 'delete')""",
+]
+
+
+def _read_csv(path: str, columns: Tuple[str, ...]) -> Iterator[Tuple[int, List[str]]]:
+    # (line number, values of columns) per non-blank row
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        reader = csv.reader(f)
+        header = [h.strip().lower() for h in next(reader, [])]
+        missing = [c for c in columns if c not in header]
+        if missing:
+            raise ValueError(f"{path}: missing column(s) {', '.join(missing)} (found {', '.join(header) or 'none'}).")
+        at = [header.index(c) for c in columns]
+        for row in reader:
+            if any(v.strip() for v in row):
+                yield reader.line_num, [row[i].strip() if i < len(row) else "" for i in at]
+
+
+def row_hash(name: str, age: int, email: str) -> bytes:
+    return hashlib.blake2b(f"{name}\x1f{age}\x1f{email}".encode("utf-8"), digest_size=8).digest()
+
+
+def _student_rows(path: str) -> Iterator[tuple]:
+    # Every constraint of the students table is checked here, while staging, so a bad
+    # row fails the sync before its first batch is written.
+    for line, (sid, name, age, email) in _read_csv(path, ("id", "name", "age", "email")):
+        if not sid or not name:
+            raise ValueError(f"{path}:{line}: id and name are required.")
+        try:
+            age = int(age)
+        except ValueError:
+            raise ValueError(f"{path}:{line}: age must be a whole number, got {age!r}.") from None
+        if age < 0:
+            raise ValueError(f"{path}:{line}: age must not be negative, got {age}.")
+        yield sid, name, age, email, row_hash(name, age, email)
+
+
+def _enrollment_rows(path: str) -> Iterator[tuple]:
+    for line, (sid, cid) in _read_csv(path, ("student_id", "course_id")):
+        if not sid or not cid:
+            raise ValueError(f"{path}:{line}: student_id and course_id are required.")
+        yield sid, cid
+
+
+def _stage(conn, insert_sql: str, rows: Iterator[tuple], batch: int) -> int:
+    # Stream rows into a temp table; returns how many were read.
+    read, chunk = 0, []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= batch:
+            conn.executemany(insert_sql, chunk)
+            read += len(chunk)
+            chunk = []
+    conn.executemany(insert_sql, chunk)
+    conn.commit()
+    return read + len(chunk)
+
+
+def _count_ops(conn, table: str) -> Dict[str, int]:
+    return dict(conn.execute(f"SELECT op, COUNT(*) FROM temp.{table} GROUP BY op"))
+
+
+def _apply(conn, table: str, statements: List[str], batch: int):
+    # Changes are numbered n = 1, 2, ...: apply them batch rows per transaction.
+    total = conn.execute(f"SELECT IFNULL(MAX(n), 0) FROM temp.{table}").fetchone()[0]
+    for start in range(0, total, batch):
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for sql in statements:
+                conn.execute(sql, (start, start + batch))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+
+def sync_students(path: str, keep_missing: bool = False, batch: int = BATCH_ROWS) -> Dict[str, int]:
+    t0 = time.perf_counter()
+    conn = db.connect()
+    conn.executescript(_STAGE_STUDENTS)
+    rows = _stage(conn, "INSERT OR IGNORE INTO temp.sync_students VALUES(?,?,?,?,?)", _student_rows(path), batch)
+    staged = conn.execute("SELECT COUNT(*) FROM temp.sync_students").fetchone()[0]
+    conn.execute(_DIFF_STUDENTS)
+    if not keep_missing:
+        conn.execute(_MISSING_STUDENTS)
+    conn.commit()
+    ops = _count_ops(conn, "sync_student_changes")
+    _apply(conn, "sync_student_changes", _APPLY_STUDENTS, batch)
+    conn.executescript("DELETE FROM temp.sync_students; DELETE FROM temp.sync_student_changes;")
+    return {"rows": rows, "inserted": ops.get("insert", 0), "updated": ops.get("update", 0),
+            "deleted": ops.get("delete", 0), "unchanged": staged - ops.get("insert", 0) - ops.get("update", 0),
+            "duplicates": rows - staged, "seconds": round(time.perf_counter() - t0, 3)}
+
+
+def sync_enrollments(path: str, keep_missing: bool = False, batch: int = BATCH_ROWS) -> Dict[str, int]:
+    t0 = time.perf_counter()
+    conn = db.connect()
+    conn.executescript(_STAGE_ENROLLMENTS)
+    rows = _stage(conn, "INSERT OR IGNORE INTO temp.sync_enrollments VALUES(?,?)", _enrollment_rows(path), batch)
+    staged = conn.execute("SELECT COUNT(*) FROM temp.sync_enrollments").fetchone()[0]
+    skipped = conn.execute(_UNKNOWN_ENROLLMENTS).fetchone()[0]
+    conn.execute(_DIFF_ENROLLMENTS)
+    if not keep_missing:
+        conn.execute(_MISSING_ENROLLMENTS)
+    conn.commit()
+    ops = _count_ops(conn, "sync_enrollment_changes")
+    _apply(conn, "sync_enrollment_changes", _APPLY_ENROLLMENTS, batch)
+    conn.executescript("DELETE FROM temp.sync_enrollments; DELETE FROM temp.sync_enrollment_changes;")
+    return {"rows": rows, "inserted": ops.get("insert", 0), "deleted": ops.get("delete", 0),
+            "unchanged": staged - skipped - ops.get("insert", 0), "skipped": skipped,
+            "duplicates": rows - staged, "seconds": round(time.perf_counter() - t0, 3)}
+
+
+def sync(students: Optional[str] = None, enrollments: Optional[str] = None, keep_missing: bool = False,
+         batch: int = BATCH_ROWS, dry_run: bool = False) -> Dict:
+    """
+Sync the students file, then the enrollments file (either may be None), and return
+the delta counts and seconds of each (see the module docstring). dry_run syncs an
+in-memory copy of the database instead, so the counts are exactly what a real run
+would write.
+"""
+    if dry_run:
+        copy = db.open_connection(":memory:")
+        db.connect().backup(copy)
+        prev = db.bind_thread(copy)
+        try:
+            return sync(students, enrollments, keep_missing, batch)
+        finally:
+            db.bind_thread(prev)
+            copy.close()
+    t0 = time.perf_counter()
+    report: Dict = {}
+    if students:
+        report["students"] = sync_students(students, keep_missing, batch)
+    if enrollments:
+        report["enrollments"] = sync_enrollments(enrollments, keep_missing, batch)
+    report["seconds"] = round(time.perf_counter() - t0, 3)
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Sync school.db with the registrar's full student and enrollment CSVs.")
+    parser.add_argument("--db", default="school.db")
+    parser.add_argument("--students", help="students CSV: id, name, age, email")
+    parser.add_argument("--enrollments", help="enrollments CSV: student_id, course_id")
+    parser.add_argument("--keep-missing", action="store_true", help="do not delete rows the files no longer list")
+    parser.add_argument("--batch", type=int, default=BATCH_ROWS, help="changed rows per transaction")
+    parser.add_argument("--dry-run", action="store_true", help="only count the changes (syncs an in-memory copy)")
+    args = parser.parse_args(argv)
+    if not args.students and not args.enrollments:
+        parser.error("give --students, --enrollments or both")
+    db.connect(args.db)
+    db.init_db()
+    report = sync(args.students, args.enrollments, args.keep_missing, args.batch, args.dry_run)
+    for kind in ("students", "enrollments"):
+        if kind in report:
+            r = report[kind]
+            print(f"{kind}{' (dry run)' if args.dry_run else ''}: "
+                  + ", ".join(f"{r[k]:,} {k}" for k in r if k != "seconds") + f" in {r['seconds']:.2f}s")
+    print(f"total {report['seconds']:.2f}s")
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,412 @@
+"""
+Local HTTP/JSON service over db.py.
+
+One process owns a small pool of SQLite connections and serves every client, instead
+of each desktop client opening school.db itself.
+
+    python src/server.py --db school.db --port 8765
+
+Routes (JSON in, JSON out):
+    GET    /students?after=<id>&limit=<n>       page of students, {"items": [...], "next": <id>|null}
+    GET    /students/<id>
+    POST   /students                            {"id", "name", "age", "email"}
+    PUT    /students/<id>                       {"name", "age", "email"}
+    DELETE /students/<id>
+    ...    /instructors                         same shape as students
+    GET    /courses?after=<id>&limit=<n>
+    GET    /courses/<id>
+    POST   /courses                             {"id", "name", "instructor_id"?, "capacity"?}
+    PUT    /courses/<id>                        {"name", "instructor_id"?}
+    DELETE /courses/<id>
+    GET    /courses/<id>/students?after=&limit=  enrolled students
+    PUT    /courses/<id>/instructor             {"instructor_id"}
+    POST   /enrollments                         {"student_id", "course_id", "section_id"?} -> status enrolled/waitlisted
+    GET    /search?q=<text>
+    GET    /search/fuzzy?q=<text>&threshold=&limit=  typo-tolerant name search, best first
+    GET    /records?order_by=&desc=1&types=&q=&min_age=&max_age=&email_domain=&instructor_id=&min_enrolled=&after=&limit=
+                                                all three kinds in one sorted, filtered list (db.query_records);
+                                                {"items": [...], "next": cursor|null}, pass the cursor as after=<JSON>
+    GET    /changes?since=<version>&limit=<n>   {"version", "changes": [...]}, see db.changes_since
+
+Connections are HTTP/1.1 keep-alive. GET responses carry an ETag and honour
+If-None-Match; bodies of 1 KiB or more are gzipped when the client accepts it.
+"""
+import argparse
+import gzip
+import hashlib
+import json
+import queue
+import re
+import sqlite3
+import traceback
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+from urllib.parse import parse_qs, unquote, urlsplit
+
+import db
+import maintenance
+
+DEFAULT_PAGE = 100
+MAX_PAGE = 1000
+GZIP_MIN_BYTES = 1024
+
+
+class ConnectionPool:
+    def __init__(self, db_path: str, size: int = 4):
+        self._idle: "queue.Queue[sqlite3.Connection]" = queue.Queue()
+        for _ in range(size):
+            self._idle.put(db.open_connection(db_path, check_same_thread=False))
+
+    @contextmanager
+    def connection(self):
+        """
+Borrow a connection and bind it to the calling thread for the duration.
+"""
+        conn = self._idle.get()
+        prev = db.bind_thread(conn)
+        try:
+            yield conn
+        finally:
+            db.bind_thread(prev)
+            if conn.in_transaction:
+                conn.rollback()
+            self._idle.put(conn)
+
+    def close(self):
+        while not self._idle.empty():
+            self._idle.get_nowait().close()
+
+
+class HttpError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+# JSON types accepted per body field; anything not listed must be a string.
+_FIELD_TYPES = {"age": (int, str), "capacity": (int,)}
+
+
+def _checked(field: str, value):
+    types = _FIELD_TYPES.get(field, (str,))
+    if isinstance(value, bool) or not isinstance(value, types):
+        raise HttpError(400, f"{field} must be {' or '.join('an integer' if t is int else 'a string' for t in types)}")
+    return value
+
+
+def _required(body: dict, *fields):
+    missing = [f for f in fields if body.get(f) in (None, "")]
+    if missing:
+        raise HttpError(400, f"Missing field(s): {', '.join(missing)}")
+    return [_checked(f, body[f]) for f in fields]
+
+
+def _optional(body: dict, field: str):
+    value = body.get(field)
+    return None if value is None else _checked(field, value)
+
+
+def _page_args(query: dict):
+    after = query.get("after", [None])[0]
+    try:
+        limit = int(query.get("limit", [DEFAULT_PAGE])[0])
+    except ValueError:
+        raise HttpError(400, "limit must be an integer")
+    return after, max(1, min(limit, MAX_PAGE))
+
+
+def _page(items, limit):
+    return {"items": items, "next": items[-1]["id"] if len(items) == limit else None}
+
+
+def _found(row: Optional[dict], what: str) -> dict:
+    if row is None:
+        raise HttpError(404, f"{what} not found")
+    return row
+
+
+def _people_routes(kind: str, create, get, list_, update, delete):
+    what = kind[:-1].capitalize()
+
+    def collection(method, query, body):
+        if method == "GET":
+            after, limit = _page_args(query)
+            return 200, _page(list_(after=after, limit=limit), limit)
+        if method == "POST":
+            pid, name, age, email = _required(body, "id", "name", "age", "email")
+            create(pid, name, age, email)
+            return 201, get(pid.strip())
+        raise HttpError(405, "Method not allowed")
+
+    def item(method, query, body, pid):
+        if method == "GET":
+            return 200, _found(get(pid), what)
+        if method == "PUT":
+            _found(get(pid), what)
+            name, age, email = _required(body, "name", "age", "email")
+            update(pid, name, age, email)
+            return 200, get(pid)
+        if method == "DELETE":
+            _found(get(pid), what)
+            delete(pid)
+            return 204, None
+        raise HttpError(405, "Method not allowed")
+
+    return [(re.compile(rf"^/{kind}$"), collection), (re.compile(rf"^/{kind}/([^/]+)$"), item)]
+
+
+def _courses(method, query, body):
+    if method == "GET":
+        after, limit = _page_args(query)
+        return 200, _page(db.list_courses(after=after, limit=limit), limit)
+    if method == "POST":
+        cid, name = _required(body, "id", "name")
+        db.create_course(cid, name, _optional(body, "instructor_id"), _optional(body, "capacity"))
+        return 201, db.get_course(cid.strip())
+    raise HttpError(405, "Method not allowed")
+
+
+def _course(method, query, body, cid):
+    if method == "GET":
+        return 200, _found(db.get_course(cid), "Course")
+    if method == "PUT":
+        _found(db.get_course(cid), "Course")
+        (name,) = _required(body, "name")
+        db.update_course(cid, name, _optional(body, "instructor_id"))
+        return 200, db.get_course(cid)
+    if method == "DELETE":
+        _found(db.get_course(cid), "Course")
+        db.delete_course(cid)
+        return 204, None
+    raise HttpError(405, "Method not allowed")
+
+
+def _course_students(method, query, body, cid):
+    if method != "GET":
+        raise HttpError(405, "Method not allowed")
+    _found(db.get_course(cid), "Course")
+    after, limit = _page_args(query)
+    return 200, _page(db.list_enrolled(cid, after=after, limit=limit), limit)
+
+
+def _course_instructor(method, query, body, cid):
+    if method != "PUT":
+        raise HttpError(405, "Method not allowed")
+    _found(db.get_course(cid), "Course")
+    db.assign_instructor(cid, _optional(body, "instructor_id"))
+    return 200, db.get_course(cid)
+
+
+def _enrollments(method, query, body):
+    if method != "POST":
+        raise HttpError(405, "Method not allowed")
+    sid, cid = _required(body, "student_id", "course_id")
+    section = _optional(body, "section_id")
+    status = db.enroll_student(sid, cid, section)
+    return (201 if status == db.ENROLLED else 200), {"student_id": sid, "course_id": cid, "section_id": section,
+                                                     "status": status}
+
+
+def _search(method, query, body):
+    if method != "GET":
+        raise HttpError(405, "Method not allowed")
+    return 200, db.search_all(query.get("q", [""])[0])
+
+
+def _fuzzy_search(method, query, body):
+    if method != "GET":
+        raise HttpError(405, "Method not allowed")
+    try:
+        threshold = float(query.get("threshold", [0.3])[0])
+        limit = int(query.get("limit", [20])[0])
+    except ValueError:
+        raise HttpError(400, "threshold must be a number and limit an integer")
+    return 200, db.fuzzy_search(query.get("q", [""])[0], threshold, max(1, min(limit, MAX_PAGE)))
+
+
+def _records(method, query, body):
+    if method != "GET":
+        raise HttpError(405, "Method not allowed")
+    arg = lambda name: query.get(name, [None])[0]
+    after, limit = _page_args(query)
+    try:
+        after = json.loads(after) if after else None
+        ints = {k: int(arg(k)) for k in ("min_age", "max_age", "min_enrolled") if arg(k) is not None}
+    except ValueError:
+        raise HttpError(400, "after must be a cursor from a previous page, min_age/max_age/min_enrolled integers")
+    res = db.query_records(types=arg("types").split(",") if arg("types") else None, q=arg("q"),
+                           email_domain=arg("email_domain"), instructor_id=arg("instructor_id"),
+                           order_by=arg("order_by") or "type", descending=arg("desc") in ("1", "true"),
+                           after=after, limit=limit, **ints)
+    return 200, {"items": res["records"], "next": res["next"]}
+
+
+def _changes(method, query, body):
+    if method != "GET":
+        raise HttpError(405, "Method not allowed")
+    try:
+        since = int(query.get("since", [0])[0])
+    except ValueError:
+        raise HttpError(400, "since must be an integer")
+    _, limit = _page_args(query)
+    try:
+        return 200, db.changes_since(since, limit)
+    except ValueError as e:
+        raise HttpError(410, str(e))
+
+
+ROUTES = (
+    _people_routes("students", db.create_student, db.get_student, db.list_students,
+                   db.update_student, db.delete_student)
+    + _people_routes("instructors", db.create_instructor, db.get_instructor, db.list_instructors,
+                     db.update_instructor, db.delete_instructor)
+    + [
+        (re.compile(r"^/courses$"), _courses),
+        (re.compile(r"^/courses/([^/]+)$"), _course),
+        (re.compile(r"^/courses/([^/]+)/students$"), _course_students),
+        (re.compile(r"^/courses/([^/]+)/instructor$"), _course_instructor),
+        (re.compile(r"^/enrollments$"), _enrollments),
+        (re.compile(r"^/search$"), _search),
+        (re.compile(r"^/search/fuzzy$"), _fuzzy_search),
+        (re.compile(r"^/records$"), _records),
+        (re.compile(r"^/changes$"), _changes),
+    ]
+)
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_version = "SchoolDB/1.0"
+    # Buffer headers and body into one write and disable Nagle, otherwise small
+    # keep-alive responses stall on delayed ACKs.
+    wbufsize = -1
+    disable_nagle_algorithm = True
+    pool: ConnectionPool  # set by make_server()
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def _dispatch(self, method: str):
+        url = urlsplit(self.path)
+        try:
+            body = self._read_body()
+            for pattern, handler in ROUTES:
+                m = pattern.match(url.path)
+                if m:
+                    with self.pool.connection():
+                        status, payload = handler(method, parse_qs(url.query), body, *map(unquote, m.groups()))
+                    break
+            else:
+                raise HttpError(404, "No such resource")
+        except HttpError as e:
+            status, payload = e.status, {"error": str(e)}
+        except sqlite3.IntegrityError as e:
+            status, payload = 409, {"error": str(e)}
+        except (ValueError, TypeError) as e:
+            status, payload = 400, {"error": str(e)}
+        except Exception as e:
+            # logged even without --verbose: the client only sees the message
+            BaseHTTPRequestHandler.log_message(self, "%s %s failed: %r", method, self.path, e)
+            traceback.print_exc()
+            busy = isinstance(e, sqlite3.OperationalError) and ("locked" in str(e) or "busy" in str(e))
+            status, payload = (503, {"error": f"Database busy, retry: {e}"}) if busy else \
+                (500, {"error": f"Internal error: {e}"})
+        self._send(status, payload, cacheable=(method == "GET" and status == 200))
+
+    def _read_body(self) -> dict:
+        length = int(self.headers.get("Content-Length") or 0)
+        if not length:
+            return {}
+        try:
+            body = json.loads(self.rfile.read(length))
+        except json.JSONDecodeError as e:
+            raise HttpError(400, f"Invalid JSON: {e}")
+        if not isinstance(body, dict):
+            raise HttpError(400, "Body must be a JSON object")
+        return body
+
+    def _send(self, status: int, payload, cacheable: bool):
+        data = b"" if payload is None else json.dumps(payload, separators=(",", ":")).encode()
+        headers = {"Content-Type": "application/json"}
+        if cacheable:
+            etag = '"' + hashlib.sha1(data).hexdigest() + '"'
+            headers["ETag"] = etag
+            headers["Cache-Control"] = "no-cache"
+            if etag in (self.headers.get("If-None-Match") or ""):
+                status, data = 304, b""
+        if len(data) >= GZIP_MIN_BYTES and "gzip" in (self.headers.get("Accept-Encoding") or ""):
+            data = gzip.compress(data, compresslevel=5)
+            headers["Content-Encoding"] = "gzip"
+            headers["Vary"] = "Accept-Encoding"
+        self.send_response(status)
+        for k, v in headers.items():
+            self.send_header(k, v)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        if data:
+            self.wfile.write(data)
+
+    def do_GET(self):
+        self._dispatch("GET")
+
+    def do_POST(self):
+        self._dispatch("POST")
+
+    def do_PUT(self):
+        self._dispatch("PUT")
+
+    def do_DELETE(self):
+        self._dispatch("DELETE")
+
+
+def make_server(db_path: str, host: str = "127.0.0.1", port: int = 8765, pool_size: int = 4,
+                verbose: bool = False) -> ThreadingHTTPServer:
+    """
+Build (but do not start) a server; port 0 picks a free port (see server.server_address).
+"""
+    conn = db.open_connection(db_path)
+    prev = db.bind_thread(conn)
+    try:
+        db.init_db()
+    finally:
+        db.bind_thread(prev)
+        conn.close()
+    pool = ConnectionPool(db_path, pool_size)
+    handler = type("BoundHandler", (Handler,), {"pool": pool})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    server.verbose = verbose
+    server.pool = pool
+    return server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve school.db as JSON over HTTP.")
+    parser.add_argument("--db", default="school.db")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--pool", type=int, default=4, help="number of SQLite connections")
+    parser.add_argument("-v", "--verbose", action="store_true", help="log every request")
+    parser.add_argument("--no-maintenance", action="store_true",
+                        help="do not run ANALYZE/vacuum/integrity checks while idle (see maintenance.py)")
+    args = parser.parse_args(argv)
+    server = make_server(args.db, args.host, args.port, args.pool, args.verbose)
+    maint = None if args.no_maintenance else maintenance.MaintenanceScheduler(args.db)
+    if maint:
+        maint.start()
+    print(f"Serving {args.db} on http://{server.server_address[0]}:{server.server_address[1]}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if maint:
+            maint.stop()
+        server.server_close()
+        server.pool.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+"""
+Sharded schools: one SQLite file per shard (a department or a term) instead of a
+single school.db.
+
+    shards = ShardedDB({"fall": "fall.db", "spring": "spring.db"})
+    shards.create_student("fall", "S1", "Ann Lee", 20, "ann@x.org")   # routed by shard key
+    shards.enroll_student("fall", "S1", "C1")
+    shards.list_courses(limit=50)       # every shard in parallel, merged by id
+    shards.search_all("lee")
+    shards.latency()                    # {"fall": {"calls", "p50_ms", "p95_ms", "max_ms"}, ...}
+    shards.close()
+
+Writes take a shard key first. By default the key is the shard name; pass
+route=callable to map other keys (e.g. department -> shard name). Each shard is a
+complete school.db, so a course, its instructor and its students live in the same
+shard, and a person registered in two shards is stored once in each.
+
+Every shard has its own small thread pool whose threads hold a connection bound
+with db.bind_thread(), so fan-out queries run on all shards at once and any db
+function can be run on one shard with run(). Rows returned by fan-out reads carry
+a "shard" field. Latency is the time each call spent on its shard.
+"""
+import heapq
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait
+from itertools import islice
+from operator import itemgetter
+from typing import Callable, Dict, List, Optional
+
+import db
+
+
+class _Shard:
+    def __init__(self, name: str, path: str, workers: int, samples: int):
+        self.name = name
+        self.path = path
+        self.times: deque = deque(maxlen=samples)
+        self._conns: List = []
+        self._lock = threading.Lock()
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f"shard-{name}",
+                                       initializer=self._init_worker)
+
+    def _init_worker(self):
+        conn = db.open_connection(self.path, check_same_thread=False)
+        db.bind_thread(conn)
+        with self._lock:
+            self._conns.append(conn)
+
+    def _timed(self, fn: Callable, args, kwargs):
+        start = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            self.times.append(time.perf_counter() - start)
+
+    def submit(self, fn: Callable, *args, **kwargs):
+        return self.pool.submit(self._timed, fn, args, kwargs)
+
+    def close(self):
+        self.pool.shutdown(wait=True)
+        with self._lock:
+            for conn in self._conns:
+                conn.close()
+            self._conns.clear()
+
+
+class ShardedDB:
+    def __init__(self, paths: Dict[str, str], route: Optional[Callable[[str], str]] = None,
+                 workers_per_shard: int = 2, latency_samples: int = 1000):
+        """
+:param paths: shard name -> database file; missing tables are created.
+:param route: maps a shard key to a shard name (default: the key is the name).
+:param workers_per_shard: threads (and connections) per shard.
+:param latency_samples: recent calls per shard kept for latency().
+"""
+        if not paths:
+            raise ValueError("At least one shard is required.")
+        self.route = route
+        self._shards = {name: _Shard(name, path, workers_per_shard, latency_samples)
+                        for name, path in paths.items()}
+        for f in [s.submit(db.init_db) for s in self._shards.values()]:
+            f.result()
+
+    @property
+    def names(self) -> List[str]:
+        return list(self._shards)
+
+    def shard_for(self, key: str) -> str:
+        name = self.route(key) if self.route else key
+        if name not in self._shards:
+            raise KeyError(f"No shard for key {key!r}.")
+        return name
+
+    def run(self, key: str, fn: Callable, *args, **kwargs):
+        """
+Run fn (any db function, or callable using db.connect()) on the shard for key.
+"""
+        return self._shards[self.shard_for(key)].submit(fn, *args, **kwargs).result()
+
+    def fan_out(self, fn: Callable, *args, **kwargs) -> Dict[str, object]:
+        """
+Run fn on every shard in parallel; returns {shard name: result}. If any shard
+fails, the failure of the first such shard (in shard order) is raised once all
+shards have finished, so no call is still running when the caller sees it.
+"""
+        futures = {name: s.submit(fn, *args, **kwargs) for name, s in self._shards.items()}
+        wait(futures.values())
+        return {name: f.result() for name, f in futures.items()}
+
+    def latency(self) -> Dict[str, Dict]:
+        out = {}
+        for name, s in self._shards.items():
+            times = sorted(s.times)
+            pick = lambda p: round(times[min(len(times) - 1, int(p * len(times)))] * 1000, 3) if times else None
+            out[name] = {"calls": len(times), "p50_ms": pick(0.50), "p95_ms": pick(0.95),
+                         "max_ms": round(times[-1] * 1000, 3) if times else None}
+        return out
+
+    def close(self):
+        for s in self._shards.values():
+            s.close()
+
+    def __enter__(self) -> "ShardedDB":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # Fan-out reads: each shard returns its sorted page, then the pages are merged.
+    def _merged(self, results: Dict[str, List[Dict]], key: str = "id", limit: Optional[int] = None,
+                reverse: bool = False) -> List[Dict]:
+        tagged = [[dict(row, shard=name) for row in rows] for name, rows in results.items()]
+        return list(islice(heapq.merge(*tagged, key=itemgetter(key), reverse=reverse), limit))
+
+    def list_students(self, after: Optional[str] = None, limit: Optional[int] = None) -> List[Dict]:
+        return self._merged(self.fan_out(db.list_students, after=after, limit=limit), limit=limit)
+
+    def list_instructors(self, after: Optional[str] = None, limit: Optional[int] = None) -> List[Dict]:
+        return self._merged(self.fan_out(db.list_instructors, after=after, limit=limit), limit=limit)
+
+    def list_courses(self, after: Optional[str] = None, limit: Optional[int] = None) -> List[Dict]:
+        return self._merged(self.fan_out(db.list_courses, after=after, limit=limit), limit=limit)
+
+    def list_enrolled(self, course_id: str, after: Optional[str] = None, limit: Optional[int] = None) -> List[Dict]:
+        return self._merged(self.fan_out(db.list_enrolled, course_id, after=after, limit=limit), limit=limit)
+
+    def search_all(self, q: str) -> Dict[str, List[Dict]]:
+        results = self.fan_out(db.search_all, q)
+        return {kind: self._merged({name: r[kind] for name, r in results.items()})
+                for kind in ("students", "instructors", "courses")}
+
+    def fuzzy_search(self, q: str, threshold: float = 0.3, limit: Optional[int] = 20) -> List[Dict]:
+        return self._merged(self.fan_out(db.fuzzy_search, q, threshold, limit), key="score",
+                            limit=limit, reverse=True)
+
+    # Routed writes
+    def create_student(self, key: str, sid: str, name: str, age: int, email: str):
+        return self.run(key, db.create_student, sid, name, age, email)
+
+    def create_instructor(self, key: str, iid: str, name: str, age: int, email: str):
+        return self.run(key, db.create_instructor, iid, name, age, email)
+
+    def create_course(self, key: str, cid: str, name: str, instructor_id: Optional[str] = None,
+                      capacity: Optional[int] = None, term: Optional[str] = None):
+        return self.run(key, db.create_course, cid, name, instructor_id, capacity, term)
+
+    def enroll_student(self, key: str, student_id: str, course_id: str, section_id: Optional[str] = None) -> str:
+        return self.run(key, db.enroll_student, student_id, course_id, section_id)
+
+    def drop_student(self, key: str, student_id: str, course_id: str):
+        return self.run(key, db.drop_student, student_id, course_id)
@@ -0,0 +1,154 @@
+"""
+Single-writer group-commit queue.
+
+Instead of every client committing its own INSERT and fighting over the SQLite write
+lock, writes are queued and one writer thread applies them in groups, committing each
+group once:
+
+    wq = WriteQueue("school.db")
+    fut = wq.enroll_student("S1", "C1")
+    fut.result()          # raises if that write failed
+    wq.close()
+
+A group closes when it reaches batch_size or when max_delay seconds have passed since
+its first write. Each write runs inside its own SAVEPOINT, so one failing write is
+rolled back and reported on its future without affecting the rest of its group.
+"""
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, List, Optional, Tuple
+
+import db
+
+_STOP = object()
+
+
+class WriteQueue:
+    def __init__(self, db_path: Optional[str] = None, batch_size: int = 256, max_delay: float = 0.005):
+        self.db_path = db_path or db.default().path
+        self.batch_size = batch_size
+        self.max_delay = max_delay
+        self.groups = 0
+        self.writes = 0
+        self._queue: "queue.Queue" = queue.Queue()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="db-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, fn: Callable, *args, **kwargs) -> Future:
+        """
+Queue fn(*args, **kwargs), a db write function (or anything using db.connect()).
+"""
+        if self._closed:
+            raise RuntimeError("WriteQueue is closed.")
+        fut: Future = Future()
+        self._queue.put((fut, fn, args, kwargs))
+        return fut
+
+    def close(self):
+        """
+Apply everything already queued, then stop the writer thread.
+"""
+        if not self._closed:
+            self._closed = True
+            self._queue.put(_STOP)
+            self._thread.join()
+
+    def __enter__(self) -> "WriteQueue":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def create_student(self, sid: str, name: str, age: int, email: str) -> Future:
+        return self.submit(db.create_student, sid, name, age, email)
+
+    def update_student(self, sid: str, name: str, age: int, email: str) -> Future:
+        return self.submit(db.update_student, sid, name, age, email)
+
+    def delete_student(self, sid: str) -> Future:
+        return self.submit(db.delete_student, sid)
+
+    def create_instructor(self, iid: str, name: str, age: int, email: str) -> Future:
+        return self.submit(db.create_instructor, iid, name, age, email)
+
+    def update_instructor(self, iid: str, name: str, age: int, email: str) -> Future:
+        return self.submit(db.update_instructor, iid, name, age, email)
+
+    def delete_instructor(self, iid: str) -> Future:
+        return self.submit(db.delete_instructor, iid)
+
+    def create_course(self, cid: str, name: str, instructor_id: Optional[str] = None, capacity: Optional[int] = None,
+                      term: Optional[str] = None) -> Future:
+        return self.submit(db.create_course, cid, name, instructor_id, capacity, term)
+
+    def update_course(self, cid: str, name: str, instructor_id: Optional[str]) -> Future:
+        return self.submit(db.update_course, cid, name, instructor_id)
+
+    def delete_course(self, cid: str) -> Future:
+        return self.submit(db.delete_course, cid)
+
+    def assign_instructor(self, course_id: str, instructor_id: Optional[str]) -> Future:
+        return self.submit(db.assign_instructor, course_id, instructor_id)
+
+    def enroll_student(self, student_id: str, course_id: str, section_id: Optional[str] = None) -> Future:
+        return self.submit(db.enroll_student, student_id, course_id, section_id)
+
+    def _run(self):
+        conn = db.open_connection(self.db_path)
+        db.bind_thread(conn)
+        stopping = False
+        try:
+            while not stopping:
+                first = self._queue.get()
+                if first is _STOP:
+                    break
+                group = [first]
+                deadline = time.monotonic() + self.max_delay
+                while len(group) < self.batch_size:
+                    try:
+                        item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                    except queue.Empty:
+                        break
+                    if item is _STOP:
+                        stopping = True
+                        break
+                    group.append(item)
+                self._apply(conn, group)
+        finally:
+            db.bind_thread(None)
+            conn.close()
+
+    def _apply(self, conn, group: List[Tuple]):
+        outcomes = []
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            with db.deferred_commits():
+                for fut, fn, args, kwargs in group:
+                    if not fut.set_running_or_notify_cancel():
+                        continue
+                    conn.execute("SAVEPOINT queued_write")
+                    try:
+                        outcomes.append((fut, fn(*args, **kwargs), None))
+                    except Exception as e:
+                        conn.execute("ROLLBACK TO queued_write")
+                        outcomes.append((fut, None, e))
+                    conn.execute("RELEASE queued_write")
+            conn.commit()
+        except Exception as e:
+            if conn.in_transaction:
+                conn.rollback()
+            for fut, _, _, _ in group:
+                if not fut.done():
+                    fut.set_exception(e)
+            return
+        self.groups += 1
+        self.writes += len(outcomes)
+        # Futures resolve only after the commit, so a result means the write is durable.
+        for fut, value, error in outcomes:
+            if error is None:
+                fut.set_result(value)
+            else:
+                fut.set_exception(error)
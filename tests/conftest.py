@@ -0,0 +1,21 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir, "src"))
+
+import db  # noqa: E402
+
+
+@pytest.fixture
+def school(tmp_path):
+    """
+A fresh school.db in tmp_path as the default database.
+"""
+    database = db.Database(str(tmp_path / "school.db"))
+    prev = db.set_default(database)
+    db.init_db()
+    yield database
+    db.set_default(prev)
+    database.close()
@@ -0,0 +1,52 @@
+import asyncio
+
+import db
+from adb import AsyncDB
+
+
+def _run(coro):
+    return asyncio.run(coro)
+
+
+def test_iterators_walk_every_keyset_page(school):
+    async def main():
+        async with AsyncDB(school.path, workers=2) as adb:
+            for n in range(23):
+                await adb.create_student(f"S{n:02d}", f"n{n}", 20, "a@x.io")
+            await adb.create_course("C1", "Algebra")
+            for n in range(0, 23, 2):
+                await adb.enroll_student(f"S{n:02d}", "C1")
+            students = [s["id"] async for s in adb.iter_students(page_size=5)]
+            enrolled = [s["id"] async for s in adb.iter_enrolled("C1", page_size=4)]
+            page = await adb.list_students(after="S04", limit=3)
+            return students, enrolled, page
+    students, enrolled, page = _run(main())
+    assert students == [f"S{n:02d}" for n in range(23)]
+    assert enrolled == [f"S{n:02d}" for n in range(0, 23, 2)]
+    assert [s["id"] for s in page] == ["S05", "S06", "S07"]
+
+
+def test_wrappers_pass_capacity_term_and_section(school):
+    async def main():
+        async with AsyncDB(school.path) as adb:
+            await adb.create_student("S1", "Ann", 20, "a@x.io")
+            await adb.create_student("S2", "Bob", 20, "b@x.io")
+            await adb.create_course("C1", "Algebra", None, 1, "2026F")
+            await adb.run(db.create_section, "L1", "C1")
+            first = await adb.enroll_student("S1", "C1", "L1")
+            second = await adb.enroll_student("S2", "C1")
+            return first, second, await adb.run(db.get_course, "C1")
+    first, second, course = _run(main())
+    assert (first, second) == (db.ENROLLED, db.WAITLISTED)
+    assert (course["capacity"], course["term"]) == (1, "2026F")
+    assert db.connect().execute("SELECT section_id FROM registrations").fetchall() == [("L1",)]
+
+
+def test_queries_run_off_the_event_loop_thread(school):
+    import threading
+
+    async def main():
+        async with AsyncDB(school.path, workers=1) as adb:
+            return await adb.run(threading.current_thread)
+    worker = _run(main())
+    assert worker is not threading.main_thread() and worker.name.startswith("adb")
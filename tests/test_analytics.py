@@ -0,0 +1,72 @@
+import random
+from itertools import combinations
+
+import pytest
+
+import analytics
+import db
+
+
+@pytest.fixture(params=["numpy", "python"])
+def backend(request, monkeypatch):
+    """
+Run each test once on the NumPy path and once on the pure-Python fallback.
+"""
+    if request.param == "numpy":
+        pytest.importorskip("numpy")
+    else:
+        monkeypatch.setattr(analytics, "np", None)
+    return request.param
+
+
+def _school(seed=7, students=40, courses=8):
+    rnd = random.Random(seed)
+    for n in range(courses):
+        db.create_course(f"C{n}", f"course {n}")
+    members = {f"C{n}": set() for n in range(courses)}
+    for n in range(students):
+        sid = f"S{n:02d}"
+        db.create_student(sid, f"n{n}", 20, f"{sid}@x.io")
+        for cid in rnd.sample(sorted(members), rnd.randrange(0, 4)):
+            db.enroll_student(sid, cid)
+            members[cid].add(sid)
+    return members
+
+
+def test_pairs_match_brute_force(school, backend):
+    members = _school()
+    e = analytics.Enrollments.load()
+    assert len(e) == sum(map(len, members.values()))
+    shared = {(a, b): len(members[a] & members[b]) for a, b in combinations(sorted(members), 2)}
+    expected = sorted(((a, b, n) for (a, b), n in shared.items() if n), key=lambda t: (-t[2], t[0], t[1]))
+    assert e.top_overlaps(5) == expected[:5]
+    assert e.top_overlaps(1000) == expected
+    m = e.co_enrollment_matrix()
+    for i, a in enumerate(e.course_ids):
+        assert m[i][i] == e.course_size(a) == len(members[a])
+        for j, b in enumerate(e.course_ids):
+            if i != j:
+                assert m[i][j] == len(members[a] & members[b]) == e.shared(a, b)
+
+
+def test_students_in(school, backend):
+    members = _school()
+    everyone = set().union(*members.values())
+    e = analytics.Enrollments.load()
+    assert e.students_in(all_of=["C0", "C1"]) == sorted(members["C0"] & members["C1"])
+    assert e.students_in(any_of=["C2", "C3"], none_of=["C0"]) == sorted((members["C2"] | members["C3"]) - members["C0"])
+    assert e.students_in(all_of=["C4"], any_of=["C5", "C6"]) == sorted(members["C4"] & (members["C5"] | members["C6"]))
+    assert e.students_in(none_of=["C7"]) == sorted(everyone - members["C7"])
+    assert analytics.students_in(all_of=["C1"]) == sorted(members["C1"])
+
+
+def test_empty_and_single_course_students(school, backend):
+    db.create_course("C1", "Algebra")
+    db.create_course("C2", "Biology")
+    e = analytics.Enrollments.load()
+    assert len(e) == 0 and e.top_overlaps() == [] and e.students_in() == []
+    db.create_student("S1", "Ann", 20, "a@x.io")
+    db.enroll_student("S1", "C1")
+    e = analytics.Enrollments.load()
+    assert e.top_overlaps() == [] and e.course_size("C1") == 1 and e.course_size("C2") == 0
+    assert [list(r) for r in e.co_enrollment_matrix()] == [[1, 0], [0, 0]]
@@ -0,0 +1,71 @@
+import os
+
+import pytest
+
+import classes
+
+
+def _school():
+    course = classes.Course("C1", "Algebra")
+    student = classes.Student("Ann", 20, "ann@x.io", "S1")
+    student.register_course(course)
+    return [student], [], [course]
+
+
+def test_failed_save_leaves_the_previous_archive(tmp_path, monkeypatch):
+    path = str(tmp_path / "school.arc")
+    classes.save_archive(path, *_school())
+    before = {p: open(p, "rb").read() for p in (path, path + ".idx")}
+    monkeypatch.setattr(classes.Course, "to_dict", lambda self: 1 / 0)
+    with pytest.raises(ZeroDivisionError):
+        classes.save_archive(path, *_school())
+    assert {p: open(p, "rb").read() for p in before} == before
+    assert sorted(os.listdir(tmp_path)) == ["school.arc", "school.arc.idx"]
+    students, _, courses = classes.load_from_archive(path, ["C1"])
+    assert list(students) == ["S1"] and list(courses) == ["C1"]
+
+
+def _two_students():
+    students, _, courses = _school()
+    bob = classes.Student("Bob", 21, "bob@x.io", "S2")
+    bob.register_course(courses[0])
+    return students + [bob], [], courses
+
+
+def test_crash_between_data_and_index_is_detected(tmp_path, monkeypatch):
+    path = str(tmp_path / "school.arc")
+    classes.save_archive(path, *_school())
+    real_replace = os.replace
+
+    def crash_on_index(src, dst):
+        if dst.endswith(".idx"):
+            raise OSError("power cut")
+        real_replace(src, dst)
+
+    monkeypatch.setattr(os, "replace", crash_on_index)
+    with pytest.raises(OSError):
+        classes.save_archive(path, *_two_students())
+    monkeypatch.undo()
+    assert sorted(os.listdir(tmp_path)) == ["school.arc", "school.arc.idx"]   # no temp file left behind
+    with pytest.raises(ValueError, match="does not belong"):
+        classes.load_from_archive(path, ["C1"])
+    assert len(classes.load_from_json(path)[0]) == 2   # the data file itself is complete
+    classes.save_archive(path, *_two_students())
+    assert sorted(classes.load_from_archive(path, ["C1"])[0]) == ["S1", "S2"]
+
+
+def test_index_pointing_at_another_record_is_rejected(tmp_path):
+    path = str(tmp_path / "school.arc")
+    classes.save_archive(path, *_two_students())
+    with open(path + ".idx", "rb") as f:
+        lines = f.read().splitlines(keepends=True)
+    s1, s2 = (n for n, line in enumerate(lines) if line.startswith(b"students\t"))
+    # S1 and S2 records have the same length: swap their offsets
+    k1, o1, l1 = lines[s1].rsplit(b"\t", 2)
+    k2, o2, l2 = lines[s2].rsplit(b"\t", 2)
+    assert l1 == l2
+    lines[s1], lines[s2] = b"\t".join((k1, o2, l2)), b"\t".join((k2, o1, l1))
+    with open(path + ".idx", "wb") as f:
+        f.write(b"".join(lines))
+    with pytest.raises(ValueError, match="another record"):
+        classes.load_from_archive(path, ["C1"])
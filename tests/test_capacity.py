@@ -0,0 +1,61 @@
+import threading
+
+import db
+
+
+def _roster(cid="C1"):
+    return [s["id"] for s in db.list_enrolled(cid)]
+
+
+def _waitlist(cid="C1"):
+    return [s["id"] for s in db.list_waitlist(cid)]
+
+
+def test_concurrent_enrollment_never_oversubscribes_and_promotes_in_order(school):
+    db.create_course("C1", "Algebra", None, 3)
+    ids = [f"S{n:02d}" for n in range(20)]
+    for sid in ids:
+        db.create_student(sid, sid, 20, f"{sid}@x.io")
+    results = {}
+    start = threading.Barrier(len(ids))
+
+    def enroll(sid):
+        conn = db.open_connection(school.path, timeout=30)
+        db.bind_thread(conn)
+        try:
+            start.wait()
+            results[sid] = db.enroll_student(sid, "C1")
+        finally:
+            db.bind_thread(None)
+            conn.close()
+
+    threads = [threading.Thread(target=enroll, args=(sid,)) for sid in ids]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    enrolled = sorted(sid for sid, status in results.items() if status == db.ENROLLED)
+    waiting = _waitlist()
+    assert _roster() == enrolled and len(enrolled) == 3
+    assert sorted(waiting) == sorted(set(ids) - set(enrolled))
+    # each freed seat goes to the head of the waitlist, in the order they queued
+    for n, sid in enumerate(enrolled):
+        db.drop_student(sid, "C1")
+        assert waiting[n] in _roster()
+        assert _waitlist() == waiting[n + 1:]
+    db.set_course_capacity("C1", 6)
+    assert sorted(_roster()) == sorted(waiting[:6]) and _waitlist() == waiting[6:]
+
+
+def test_enrolling_twice_and_leaving_the_waitlist(school):
+    db.create_course("C1", "Algebra", None, 1)
+    for sid in ("S1", "S2", "S3"):
+        db.create_student(sid, sid, 20, f"{sid}@x.io")
+    assert db.enroll_student("S1", "C1") == db.ENROLLED
+    assert db.enroll_student("S1", "C1") == db.ALREADY_ENROLLED
+    assert db.enroll_student("S2", "C1") == db.WAITLISTED
+    assert db.enroll_student("S3", "C1") == db.WAITLISTED
+    db.drop_student("S2", "C1")   # leaves the waitlist, promotes no one
+    assert _roster() == ["S1"] and _waitlist() == ["S3"]
+    db.set_course_capacity("C1", None)
+    assert _roster() == ["S1", "S3"] and _waitlist() == []
@@ -0,0 +1,44 @@
+import pytest
+
+import db
+
+
+def test_prune_without_consumers_keeps_the_newest_versions(school):
+    for i in range(5):
+        db.create_student(f"S{i}", f"n{i}", 20, "a@x.io")
+    assert db.prune_changes() == 0
+    assert len(db.changes_since(0)["changes"]) == 5
+    assert db.prune_changes(keep=2) == 3
+    assert [c["key"]["id"] for c in db.changes_since(3)["changes"]] == ["S3", "S4"]
+    with pytest.raises(ValueError):
+        db.changes_since(0)
+
+
+def test_prune_stops_at_the_slowest_consumer(school):
+    db.create_student("S1", "n", 20, "a@x.io")
+    db.register_consumer("gui")
+    db.create_student("S2", "n", 20, "a@x.io")
+    assert db.ack_changes("gui", db.current_version()) == 2
+    db.register_consumer("slow", db.current_version())
+    db.create_student("S3", "n", 20, "a@x.io")
+    db.ack_changes("gui", db.current_version())
+    assert [c["key"]["id"] for c in db.changes_since(2)["changes"]] == ["S3"]
+
+
+def test_silent_consumers_expire(school):
+    db.create_student("S1", "n", 20, "a@x.io")
+    a, b = db.consumer_name("gui"), db.consumer_name("gui")
+    assert a != b and a.startswith("gui-")
+    db.register_consumer(a, 0)
+    db.register_consumer(b, 0)
+    db.ack_changes(a, db.current_version())
+    assert db.prune_changes() == 0          # b still holds the log back
+    db.connect().execute("UPDATE change_consumers SET acked_at = acked_at - ? WHERE name = ?",
+                         (db.CHANGE_CONSUMER_TTL + 1, b))
+    assert db.prune_changes() == 1          # b expired, only a counts
+    with pytest.raises(ValueError):
+        db.ack_changes(b, db.current_version())
+    assert db.register_consumer(b, 0) == 0
+    db.drop_consumer(a)
+    db.drop_consumer(b)
+    assert db.connect().execute("SELECT COUNT(*) FROM change_consumers").fetchone()[0] == 0
@@ -0,0 +1,84 @@
+import json
+
+import pytest
+
+import classes
+import convert
+import db
+
+
+def _graph():
+    ivy = classes.Instructor("Ivy Chen", 40, "ivy@x.io", "I1")
+    ann = classes.Student("Ann Lee", 20, "ann@x.io", "S1")
+    bob = classes.Student("Bob Stone", 21, "bob@x.io", "S2")
+    algebra = classes.Course("C1", "Algebra")
+    drama = classes.Course("C2", "Drama")
+    algebra.set_instructor(ivy)
+    for course, student in ((algebra, ann), (algebra, bob), (drama, bob)):
+        course.add_student(student)
+    lecture = algebra.add_section("L1")
+    lecture.add_time_slot(0, 9 * 60, 10 * 60 + 30)
+    lecture.add_time_slot(3, 14 * 60, 15 * 60)
+    drama.add_section("S1")   # no meetings yet
+    return [ann, bob], [ivy], [algebra, drama]
+
+
+def _normalized(path):
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    for records in data.values():
+        for r in records:
+            for key in ("registered_courses", "assigned_courses", "enrolled_students"):
+                if key in r:
+                    r[key] = sorted(r[key])
+    return data
+
+
+def test_json_db_json_round_trip(tmp_path):
+    src, path, out = str(tmp_path / "in.json"), str(tmp_path / "school.db"), str(tmp_path / "out.json")
+    classes.save_to_json(src, *_graph())
+    assert convert.json_to_db(src, path) == {"students": 2, "instructors": 1, "courses": 2, "registrations": 3,
+                                              "sections": 2, "section_slots": 2}
+    assert convert.db_to_json(path, out) == {"students": 2, "instructors": 1, "courses": 2}
+    assert _normalized(out) == _normalized(src)
+    courses = classes.load_from_json(out)[2]
+    assert courses["C1"].sections[0].time_slots == [(0, 540, 630), (3, 840, 900)]
+    with pytest.raises(FileExistsError):
+        convert.json_to_db(src, path)
+
+
+def test_loaded_database_is_fully_maintained(tmp_path):
+    src, path = str(tmp_path / "in.json"), str(tmp_path / "school.db")
+    classes.save_archive(src, *_graph())   # archives hold the same JSON
+    convert.json_to_db(src, path)
+    database = db.Database(path)
+    prev = db.set_default(database)
+    try:
+        assert db.stats_rebuild() == {"courses": [], "instructors": []}
+        assert [c["enrolled_count"] for c in db.list_courses()] == [2, 1]
+        assert db.fuzzy_search("stone")[0]["id"] == "S2"
+        assert db.prefix_search("students", "an") == [{"id": "S1", "name": "Ann Lee"}]
+        assert len(db.changes_since(0)["changes"]) == 2 + 1 + 2 + 3
+        db.enroll_student("S1", "C2")   # triggers are back
+        assert [c["enrolled_count"] for c in db.list_courses()] == [2, 2]
+        assert db.connect().execute("SELECT id FROM sections ORDER BY 1").fetchall() == [("C1:L1",), ("C2:S1",)]
+        assert db.connect().execute("PRAGMA foreign_keys").fetchone()[0] == 1
+    finally:
+        db.set_default(prev)
+        database.close()
+
+
+def test_dangling_references_are_skipped_and_failures_leave_no_file(tmp_path):
+    src, path = tmp_path / "in.json", tmp_path / "school.db"
+    src.write_text(json.dumps({
+        "students": [{"student_id": "S1", "name": "Ann", "age": 20, "_email": "a@x.io", "registered_courses": ["C1"]}],
+        "instructors": [],
+        "courses": [{"course_id": "C1", "course_name": "Algebra", "instructor_id": "I9",
+                     "enrolled_students": ["S1", "S9"], "sections": []}],
+    }))
+    counts = convert.json_to_db(str(src), str(path))
+    assert counts["registrations"] == 1 and counts["courses"] == 1
+    src.write_text('{"students": [{"student_id": "S1"')
+    with pytest.raises(ValueError):
+        convert.json_to_db(str(src), str(path), replace=True)
+    assert not path.exists()
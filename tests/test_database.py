@@ -0,0 +1,64 @@
+import threading
+
+import pytest
+
+import db
+
+
+@pytest.fixture
+def pair(tmp_path):
+    fall = db.Database(str(tmp_path / "fall.db"), pragmas={"journal_mode": "wal"}, timeout=3)
+    spring = db.Database(str(tmp_path / "spring.db"))
+    fall.init_db()
+    spring.init_db()
+    yield fall, spring
+    fall.close()
+    spring.close()
+
+
+def _ids(database):
+    return [s["id"] for s in database.list_students()]
+
+
+def test_two_databases_stay_isolated(school, pair):
+    fall, spring = pair
+    fall.create_student("S1", "Ann", 20, "ann@x.io")
+    spring.create_student("S2", "Bob", 21, "bob@x.io")
+    db.create_student("S0", "Cy", 22, "cy@x.io")   # the default database
+    assert (_ids(fall), _ids(spring), _ids(db)) == (["S1"], ["S2"], ["S0"])
+    assert fall.connection().execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    assert spring.connection().execute("PRAGMA journal_mode").fetchone()[0] != "wal"
+    with fall.use():
+        db.create_course("C1", "Algebra")
+        with spring.use():
+            assert db.list_courses() == []
+        db.enroll_student("S1", "C1")
+    assert fall.get_course("C1")["enrolled_count"] == 1 and spring.get_course("C1") is None
+    assert db.connect() is school.connection()   # nothing left bound
+
+
+def test_each_thread_gets_its_own_connection(pair):
+    fall, _ = pair
+    seen = []
+
+    def work(n):
+        fall.create_student(f"T{n}", "t", 20, "t@x.io")
+        seen.append(fall.connection())
+
+    threads = [threading.Thread(target=work, args=(n,)) for n in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len({id(c) for c in seen}) == 4 and fall.connection() not in seen
+    assert _ids(fall) == ["T0", "T1", "T2", "T3"]
+    fall.close()
+    assert _ids(fall) == ["T0", "T1", "T2", "T3"]   # reopens after close()
+
+
+def test_only_public_db_functions_are_methods(pair):
+    fall, _ = pair
+    assert fall.list_students.__name__ == "list_students"
+    for name in ("connect", "set_default", "_select", "no_such_function"):
+        with pytest.raises(AttributeError):
+            getattr(fall, name)
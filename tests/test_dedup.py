@@ -0,0 +1,43 @@
+import db
+import dedup
+
+
+def test_soundex_and_email_normalization():
+    assert [dedup.soundex(w) for w in ("Robert", "Rupert", "Ashcraft", "Tymczak", "Pfister", "Lee", "")] == \
+        ["r163", "r163", "a261", "t522", "p236", "l000", ""]
+    assert dedup.normalize_email(" J.Smith+news@X.io ") == "j.smith@x.io"
+    assert dedup.score({"name": "Lee, Ann", "email": "ann@x.io"}, {"name": "Ann Lee", "email": "ANN+a@x.io"}) == 1.0
+    assert dedup.score({"name": "Jo Smith", "email": "jsmith2@x.io"}, {"name": "Jo Smith", "email": "jsmith7@x.io"}) == 0.5
+
+
+def test_find_duplicates_keeps_the_busier_record(school):
+    db.create_student("S1", "Ann Leigh", 20, "ann.leigh@x.io")
+    db.create_student("S2", "Leigh, Ann", 20, "Ann.Leigh+school@x.io")
+    db.create_student("S3", "Bob Stone", 20, "bob@x.io")
+    db.create_instructor("I1", "Ann Leigh", 40, "ann.leigh@x.io")   # another kind: never paired with S1
+    db.create_course("C1", "Algebra")
+    db.enroll_student("S2", "C1")
+    assert dedup.find_duplicates() == [
+        {"kind": "student", "keep": "S2", "duplicate": "S1", "score": 1.0, "keys": ["email", "name"]}]
+    assert dedup.find_duplicates(max_block=1) == []
+
+
+def test_apply_merges_collapses_chains(school):
+    for n in range(4):
+        db.create_student(f"S{n}", "Ann Leigh", 20, f"ann{n}@x.io")
+    db.create_course("C1", "Algebra", capacity=1)
+    db.create_course("C2", "Biology")
+    db.enroll_student("S0", "C1")
+    db.enroll_student("S3", "C1")   # waitlisted
+    db.enroll_student("S2", "C2")
+    # S1~S2 is merged first, so S2~S3 must merge S3 into S1, not into the deleted S2.
+    proposals = [{"kind": "student", "keep": "S1", "duplicate": "S2"},
+                 {"kind": "student", "keep": "S2", "duplicate": "S3"},
+                 {"kind": "student", "keep": "S3", "duplicate": "S1"},   # already one record
+                 {"kind": "student", "keep": "S0", "duplicate": "S1"}]
+    done = dedup.apply_merges(proposals)
+    assert [(d["keep"], d["duplicate"]) for d in done] == [("S1", "S2"), ("S1", "S3"), ("S0", "S1")]
+    assert [s["id"] for s in db.list_students()] == ["S0"]
+    assert db.connect().execute("SELECT student_id, course_id FROM registrations ORDER BY course_id").fetchall() == \
+        [("S0", "C1"), ("S0", "C2")]
+    assert db.list_waitlist("C1") == []
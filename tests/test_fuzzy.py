@@ -0,0 +1,69 @@
+import random
+
+import pytest
+
+import db
+
+
+def _sim(a, b):
+    ga, gb = db._trigrams(a), db._trigrams(b)
+    return len(ga & gb) / len(ga | gb)
+
+
+def _brute_force(q, threshold):
+    # The documented scoring, checked against every person.
+    words = db._fuzzy_words(q)
+    out = []
+    for kind, rows in (("student", db.list_students()), ("instructor", db.list_instructors())):
+        for r in rows:
+            own = db._fuzzy_words(r["name"] + " " + r["email"].split("@")[0])
+            best = [max((s for s in (_sim(w, o) for o in own) if s >= threshold), default=0.0) for w in words]
+            score = sum(best) / len(words)
+            if score >= threshold:
+                out.append((round(score, 4), kind, r["id"]))
+    return sorted(out, key=lambda t: (-t[0], t[1], t[2]))
+
+
+def _found(q, threshold=0.3, limit=None):
+    return [(r["score"], r["kind"], r["id"]) for r in db.fuzzy_search(q, threshold, limit)]
+
+
+def test_typos_find_the_person(school):
+    db.create_student("S1", "Katherine Johnson", 20, "kjohnson@x.io")
+    db.create_student("S2", "Catherine Jonson", 21, "cat@x.io")
+    db.create_instructor("I1", "Grace Hopper", 50, "grace.hopper@x.io")
+    assert db.fuzzy_search("Kathrine Jonhson")[0]["id"] == "S1"
+    top = db.fuzzy_search("hoper")[0]
+    assert {k: top[k] for k in ("kind", "id", "name", "age", "email")} == {
+        "kind": "instructor", "id": "I1", "name": "Grace Hopper", "age": 50, "email": "grace.hopper@x.io"}
+    assert 0.3 <= top["score"] < 1
+    assert db.fuzzy_search("  ,. ") == []
+    with pytest.raises(ValueError):
+        db.fuzzy_search("x", threshold=0)
+
+
+def test_matches_brute_force(school):
+    rnd = random.Random(3)
+    first = ["Ann", "Anna", "Hannah", "Bob", "Robert", "Roberta", "Li", "Lee", "Leigh", "Mia", "Maya"]
+    last = ["Smith", "Smyth", "Schmidt", "Ng", "Nguyen", "O'Brien", "Obrien", "Van der Berg", "Berg"]
+    for n in range(60):
+        name = f"{rnd.choice(first)} {rnd.choice(last)}"
+        email = f"{name.split()[0].lower()}.{n}@x.io"
+        (db.create_student if n % 3 else db.create_instructor)(f"P{n:02d}", name, 30, email)
+    for q in ["smith", "ann smyth", "roberto nguyen", "berg", "leigh", "o brien", "maya schmit"]:
+        for threshold in (0.3, 0.5):
+            expected = _brute_force(q, threshold)
+            assert _found(q, threshold) == expected
+            top = _found(q, threshold, limit=5)
+            # Ties at the cut-off may pick any of the tied people.
+            assert [s for s, _, _ in top] == [s for s, _, _ in expected[:5]]
+            assert set(top) <= set(expected)
+
+
+def test_index_follows_updates_and_deletes(school):
+    db.create_student("S1", "Ada Lovelace", 20, "ada@x.io")
+    assert _found("lovelace")
+    db.update_student("S1", "Ada Byron", 20, "ada@x.io")
+    assert not _found("lovelace", 0.6) and _found("byron")[0][2] == "S1"
+    db.delete_student("S1")
+    assert _found("byron") == [] and _found("ada") == []
@@ -0,0 +1,88 @@
+import os
+
+import pytest
+
+import classes
+
+
+def _ids(objs):
+    return sorted(getattr(o, "student_id", None) or o.course_id for o in objs)
+
+
+def _build(journal):
+    journal.load()
+    ann = classes.Student("Ann", 20, "ann@x.io", "S1")
+    bob = classes.Student("Bob", 21, "bob@x.io", "S2")
+    algebra = classes.Course("C1", "Algebra")
+    for obj in (ann, bob, algebra, classes.Instructor("Ivy", 40, "ivy@x.io", "I1")):
+        journal.create(obj)
+    journal.link(algebra, ann)
+    journal.link(algebra, bob)
+    journal.link(algebra, journal.instructors["I1"])
+    ann.name = "Ann Lee"
+    journal.update(ann)
+    journal.unlink(algebra, bob)
+
+
+def test_reopen_replays_the_journal(tmp_path):
+    path = str(tmp_path / "school.json")
+    with classes.Journal(path) as journal:
+        _build(journal)
+    assert not os.path.exists(path)   # nothing compacted yet
+    journal = classes.Journal(path)
+    students, instructors, courses = journal.load()
+    assert students["S1"].name == "Ann Lee"
+    assert _ids(courses["C1"].enrolled_students) == ["S1"]
+    assert courses["C1"].instructor is instructors["I1"]
+    assert journal.seq == journal.records == 9
+    journal.delete(courses["C1"])
+    journal.close()
+    students, _, courses = classes.Journal(path).load()
+    assert courses == {} and students["S1"].registered_courses == []
+
+
+def test_torn_tail_is_dropped(tmp_path):
+    path = str(tmp_path / "school.json")
+    with classes.Journal(path) as journal:
+        _build(journal)
+    with open(path + ".journal", "ab") as f:
+        f.write(b'{"op":"create","kind":"stu')   # crash mid-append
+    with classes.Journal(path) as journal:
+        journal.load()
+        journal.create(classes.Student("Cy", 22, "cy@x.io", "S3"))
+    students, _, _ = classes.Journal(path).load()
+    assert sorted(students) == ["S1", "S2", "S3"]
+
+
+def test_records_already_in_the_snapshot_are_not_replayed(tmp_path):
+    path = str(tmp_path / "school.json")
+    journal = classes.Journal(path)
+    _build(journal)
+    with open(path + ".journal", "rb") as f:
+        before = f.read()
+    journal.compact()
+    journal.close()
+    with open(path + ".journal", "wb") as f:   # crash before the journal was emptied
+        f.write(before)
+    journal = classes.Journal(path)
+    students, _, courses = journal.load()
+    assert journal.seq == 9
+    assert _ids(courses["C1"].enrolled_students) == ["S1"]
+    assert _ids(students["S1"].registered_courses) == ["C1"]
+
+
+def test_compacts_automatically_and_guards_misuse(tmp_path):
+    path = str(tmp_path / "school.json")
+    journal = classes.Journal(path, compact_after=4)
+    with pytest.raises(RuntimeError):
+        journal.create(classes.Course("C1", "Algebra"))
+    _build(journal)
+    assert os.path.exists(path) and journal.records == 1   # compacted after the 8th record
+    with pytest.raises(ValueError):
+        journal.create(classes.Course("C1", "Algebra"))
+    with pytest.raises(TypeError):
+        journal.delete("C1")
+    journal.close()
+    students, _, courses = classes.load_from_json(path)
+    assert _ids(courses["C1"].enrolled_students) == ["S1", "S2"]   # the unlink is still only in the journal
+    assert _ids(classes.Journal(path).load()[2]["C1"].enrolled_students) == ["S1"]
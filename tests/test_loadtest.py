@@ -0,0 +1,60 @@
+import json
+import sqlite3
+
+import pytest
+
+import loadtest
+
+
+def _scenario(tmp_path, **extra):
+    scenario = {
+        "db": str(tmp_path / "load.db"),
+        "populate": {"students": 200, "instructors": 5, "courses": 20, "regs": 2},
+        "seconds": 1,
+        "seed": 3,
+        "sessions": [
+            {"name": "registrar", "processes": 2, "think_ms": 0,
+             "mix": {"refresh": 1, "search": 1, "lookup": 1, "enroll": 1, "drop": 1, "edit": 1}},
+            {"name": "admin", "processes": 1, "think_ms": 50, "mix": {"backup": 1}},
+        ],
+    }
+    scenario.update(extra)
+    return scenario
+
+
+def test_run_reports_every_operation(tmp_path):
+    summary = loadtest.run(_scenario(tmp_path, journal_mode="wal"))
+    assert summary["processes"] == 3 and summary["seconds"] == 1
+    assert set(summary["operations"]) == set(loadtest.OPERATIONS)
+    assert set(summary["sessions"]) == {"registrar", "admin"}
+    assert set(summary["sessions"]["admin"]) == {"backup"}
+    for name, s in summary["operations"].items():
+        assert s["errors"] == 0, name
+        assert s["count"] > 0 and s["p50_ms"] <= s["p95_ms"] <= s["p99_ms"] <= s["max_ms"], name
+        assert s["count"] == sum(ops[name]["count"] for ops in summary["sessions"].values() if name in ops)
+    conn = sqlite3.connect(_scenario(tmp_path)["db"])
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    assert conn.execute("SELECT COUNT(*) FROM students").fetchone()[0] == 200
+    conn.close()
+
+
+def test_bad_scenarios_are_rejected(tmp_path):
+    with pytest.raises(ValueError, match="at least one session"):
+        loadtest.run(_scenario(tmp_path, sessions=[]))
+    with pytest.raises(ValueError, match="unknown: teleport"):
+        loadtest.run(_scenario(tmp_path, sessions=[{"name": "x", "mix": {"teleport": 1}}]))
+    with pytest.raises(ValueError):
+        loadtest.run(_scenario(tmp_path, sessions=[{"name": "x", "mix": {}}]))
+
+
+def test_lock_timeouts_are_told_apart_from_errors():
+    assert loadtest._is_lock_timeout(sqlite3.OperationalError("database is locked"))
+    assert not loadtest._is_lock_timeout(sqlite3.OperationalError("no such table: x"))
+    assert not loadtest._is_lock_timeout(ValueError("database is locked"))
+
+
+def test_example_scenario_is_valid(capsys):
+    loadtest.main(["--example"])
+    scenario = json.loads(capsys.readouterr().out)
+    assert scenario == loadtest.EXAMPLE
+    loadtest._check(scenario)
@@ -0,0 +1,11 @@
+import db
+import maintenance
+
+
+def test_prune_changes_waits_for_a_consumer(school):
+    db.create_student("S1", "Ann", 20, "ann@x.io")
+    assert "prune_changes" not in maintenance.due_tasks()
+    maintenance.run_pending()
+    assert len(db.changes_since(0)["changes"]) == 1
+    db.register_consumer("gui")
+    assert "prune_changes" in maintenance.due_tasks()
@@ -0,0 +1,24 @@
+import sqlite3
+
+import db
+import memdb
+
+
+def test_flush_replays_a_function_with_its_own_transaction(school):
+    db.create_course("C1", "Algebra")
+    mem = memdb.MemoryDatabase(school.path, flush_interval=60)
+    prev = db.set_default(mem)
+    try:
+        db.create_student("S1", "Ann", 20, "ann@x.io")
+        db.enroll_student("S1", "C1")
+        mem.connection().execute("UPDATE course_stats SET enrolled = 5")   # not journaled
+        assert db.stats_rebuild() == {"courses": ["C1"], "instructors": []}
+        assert mem.flush() == 3
+        assert mem.errors == []
+    finally:
+        db.set_default(prev)
+        mem.close()
+    disk = sqlite3.connect(school.path)
+    assert disk.execute("SELECT enrolled FROM course_stats").fetchall() == [(1,)]
+    assert disk.execute("SELECT seq FROM write_behind").fetchone() == (3,)
+    disk.close()
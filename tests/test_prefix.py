@@ -0,0 +1,40 @@
+import pytest
+
+import db
+
+
+def _ids(kind, prefix, limit=20):
+    return [r["id"] for r in db.prefix_search(kind, prefix, limit)]
+
+
+def test_ids_first_then_names_ignoring_case(school):
+    db.create_student("AL1", "Zed", 20, "z@x.io")
+    db.create_student("S1", "alice", 20, "a@x.io")
+    db.create_student("S2", "Alan", 20, "b@x.io")
+    db.create_student("al2", "Bob", 20, "c@x.io")
+    db.create_student("S3", "Bob", 20, "d@x.io")
+    assert _ids("students", "al") == ["AL1", "al2", "S2", "S1"]
+    assert _ids("students", "  AL ", limit=3) == ["AL1", "al2", "S2"]
+    assert db.prefix_search("students", "ali") == [{"id": "S1", "name": "alice"}]
+    assert _ids("students", "") == ["AL1", "al2", "S1", "S2", "S3"]
+
+
+def test_like_wildcards_are_literal(school):
+    db.create_course("C_1", "100% Maths")
+    db.create_course("CX1", "Art")
+    db.create_course("C\\2", "Music")
+    assert _ids("courses", "c_") == ["C_1"]
+    assert _ids("courses", "100%") == ["C_1"]
+    assert _ids("courses", "c\\") == ["C\\2"]
+    with pytest.raises(ValueError):
+        db.prefix_search("sections", "x")
+
+
+def test_uses_the_nocase_indexes(school):
+    conn = db.connect()
+    for table in ("students", "instructors", "courses"):
+        for col in ("id", "name"):
+            plan = " ".join(r[3] for r in conn.execute(
+                f"EXPLAIN QUERY PLAN SELECT id, name FROM {table} WHERE {col} LIKE ? ESCAPE '\\' "
+                f"ORDER BY {col} COLLATE NOCASE LIMIT ?", ("ab%", 5)))
+            assert "USING" in plan and "INDEX" in plan and "TEMP B-TREE" not in plan, (table, col, plan)
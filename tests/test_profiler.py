@@ -0,0 +1,14 @@
+import pytest
+
+import profiler
+
+
+def test_disabled_action_passes_arguments_through():
+    @profiler.action()
+    def select(record_id, records=None):
+        return record_id, records
+
+    assert not profiler.enabled()
+    assert select("S1", records={}) == ("S1", {})
+    with pytest.raises(TypeError):
+        select("S1", {}, "extra")
@@ -0,0 +1,30 @@
+import pytest
+
+import db
+
+
+def _all_pages(**kwargs):
+    rows, after = [], None
+    while True:
+        page = db.query_records(after=after, limit=3, **kwargs)
+        rows += page["records"]
+        after = page["next"]
+        if after is None:
+            return rows
+
+
+@pytest.mark.parametrize("descending", [False, True])
+def test_extra_sorts_people_by_email_and_courses_by_instructor(school, descending):
+    db.create_student("S1", "Ann", 20, "zed@x.io")
+    db.create_student("S2", "Bob", 21, "amy@x.io")
+    db.create_instructor("I1", "Mia", 40, "Kim@x.io")
+    db.create_instructor("I2", "Lee", 41, "bo@x.io")
+    db.create_course("C1", "Algebra", "I1")
+    db.create_course("C2", "Biology", "I2")
+    db.create_course("C3", "Chemistry")
+    rows = _all_pages(order_by="extra", descending=descending)
+    keys = [(r["email"] or r["instructor_name"] or "").lower() for r in rows]
+    shown = [k for k in keys if k]
+    assert shown == sorted(shown, reverse=descending)
+    assert [r["id"] for r in rows][-1] == "C3"   # no instructor: last either way
+    assert len(rows) == 7
@@ -0,0 +1,43 @@
+import sqlite3
+
+import pytest
+
+import db
+
+
+def _school():
+    db.create_student("S1", "Ann", 20, "ann@x.io")
+    db.create_student("S2", "Bob", 21, "bob@x.io")
+    db.create_instructor("I1", "Ivy", 40, "ivy@x.io")
+    db.create_course("C1", "Algebra", "I1", capacity=1)
+    db.create_course("C2", "Biology")
+    db.enroll_student("S1", "C1")
+    db.enroll_student("S2", "C1")   # waitlisted
+
+
+def test_modes_hold_the_same_rows(school):
+    _school()
+    for fetch in (db.list_students, db.list_instructors, db.list_courses,
+                  lambda mode: db.list_enrolled("C1", mode=mode), lambda mode: db.list_waitlist("C1", mode=mode)):
+        dicts = fetch(mode="dict")
+        assert dicts and isinstance(dicts[0], dict)
+        names = list(dicts[0])
+        assert [dict(zip(names, t)) for t in fetch(mode="tuple")] == dicts
+        rows = fetch(mode="row")
+        assert isinstance(rows[0], sqlite3.Row) and [dict(r) for r in rows] == dicts
+        assert fetch(mode="columns") == {n: [d[n] for d in dicts] for n in names}
+    assert db.list_students(after="S1", limit=1, mode="tuple") == [("S2", "Bob", 21, "bob@x.io")]
+    with pytest.raises(ValueError):
+        db.list_students(mode="frame")
+
+
+def test_numpy_mode(school):
+    np = pytest.importorskip("numpy")
+    _school()
+    cols = db.list_courses(mode="numpy")
+    assert cols["id"].dtype == object and list(cols["id"]) == ["C1", "C2"]
+    assert cols["enrolled_count"].dtype == np.int64 and cols["enrolled_count"].tolist() == [1, 0]
+    assert cols["capacity"].dtype == object and cols["capacity"].tolist() == [1, None]   # NULLs stay objects
+    ages = db.list_students(mode="numpy")["age"]
+    assert ages.dtype == np.int64 and ages.sum() == 41
+    assert db.list_students(after="S9", mode="numpy")["age"].shape == (0,)
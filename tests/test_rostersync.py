@@ -0,0 +1,76 @@
+import pytest
+
+import db
+import rostersync
+
+
+def _csv(path, header, *rows):
+    path.write_text("\n".join([header, *rows]) + "\n", encoding="utf-8")
+    return str(path)
+
+
+def _full_course(school):
+    db.create_course("C1", "Algebra", None, 1)
+    db.create_student("S1", "Ann", 20, "ann@x.io")
+    db.create_student("S2", "Bob", 21, "bob@x.io")
+    assert db.enroll_student("S1", "C1") == db.ENROLLED
+    assert db.enroll_student("S2", "C1") == db.WAITLISTED
+
+
+def _roster():
+    return db.connect().execute("SELECT student_id FROM registrations ORDER BY student_id").fetchall()
+
+
+def _waitlist():
+    return db.connect().execute("SELECT student_id FROM waitlist").fetchall()
+
+
+def test_dropping_students_does_not_promote_the_waitlist(school, tmp_path):
+    _full_course(school)
+    empty = _csv(tmp_path / "enrollments.csv", "student_id,course_id")
+    report = rostersync.sync(enrollments=empty)
+    assert report["enrollments"]["deleted"] == 1
+    assert _roster() == [] and _waitlist() == []
+    again = rostersync.sync(enrollments=empty)["enrollments"]
+    assert (again["inserted"], again["deleted"]) == (0, 0)
+
+
+def test_enrolled_students_leave_the_waitlist(school, tmp_path):
+    _full_course(school)
+    both = _csv(tmp_path / "enrollments.csv", "student_id,course_id", "S1,C1", "S2,C1")
+    assert rostersync.sync(enrollments=both)["enrollments"]["inserted"] == 1
+    assert _roster() == [("S1",), ("S2",)] and _waitlist() == []
+    again = rostersync.sync(enrollments=both)["enrollments"]
+    assert (again["inserted"], again["deleted"], again["unchanged"]) == (0, 0, 2)
+
+
+def test_deleted_student_seat_goes_to_the_file_not_the_waitlist(school, tmp_path):
+    _full_course(school)
+    students = _csv(tmp_path / "students.csv", "id,name,age,email", "S2,Bob,21,bob@x.io")
+    empty = _csv(tmp_path / "enrollments.csv", "student_id,course_id")
+    rostersync.sync(students, empty)
+    assert _roster() == [] and _waitlist() == []
+    again = rostersync.sync(students, empty)
+    assert again["students"]["inserted"] + again["students"]["updated"] + again["students"]["deleted"] == 0
+    assert again["enrollments"]["inserted"] + again["enrollments"]["deleted"] == 0
+
+
+def test_students_only_sync_does_not_promote_the_waitlist(school, tmp_path):
+    _full_course(school)
+    students = _csv(tmp_path / "students.csv", "id,name,age,email", "S2,Bob,21,bob@x.io")
+    report = rostersync.sync(students)
+    assert report["students"]["deleted"] == 1 and "enrollments" not in report
+    assert _roster() == [] and _waitlist() == []
+    assert db.stats_rebuild() == {"courses": [], "instructors": []}
+
+
+def test_invalid_rows_fail_before_anything_is_written(school, tmp_path):
+    _full_course(school)
+    students = _csv(tmp_path / "students.csv", "id,name,age,email",
+                    "S3,Cy,22,cy@x.io", "S4,Di,23,di@x.io", "S5,Ed,-1,ed@x.io")
+    version = db.current_version()
+    with pytest.raises(ValueError, match="students.csv:4: age must not be negative"):
+        rostersync.sync(students, batch=1)
+    assert [s["id"] for s in db.list_students()] == ["S1", "S2"]
+    assert db.current_version() == version
+    assert db.connect().execute("SELECT COUNT(*) FROM sync_hashes").fetchone()[0] == 0
@@ -0,0 +1,58 @@
+import pytest
+
+import db
+
+
+def _course_with_section(cid, term, day=0, start="09:00", end="10:00"):
+    db.create_course(cid, cid, None, None, term)
+    db.create_section(cid + "-L1", cid)
+    db.add_section_slot(cid + "-L1", day, start, end)
+    return cid + "-L1"
+
+
+def test_same_time_in_different_terms_is_not_a_conflict(school):
+    db.create_student("S1", "Ann", 20, "ann@x.io")
+    fall = _course_with_section("C1", "2026F")
+    spring = _course_with_section("C2", "2027S")
+    assert db.enroll_student("S1", "C1", fall) == db.ENROLLED
+    assert db.schedule_conflicts("S1", spring) == []
+    assert db.enroll_student("S1", "C2", spring) == db.ENROLLED
+    assert db.find_schedule_conflicts() == []
+    assert len(db.student_schedule("S1")) == 2
+
+
+def test_same_time_in_the_same_term_conflicts(school):
+    db.create_student("S1", "Ann", 20, "ann@x.io")
+    first = _course_with_section("C1", "2026F")
+    second = _course_with_section("C2", "2026F", start="09:30", end="11:00")
+    db.enroll_student("S1", "C1", first)
+    assert [c["section_id"] for c in db.schedule_conflicts("S1", second)] == [first]
+    with pytest.raises(ValueError):
+        db.enroll_student("S1", "C2", second)
+
+
+def test_slot_added_later_is_checked_within_its_term(school):
+    db.create_student("S1", "Ann", 20, "ann@x.io")
+    fall = _course_with_section("C1", "2026F")
+    db.create_course("C2", "C2", None, None, "2027S")
+    db.create_section("C2-L1", "C2")
+    db.enroll_student("S1", "C1", fall)
+    db.enroll_student("S1", "C2", "C2-L1")
+    db.add_section_slot("C2-L1", 0, "09:00", "10:00")   # same time, other term
+    assert len(db.student_schedule("S1")) == 2
+
+
+@pytest.mark.parametrize("hhmm", ["24:30", "25:00", "-1:00", "12:60"])
+def test_week_minute_rejects_invalid_times(hhmm):
+    with pytest.raises(ValueError):
+        db._week_minute(0, hhmm)
+
+
+def test_week_minute_allows_midnight_only_as_end(school):
+    assert db._week_minute(0, "23:59") == 23 * 60 + 59
+    assert db._week_minute(0, "24:00") == 1440
+    db.create_course("C1", "C1")
+    db.create_section("L1", "C1")
+    db.add_section_slot("L1", 0, "23:00", "24:00")
+    with pytest.raises(ValueError):
+        db.add_section_slot("L1", 1, "24:00", "24:00")
@@ -0,0 +1,92 @@
+import gzip
+import http.client
+import json
+import sqlite3
+import threading
+
+import pytest
+
+import db
+import server as school_server
+
+
+@pytest.fixture
+def client(school):
+    srv = school_server.make_server(school.path, port=0, pool_size=2)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    conn = http.client.HTTPConnection(*srv.server_address, timeout=10)
+
+    def request(method, path, body=None, raw=None, headers=None):
+        data = raw if raw is not None else (None if body is None else json.dumps(body).encode())
+        conn.request(method, path, data, headers or {})
+        resp = conn.getresponse()
+        payload = resp.read()
+        if resp.getheader("Content-Encoding") == "gzip":
+            payload = gzip.decompress(payload)
+        return resp.status, dict(resp.getheaders()), json.loads(payload) if payload else None
+
+    yield request
+    conn.close()
+    srv.shutdown()
+    srv.server_close()
+    srv.pool.close()
+
+
+def test_enroll_into_a_section(client):
+    client("POST", "/students", {"id": "S1", "name": "Ann", "age": 20, "email": "a@x.io"})
+    client("POST", "/courses", {"id": "C1", "name": "Algebra", "capacity": 5})
+    db.create_section("L1", "C1")
+    status, _, body = client("POST", "/enrollments", {"student_id": "S1", "course_id": "C1", "section_id": "L1"})
+    assert status == 201 and body["section_id"] == "L1" and body["status"] == db.ENROLLED
+    assert db.connect().execute("SELECT section_id FROM registrations").fetchall() == [("L1",)]
+    status, _, body = client("POST", "/enrollments", {"student_id": "S1", "course_id": "C1", "section_id": 7})
+    assert status == 400 and body["error"] == "section_id must be a string"
+
+
+def test_etag_answers_304_until_the_row_changes(client):
+    client("POST", "/students", {"id": "S1", "name": "Ann", "age": 20, "email": "a@x.io"})
+    status, headers, body = client("GET", "/students/S1")
+    assert status == 200 and body["name"] == "Ann"
+    etag = headers["ETag"]
+    status, _, body = client("GET", "/students/S1", headers={"If-None-Match": etag})
+    assert (status, body) == (304, None)
+    client("PUT", "/students/S1", {"name": "Anna", "age": 20, "email": "a@x.io"})
+    status, headers, body = client("GET", "/students/S1", headers={"If-None-Match": etag})
+    assert status == 200 and body["name"] == "Anna" and headers["ETag"] != etag
+
+
+def test_large_bodies_are_gzipped_on_request(client):
+    for n in range(40):
+        db.create_student(f"S{n:02d}", f"Student {n}", 20, f"s{n}@school.edu")
+    status, headers, body = client("GET", "/students?limit=40", headers={"Accept-Encoding": "gzip"})
+    assert status == 200 and headers["Content-Encoding"] == "gzip" and len(body["items"]) == 40
+    _, headers, _ = client("GET", "/students?limit=40")
+    assert "Content-Encoding" not in headers
+    _, headers, _ = client("GET", "/students/S01", headers={"Accept-Encoding": "gzip"})
+    assert "Content-Encoding" not in headers   # under GZIP_MIN_BYTES
+
+
+def test_client_errors(client):
+    assert client("GET", "/nowhere")[0] == 404
+    assert client("GET", "/students/S9")[0] == 404
+    assert client("DELETE", "/search")[0] == 405
+    status, _, body = client("POST", "/students", raw=b"{not json", headers={"Content-Type": "application/json"})
+    assert status == 400 and body["error"].startswith("Invalid JSON")
+    status, _, body = client("POST", "/students", {"id": "S1", "name": "Ann", "age": True, "email": "a@x.io"})
+    assert status == 400 and "age" in body["error"]
+    assert client("POST", "/students", {"id": "S1", "name": "Ann"})[0] == 400
+    client("POST", "/students", {"id": "S1", "name": "Ann", "age": 20, "email": "a@x.io"})
+    assert client("POST", "/students", {"id": "S1", "name": "Ann", "age": 20, "email": "a@x.io"})[0] == 409
+    assert client("GET", "/changes?since=x")[0] == 400
+
+
+@pytest.mark.parametrize("error, status", [(RuntimeError("boom"), 500),
+                                           (sqlite3.OperationalError("database is locked"), 503)])
+def test_unexpected_errors_answer_json_and_keep_the_connection(client, monkeypatch, error, status):
+    def fail(q):
+        raise error
+    monkeypatch.setattr(db, "search_all", fail)
+    got, _, body = client("GET", "/search?q=a")
+    assert got == status and str(error) in body["error"]
+    monkeypatch.undo()
+    assert client("GET", "/search?q=a")[0] == 200
@@ -0,0 +1,62 @@
+import threading
+
+import pytest
+
+import db
+import shards
+
+
+@pytest.fixture
+def sharded(tmp_path):
+    s = shards.ShardedDB({"fall": str(tmp_path / "fall.db"), "spring": str(tmp_path / "spring.db")},
+                         route=lambda dept: {"math": "fall", "bio": "spring"}.get(dept, dept))
+    yield s
+    s.close()
+
+
+def test_writes_are_routed_by_key(sharded):
+    sharded.create_student("math", "S1", "Ann Lee", 20, "ann@x.io")
+    sharded.create_student("bio", "S2", "Bob Lee", 21, "bob@x.io")
+    sharded.create_course("spring", "C1", "Biology", capacity=1)
+    assert sharded.enroll_student("bio", "S2", "C1") == "enrolled"
+    assert sharded.run("fall", db.list_students) == [{"id": "S1", "name": "Ann Lee", "age": 20, "email": "ann@x.io"}]
+    assert [s["id"] for s in sharded.run("spring", db.list_enrolled, "C1")] == ["S2"]
+    with pytest.raises(KeyError):
+        sharded.create_student("art", "S3", "Cy", 22, "cy@x.io")
+
+
+def test_fan_out_reads_merge_in_key_order(sharded):
+    for n in range(6):
+        sharded.create_student("fall" if n % 2 else "spring", f"S{n}", f"Lee {n}", 20, f"s{n}@x.io")
+    rows = sharded.list_students(limit=4)
+    assert [(r["id"], r["shard"]) for r in rows] == [("S0", "spring"), ("S1", "fall"), ("S2", "spring"), ("S3", "fall")]
+    assert [r["id"] for r in sharded.list_students(after="S3")] == ["S4", "S5"]
+    assert [r["id"] for r in sharded.search_all("lee")["students"]] == [f"S{n}" for n in range(6)]
+    scores = [r["score"] for r in sharded.fuzzy_search("lee", limit=3)]
+    assert len(scores) == 3 and scores == sorted(scores, reverse=True)
+
+
+def test_fan_out_waits_for_every_shard_before_raising(sharded):
+    release = threading.Event()
+    finished = []
+
+    def work():
+        if db.connect().execute("PRAGMA database_list").fetchone()[2].endswith("fall.db"):
+            raise RuntimeError("fall is down")
+        release.wait(5)
+        finished.append("spring")
+        return "ok"
+
+    threading.Timer(0.2, release.set).start()
+    with pytest.raises(RuntimeError, match="fall is down"):
+        sharded.fan_out(work)
+    assert finished == ["spring"]
+
+
+def test_latency_counts_calls_per_shard(sharded):
+    assert sharded.latency()["fall"]["calls"] == 1   # init_db
+    for _ in range(3):
+        sharded.run("fall", db.list_students)
+    lat = sharded.latency()
+    assert lat["fall"]["calls"] == 4 and lat["spring"]["calls"] == 1
+    assert 0 <= lat["fall"]["p50_ms"] <= lat["fall"]["p95_ms"] <= lat["fall"]["max_ms"]
@@ -0,0 +1,65 @@
+import random
+
+import db
+
+
+def _load():
+    return {i["id"]: (i["courses"], i["enrolled_count"]) for i in db.stats_instructor_load()}
+
+
+def _sizes():
+    return {c["id"]: c["enrolled_count"] for c in db.stats_course_sizes()}
+
+
+def _school():
+    db.create_instructor("I1", "Ivy", 40, "i1@x.io")
+    db.create_instructor("I2", "Ivan", 41, "i2@x.io")
+    db.create_course("C1", "Algebra", "I1")
+    db.create_course("C2", "Biology", "I1")
+    db.create_course("C3", "Chemistry", "I2")
+    db.create_course("C4", "Drama")
+    for n in range(6):
+        db.create_student(f"S{n}", f"n{n}", 20, f"s{n}@x.io")
+    for sid, cid in [("S0", "C1"), ("S1", "C1"), ("S2", "C1"), ("S0", "C2"), ("S3", "C3"), ("S4", "C4")]:
+        db.enroll_student(sid, cid)
+
+
+def test_aggregates_follow_deletes_and_reassignments(school):
+    _school()
+    assert _sizes() == {"C1": 3, "C2": 1, "C3": 1, "C4": 1}
+    assert _load() == {"I1": (2, 4), "I2": (1, 1)}
+    db.delete_student("S0")
+    db.drop_student("S3", "C3")
+    db.assign_instructor("C4", "I2")
+    db.delete_course("C2")
+    assert _sizes() == {"C1": 2, "C3": 0, "C4": 1}
+    assert _load() == {"I1": (1, 2), "I2": (2, 1)}
+    db.delete_instructor("I1")
+    assert _load() == {"I2": (2, 1)}
+    assert [c["id"] for c in db.stats_unassigned_courses()] == ["C1"]
+    assert db.stats_enrollment_histogram(bucket=2) == [{"low": 0, "high": 1, "courses": 2},
+                                                      {"low": 2, "high": 3, "courses": 1}]
+    assert db.stats_rebuild() == {"courses": [], "instructors": []}
+
+
+def test_aggregates_follow_merges(school):
+    _school()
+    db.merge_people("student", "S1", "S0")    # S0's C2 seat moves to S1, the C1 seat collapses
+    db.merge_people("instructor", "I2", "I1")
+    assert _sizes() == {"C1": 2, "C2": 1, "C3": 1, "C4": 1}
+    assert _load() == {"I2": (3, 4)}
+    assert db.stats_rebuild() == {"courses": [], "instructors": []}
+
+
+def test_rebuild_matches_after_random_churn(school):
+    _school()
+    rnd = random.Random(4)
+    for _ in range(200):
+        sid, cid = f"S{rnd.randrange(6)}", f"C{rnd.randrange(1, 5)}"
+        if rnd.random() < 0.5:
+            db.enroll_student(sid, cid)
+        else:
+            db.drop_student(sid, cid)
+        if rnd.random() < 0.1:
+            db.assign_instructor(cid, rnd.choice(["I1", "I2", None]))
+    assert db.stats_rebuild() == {"courses": [], "instructors": []}
@@ -0,0 +1,60 @@
+import pytest
+
+import archive
+import db
+
+
+@pytest.fixture
+def attached(school, tmp_path):
+    archive.attach(str(tmp_path / "archive.db"))
+    yield
+    archive.detach()
+
+
+def _school():
+    db.create_instructor("I1", "Ivy", 40, "ivy@x.io")
+    for term in ("2023-09", "2024-01", "2024-09"):
+        db.create_course(f"C{term}", f"Algebra {term}", "I1", capacity=1, term=term)
+    db.create_course("CX", "Drama")   # no term: never archived
+    for sid in ("S1", "S2", "S3", "S4"):
+        db.create_student(sid, f"Lee {sid}", 20, f"{sid}@x.io")
+    db.enroll_student("S1", "C2023-09")
+    db.enroll_student("S2", "C2023-09")   # waitlisted
+    db.enroll_student("S3", "C2023-09")   # waitlisted
+    db.enroll_student("S3", "C2024-09")   # keeps S3 hot
+    db.enroll_student("S4", "CX")
+
+
+def test_archive_moves_old_terms_and_their_students(attached):
+    _school()
+    assert archive.terms_older_than(1) == ["2023-09", "2024-01"]
+    moved = archive.archive_terms(archive.terms_older_than(1), batch_size=1)
+    assert moved == {"courses": 2, "registrations": 1, "waitlist": 2, "students": 2}
+    assert [c["id"] for c in db.list_courses()] == ["C2024-09", "CX"]
+    assert [s["id"] for s in db.list_students()] == ["S3", "S4"]
+    assert [(c["id"], c["archived"]) for c in archive.list_courses(include_archive=True)] == \
+        [("C2023-09", 1), ("C2024-01", 1), ("C2024-09", 0), ("CX", 0)]
+    assert [s["id"] for s in archive.list_enrolled("C2023-09", include_archive=True)] == ["S1"]
+    assert archive.get_student("S2", include_archive=True)["archived"] == 1
+    assert archive.get_course("C2023-09", include_archive=True)["enrolled_count"] == 1
+    assert [s["id"] for s in archive.search_all("lee", include_archive=True)["students"]] == ["S1", "S2", "S3", "S4"]
+
+
+def test_waitlist_is_archived_in_order_without_promotion(attached):
+    _school()
+    archive.archive_terms(["2023-09"])
+    conn = db.connect()
+    assert conn.execute("SELECT student_id FROM archive.waitlist WHERE course_id = 'C2023-09' "
+                        "ORDER BY position").fetchall() == [("S2",), ("S3",)]
+    assert conn.execute("SELECT COUNT(*) FROM waitlist").fetchone()[0] == 0
+    assert conn.execute("SELECT course_id FROM registrations WHERE student_id = 'S3'").fetchall() == [("C2024-09",)]
+    assert db.stats_rebuild() == {"courses": [], "instructors": []}
+
+
+def test_reads_need_an_attached_archive(school):
+    db.create_student("S1", "Ann", 20, "a@x.io")
+    assert [s["id"] for s in archive.list_students()] == ["S1"]
+    with pytest.raises(RuntimeError):
+        archive.list_students(include_archive=True)
+    with pytest.raises(RuntimeError):
+        archive.archive_terms(["2023-09"])
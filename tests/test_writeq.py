@@ -0,0 +1,52 @@
+import sqlite3
+
+import pytest
+
+import db
+from writeq import WriteQueue
+
+
+def _ids():
+    return [r[0] for r in db.connect().execute("SELECT id FROM students ORDER BY id")]
+
+
+def test_failing_write_rolls_back_alone(school):
+    def half_written():
+        db.create_student("S3", "Cid", 20, "c@x.io")
+        raise RuntimeError("after the insert")
+
+    with WriteQueue(school.path, max_delay=0.5) as wq:
+        futures = [wq.create_student("S1", "Ann", 20, "a@x.io"), wq.create_student("S1", "Dup", 20, "d@x.io"),
+                   wq.submit(half_written), wq.create_student("S2", "Bob", 20, "b@x.io")]
+        futures[-1].result()
+        assert wq.groups == 1
+    assert futures[0].result() is None
+    with pytest.raises(sqlite3.IntegrityError):
+        futures[1].result()
+    with pytest.raises(RuntimeError):
+        futures[2].result()
+    assert _ids() == ["S1", "S2"]
+
+
+def test_a_broken_group_fails_every_future(school):
+    def end_transaction():
+        db.connect().execute("ROLLBACK")   # releasing its savepoint then fails the group
+
+    with WriteQueue(school.path, max_delay=0.5) as wq:
+        futures = [wq.create_student("S1", "Ann", 20, "a@x.io"), wq.submit(end_transaction),
+                   wq.create_student("S2", "Bob", 20, "b@x.io")]
+        for fut in futures:
+            with pytest.raises(sqlite3.OperationalError):
+                fut.result(timeout=5)
+    assert _ids() == []
+
+
+def test_wrappers_pass_capacity_term_and_section(school):
+    with WriteQueue(school.path) as wq:
+        wq.create_student("S1", "Ann", 20, "a@x.io")
+        wq.create_course("C1", "Algebra", None, 5, "2026F")
+        wq.submit(db.create_section, "L1", "C1")
+        assert wq.enroll_student("S1", "C1", "L1").result() == db.ENROLLED
+    course = db.get_course("C1")
+    assert (course["capacity"], course["term"]) == (5, "2026F")
+    assert db.connect().execute("SELECT section_id FROM registrations").fetchall() == [("L1",)]